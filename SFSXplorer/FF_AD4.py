@@ -186,6 +186,33 @@ class InterMol(object):
                 
             return vol_i,sol_i,vol_j,sol_j
         
+    # Define get_atom_par_VDW_fallback()
+    def get_atom_par_VDW_fallback(self,atom_i,atom_j):
+        """Method to return van der Waals parameters for atom pairs not solved
+        by get_atom_par_VDW() (None for unknown pairs)"""
+        
+        # Parameters for pairs of atoms
+        if atom_i == "A " and atom_j == "A ":
+            return 4.0,0.15,4.0,0.15
+        elif atom_i == "NA" and atom_j == "NA":
+            return 3.5,0.16,3.5,0.16
+        elif atom_i == "N " and atom_j == "N ":
+            return 3.5,0.16,3.5,0.16
+        elif atom_i == "HD" and atom_j == "HD":
+            return 2.0,0.02,2.0,0.02
+        elif atom_i == "OA" and atom_j == "OA":
+            return 3.2,0.2,3.2,0.2
+        elif atom_i == "OA" and atom_j == "C ":
+            return 3.2,0.2,4.0,0.15
+        elif atom_i == "C " and atom_j == "C ":
+            return 4.0,0.15,4.0,0.15
+        elif atom_i == "SA" and atom_j == "SA":
+            return 4.0,0.2,4.0,0.2
+        elif atom_i == "C " and atom_j == "HD":
+            return 4.0,0.15,2.0,0.02
+        else:
+            return None
+        
     # Define dist() method
     def dist(self,x1,y1,z1,x2,y2,z2):
         """Method to calculate Euclidian distance"""
@@ -240,24 +267,9 @@ class InterMol(object):
                     reqm_i,epsilon_i,reqm_j,epsilon_j=self.get_atom_par_VDW(par_in,atom_i,atom_j)
 
                 except:
-                    if atom_i == "A " and atom_j == "A ":
-                        reqm_i,epsilon_i,reqm_j,epsilon_j = 4.0,0.15,4.0,0.15
-                    elif atom_i == "NA" and atom_j == "NA":
-                        reqm_i,epsilon_i,reqm_j,epsilon_j = 3.5,0.16,3.5,0.16
-                    elif atom_i == "N " and atom_j == "N ":
-                        reqm_i,epsilon_i,reqm_j,epsilon_j = 3.5,0.16,3.5,0.16
-                    elif atom_i == "HD" and atom_j == "HD":
-                        reqm_i,epsilon_i,reqm_j,epsilon_j = 2.0,0.02,2.0,0.02
-                    elif atom_i == "OA" and atom_j == "OA":
-                        reqm_i,epsilon_i,reqm_j,epsilon_j = 3.2,0.2,3.2,0.2
-                    elif atom_i == "OA" and atom_j == "C ":
-                        reqm_i,epsilon_i,reqm_j,epsilon_j = 3.2,0.2,4.0,0.15
-                    elif atom_i == "C " and atom_j == "C ":
-                        reqm_i,epsilon_i,reqm_j,epsilon_j = 4.0,0.15,4.0,0.15
-                    elif atom_i == "SA" and atom_j == "SA":
-                        reqm_i,epsilon_i,reqm_j,epsilon_j = 4.0,0.2,4.0,0.2
-                    elif atom_i == "C " and atom_j == "HD":
-                        reqm_i,epsilon_i,reqm_j,epsilon_j = 4.0,0.15,2.0,0.02
+                    par_ij = self.get_atom_par_VDW_fallback(atom_i,atom_j)
+                    if par_ij is not None:
+                        reqm_i,epsilon_i,reqm_j,epsilon_j = par_ij
                     else:
                         print(atom_i,atom_j)
                     
@@ -93,9 +93,10 @@
 #
 ################################################################################
 #
-# Show message about SFSXplorer
-print("""
+# Message about SFSXplorer (shown by sfsxplorer.py, so that importing the
+# package, e.g., for the api module, prints nothing)
+banner = """
 SFSXplorer: A Python package for exploration of the Scoring Function Space.
 Developed by Dr. Walter F. de Azevedo, Jr.
 https://azevedolab.net/sfsxplorer.php
-""")
\ No newline at end of file
+"""
\ No newline at end of file
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+#
+################################################################################
+# SFSXplorer                                                                   #
+# Scoring Function Space eXplorer                                              #
+################################################################################
+#
+# Class to explore the Scoring Function Space with coarse-to-fine adaptive
+# refinement. Energy terms are calculated on a coarse grid of each family
+# (exponents of van der Waals and hydrogen-bond potentials, parameters of the
+# dielectric functions, and parameters of the desolvation potential). Then the
+# best terms, ranked by a correlation with experimental data (exp_string), are
+# refined with a grid of half the spacing around them. The search stops when
+# the number of calculated terms reaches a column budget. Pairwise data of each
+# complex are kept in memory (pair_data.PairData), so complexes are read once.
+#
+################################################################################
+# Dr. Walter F. de Azevedo, Jr.                                                #
+# https://azevedolab.net/                                                      #
+# January 12, 2023                                                             #
+################################################################################
+#
+# Import section
+import sys
+import itertools
+import numpy as np
+from SFSXplorer import sfs
+from SFSXplorer import FF_AD4 as ad4
+from SFSXplorer import pair_data as pd
+from SFSXplorer import batch_metrics as bm
+
+# Define Refiner() class
+class Refiner(sfs.Explorer):
+    """Class to explore the scoring function space by adaptive refinement"""
+
+    # Define constructor method
+    def __init__(self,sfs_in):
+        """Constructor method"""
+
+        # Set up attributes
+        self.sfs_in = sfs_in
+
+        # Show message
+        print("\nAdaptive exploration of the Scoring Function Space...")
+
+    # Define read_adaptive_in() method
+    def read_adaptive_in(self):
+        """Method to read parameters for adaptive exploration"""
+
+        # Import section
+        import csv
+
+        # Invoke read_input() method
+        self.read_input()
+
+        # Set up default values
+        self.exp_string = None          # Column with experimental data
+        self.adaptive_budget = 500      # Maximum number of terms
+        self.adaptive_coarse = 3        # Points per axis in the coarse grid
+        self.adaptive_top = 4           # Terms refined in each round
+        self.adaptive_metric = "rho"    # Metric (r, rho, or tau-b)
+        self.adaptive_sign = "abs"      # Rank by abs, max, or min of metric
+        self.adaptive_min_step = 1e-3   # Smallest spacing (fraction of range)
+        self.adaptive_families = list(pd.FAMILIES)
+
+        # Looping through sfs.in
+        fo_in = open(self.sfs_in,"r")
+        for line in csv.reader(fo_in):
+            if len(line) < 2 or line[0] == "#":
+                continue
+            elif line[0].strip() == "exp_string":
+                self.exp_string = str(line[1]).strip()
+            elif line[0].strip() == "adaptive_budget":
+                self.adaptive_budget = int(line[1].strip())
+            elif line[0].strip() == "adaptive_coarse":
+                self.adaptive_coarse = int(line[1].strip())
+            elif line[0].strip() == "adaptive_top":
+                self.adaptive_top = int(line[1].strip())
+            elif line[0].strip() == "adaptive_metric":
+                self.adaptive_metric = line[1].strip()
+            elif line[0].strip() == "adaptive_sign":
+                self.adaptive_sign = line[1].strip().lower()
+            elif line[0].strip() == "adaptive_min_step":
+                self.adaptive_min_step = float(line[1].strip())
+            elif line[0].strip() == "adaptive_families":
+                self.adaptive_families = [ele.strip() for ele in line[1:]
+                                            if ele.strip() != ""]
+        fo_in.close()
+
+        # Check parameters
+        if self.exp_string is None:
+            sys.exit("\nError! Adaptive exploration requires exp_string!")
+        if self.adaptive_metric not in ["r","rho","tau-b"]:
+            sys.exit("\nError! Invalid adaptive_metric "+self.adaptive_metric)
+        for family in self.adaptive_families:
+            if family not in pd.FAMILIES:
+                sys.exit("\nError! Invalid family "+family)
+
+        # Set up log file
+        self.adaptive_log = self.scores_out.replace(".csv","_adaptive_log.csv")
+
+    # Define load_complexes() method
+    def load_complexes(self):
+        """Method to read all complexes in ligands.in and keep their pairwise
+        data in memory"""
+
+        # Instantiate an object of the InterMol() class
+        pot = ad4.InterMol("misc/data/AD4.1_bound.dat")
+        par_table = pd.ParTable(pot,pot.read_AD4_bound())
+
+        # Set up lists
+        self.header_in = ""
+        self.rows_in = []
+        self.pairs = []
+        y = []
+
+        # Looping through csv0
+        i_exp = None
+        for line in self.csv0:
+            if len(line) == 0:
+                continue
+            elif line[0].strip() == "PDB":
+                self.header_in = ",".join(line)+","
+                if self.exp_string not in line:
+                    sys.exit("\nError! I can't find "+self.exp_string+
+                                " column in "+self.ligands_in+"!")
+                i_exp = line.index(self.exp_string)
+                continue
+            elif "#" in line[0].strip():
+                continue
+            elif i_exp is None:
+                sys.exit("\nError! I can't find the header (PDB,...) of "+
+                            self.ligands_in+"!")
+
+            # Read complex
+            name_dir = self.dataset_dir+str(line[0].strip())+"/"
+            lig_list = pot.read_PDBQT(name_dir+"lig.pdbqt")
+            receptor_list = pot.read_PDBQT(name_dir+"receptor.pdbqt")
+            self.pairs.append(pd.PairData(par_table,lig_list,receptor_list))
+
+            # Keep data as written by write_energy()
+            data_in = ",".join(line)+","
+            self.rows_in.append(data_in[:len(data_in)-3])
+            try:
+                y.append(float(line[i_exp]))
+            except ValueError:
+                y.append(np.nan)
+
+        # Close file
+        self.fo0.close()
+
+        # Rows with experimental data
+        self.y = np.array(y)
+        self.rows_exp = ~np.isnan(self.y)
+        print("\nComplexes: ",len(self.pairs)," (",np.sum(self.rows_exp),
+                " with "+self.exp_string+")")
+
+    # Define get_axes() method
+    def get_axes(self,family):
+        """Method to return (lower, upper, integer) for each parameter of a
+        family, in the order of the column name"""
+
+        # Ranges from sfs.in
+        if family == "VDW":
+            return [(self.pot_VDW_n_min,self.pot_VDW_n_max,True),
+                    (self.pot_VDW_m_min,self.pot_VDW_m_max,True)]
+        elif family == "HB":
+            return [(self.pot_HB_n_min,self.pot_HB_n_max,True),
+                    (self.pot_HB_m_min,self.pot_HB_m_max,True)]
+        elif family == "Desol":
+            return [(float(self.m_desol_i),float(self.m_desol_f),False),
+                    (float(self.n_desol_i),float(self.n_desol_f),False),
+                    (self.sigma_desol_i,self.sigma_desol_f,False)]
+        else:
+            return [(self.A_i,self.A_f,False),
+                    (self.epsilon0_i,self.epsilon0_f,False),
+                    (self.k_i,self.k_f,False),
+                    (self.lambda_i,self.lambda_f,False)]
+
+    # Define set_value() method
+    def set_value(self,x,axis):
+        """Method to return a parameter clipped to its range (rounded for
+        integer axes and to six significant digits otherwise)"""
+
+        # Clip and round
+        lower,upper,integer = axis
+        x = min(max(x,min(lower,upper)),max(lower,upper))
+        if integer:
+            return int(round(x))
+        return float("{:.6g}".format(x))
+
+    # Define valid() method
+    def valid(self,family,params):
+        """Method to check parameters (n != m for VDW and HB)"""
+
+        # Return result
+        return family not in ["VDW","HB"] or params[0] != params[1]
+
+    # Define coarse_grid() method
+    def coarse_grid(self,family):
+        """Method to return the coarse grid of a family as a dictionary of
+        parameters and their spacing"""
+
+        # Points and spacing for each axis
+        axes = self.get_axes(family)
+        values = []
+        steps = []
+        for lower,upper,integer in axes:
+            if lower == upper or self.adaptive_coarse < 2:
+                values.append([lower])
+                steps.append(0.0)
+            else:
+                values.append(np.linspace(lower,upper,self.adaptive_coarse))
+                steps.append((upper-lower)/(self.adaptive_coarse-1))
+
+        # Cartesian product
+        grid = {}
+        for point in itertools.product(*values):
+            params = tuple(self.set_value(x,axis) for x,axis in
+                            zip(point,axes))
+            if self.valid(family,params):
+                grid[params] = tuple(steps)
+
+        # Return grid
+        return grid
+
+    # Define neighbors() method
+    def neighbors(self,family,params,steps):
+        """Method to return points around params with half spacing"""
+
+        # Half spacing (axes with spacing below minimum are not refined)
+        axes = self.get_axes(family)
+        half = []
+        for step,(lower,upper,integer) in zip(steps,axes):
+            if integer:
+                half.append(step/2 if step >= 2 else 0.0)
+            elif step/2 >= self.adaptive_min_step*abs(upper - lower):
+                half.append(step/2)
+            else:
+                half.append(0.0)
+
+        # Points at -1, 0, and +1 half spacing along each axis
+        grid = {}
+        if max(half) == 0.0:
+            return grid
+        for shift in itertools.product([-1,0,1],repeat=len(axes)):
+            point = tuple(self.set_value(p + s*h,axis) for p,s,h,axis in
+                            zip(params,shift,half,axes))
+            if point != params and self.valid(family,point):
+                grid[point] = tuple(half)
+
+        # Return grid
+        return grid
+
+    # Define evaluate() method
+    def evaluate(self,terms):
+        """Method to calculate terms (list of (family, params)) for all
+        complexes and return their metrics"""
+
+        # Calculate energy terms (complexes x terms)
+        x = np.array([[pair.term(family,params) for family,params in terms]
+                        for pair in self.pairs]).reshape(len(self.pairs),-1)
+        for (family,params),column in zip(terms,x.T):
+            self.values[family,params] = column
+
+        # Metric against experimental data
+        engine = bm.BatchMetrics(self.y[self.rows_exp],x[self.rows_exp])
+        if self.adaptive_metric == "tau-b":
+            metric,_ = engine.kendall()
+        else:
+            r,_,rho,_ = engine.correlations()
+            metric = r if self.adaptive_metric == "r" else rho
+
+        # Score to rank terms (larger is better)
+        if self.adaptive_sign == "abs":
+            score = np.abs(metric)
+        elif self.adaptive_sign == "min":
+            score = -metric
+        else:
+            score = metric
+        score = np.where(np.isnan(score),-np.inf,score)
+
+        # Return metrics and scores
+        return metric,score
+
+    # Define refine() method
+    def refine(self):
+        """Method to carry out coarse-to-fine refinement within the budget"""
+
+        # Set up dictionaries for calculated terms
+        self.values = {}            # Energy terms for all complexes
+        scores = {}                 # Score of each term
+        steps = {}                  # Spacing of each term
+        self.log = []               # (round, family, params, metric)
+
+        # Coarse grid of all families
+        grids = dict([(family,list(self.coarse_grid(family).items()))
+                        for family in self.adaptive_families])
+        n_coarse = sum([len(grids[family]) for family in grids])
+        n_families = len([family for family in grids if len(grids[family]) > 0])
+        if n_families > self.adaptive_budget:
+            sys.exit("\nError! adaptive_budget must be at least "+
+                        str(n_families)+" (one term per family)!")
+
+        # Subsample the coarse grid of each family in proportion to its size
+        # (at least one term per family) when larger than the budget
+        candidates = {}
+        for family in self.adaptive_families:
+            points = grids[family]
+            if n_coarse > self.adaptive_budget and len(points) > 0:
+                n_points = 1 + (self.adaptive_budget - n_families)* \
+                                (len(points) - 1)//(n_coarse - n_families)
+                points = [points[i] for i in np.unique(np.linspace(0,
+                                len(points) - 1,n_points).astype(int))]
+            for params,step in points:
+                candidates[family,params] = step
+        if n_coarse > self.adaptive_budget:
+            print("\nCoarse grid with ",n_coarse," terms subsampled to ",
+                    len(candidates)," terms (adaptive_budget)")
+
+        # Looping through rounds
+        refined = set()
+        n_round = 0
+        while len(candidates) > 0:
+            terms = list(candidates)[:self.adaptive_budget - len(self.values)]
+            metric,score = self.evaluate(terms)
+            for j,term in enumerate(terms):
+                scores[term] = score[j]
+                steps[term] = candidates[term]
+                self.log.append((n_round,term[0],term[1],metric[j]))
+            best = max(scores.values())
+            print("Round ",n_round,": ",len(terms)," terms, total ",
+                    len(self.values),", best score ",best)
+
+            # Stop when the budget is reached
+            if len(self.values) >= self.adaptive_budget:
+                break
+
+            # Refine best terms not refined yet
+            candidates = {}
+            ranked = sorted([term for term in scores if term not in refined],
+                            key=lambda term: -scores[term])
+            n_refined = 0
+            for term in ranked:
+                if n_refined == self.adaptive_top:
+                    break
+                refined.add(term)
+                new_points = [(params,step) for params,step in
+                            self.neighbors(term[0],term[1],steps[term]).items()
+                            if (term[0],params) not in self.values]
+                for params,step in new_points:
+                    candidates.setdefault((term[0],params),step)
+                if len(new_points) > 0:
+                    n_refined += 1
+            n_round += 1
+
+    # Define write_adaptive() method
+    def write_adaptive(self):
+        """Method to write calculated terms (as write_energy()) and the log of
+        the refinement"""
+
+        # Terms ordered by family and parameters
+        terms = sorted(self.values,
+                key=lambda term: (pd.FAMILIES.index(term[0]),term[1]))
+        names = [pd.term_name(family,params) for family,params in terms]
+
+        # Write energy terms
+        fo_out = open(self.scores_out,"w")
+        fo_out.write(self.header_in+",".join(names)+"\n")
+        for i,data_in in enumerate(self.rows_in):
+            fo_out.write(data_in+","+",".join([str(self.values[term][i])
+                                                for term in terms])+"\n")
+        fo_out.close()
+
+        # Write log
+        fo_log = open(self.adaptive_log,"w")
+        fo_log.write("Round,Family,Term,"+self.adaptive_metric+"\n")
+        for n_round,family,params,metric in self.log:
+            fo_log.write(str(n_round)+","+family+","+
+                        pd.term_name(family,params)+","+str(metric)+"\n")
+        fo_log.close()
+
+        # Show message
+        print("\nEnergy terms written in "+self.scores_out)
+        print("Refinement log written in "+self.adaptive_log)
+        print("\nDone!")
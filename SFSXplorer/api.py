@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+#
+################################################################################
+# SFSXplorer                                                                   #
+# Scoring Function Space eXplorer                                              #
+################################################################################
+#
+# Functions to calculate energy terms of the Scoring Function Space from Python
+# without sfs.in, output files, or messages. Ligands and receptors are PDBQT
+# files or in-memory tuples of coordinates (n x 3), charges (n), and AutoDock4
+# atom types (n). Columns (term_grid) are a term_grid.TermGrid object, column
+# names (e.g., v_VDW_12_6), or (family,params) tuples in the order of the
+# column name. AutoDock4 parameters are read once and kept in memory. Terms are
+# calculated by pair_data.PairData.
+#
+# Example:
+# from SFSXplorer import api
+# terms = ["v_VDW_12_6","v_Elec_Log_-8.5525_78.4_7.7839_0.003627"]
+# x = api.score("1abc/lig.pdbqt","1abc/receptor.pdbqt",terms)   # Vector
+# X = api.score(["lig1.pdbqt","lig2.pdbqt"],"receptor.pdbqt",terms)  # Matrix
+# names = [column["name"] for column in api.columns(terms)]
+#
+################################################################################
+# Dr. Walter F. de Azevedo, Jr.                                                #
+# https://azevedolab.net/                                                      #
+# January 12, 2023                                                             #
+################################################################################
+#
+# Import section
+import io
+import os
+import contextlib
+import numpy as np
+from SFSXplorer import FF_AD4 as ad4
+from SFSXplorer import pair_data as pd
+from SFSXplorer import term_grid as tg
+
+# AutoDock4 parameters distributed with SFSXplorer
+PAR_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(
+                        __file__))),"misc","data","AD4.1_bound.dat")
+
+# ParTable objects for each parameter file (read once)
+par_tables = {}
+
+# Define get_par_table() function
+def get_par_table(par_file=None):
+    """Function to return AutoDock4 parameters for pairs of atom types"""
+
+    # Parameter file
+    if par_file is None:
+        par_file = PAR_FILE
+    if par_file not in par_tables:
+        if not os.path.isfile(par_file):
+            raise FileNotFoundError("I can't find "+par_file+" file")
+        pot = ad4.InterMol(par_file)
+        par_tables[par_file] = pd.ParTable(pot,pot.read_AD4_bound())
+
+    # Return ParTable object
+    return par_tables[par_file]
+
+# Define get_atoms() function
+def get_atoms(atoms,par_file=None):
+    """Function to return coordinates, charges, and atom types of a PDBQT file
+    or of a tuple of arrays"""
+
+    # PDBQT file
+    if isinstance(atoms,(str,os.PathLike)):
+        if not os.path.isfile(atoms):
+            raise FileNotFoundError("I can't find "+str(atoms)+" file")
+        atom_list = get_par_table(par_file).pot.read_PDBQT(atoms)
+        return pd.PairData.get_atoms(None,atom_list)
+
+    # Arrays (atom types with two characters, as in PDBQT files)
+    xyz,q,types = atoms
+    xyz = np.asarray(xyz,dtype=float).reshape(-1,3)
+    q = np.asarray(q,dtype=float).reshape(-1)
+    types = [str(t).ljust(2) for t in types]
+    if not len(xyz) == len(q) == len(types):
+        raise ValueError("Coordinates, charges, and atom types must have the "+
+                            "same number of atoms")
+
+    # Return arrays
+    return xyz,q,types
+
+# Define get_grid() function
+def get_grid(term_grid):
+    """Function to return a TermGrid object with columns"""
+
+    # Return grid
+    if isinstance(term_grid,tg.TermGrid):
+        return term_grid
+    return tg.TermGrid(term_grid)
+
+# Define columns() function
+def columns(term_grid):
+    """Function to return index, name, family, and parameters of columns"""
+
+    # Return list of dictionaries
+    return [term._asdict() for term in get_grid(term_grid)]
+
+# Define score() function
+def score(ligand,receptor,term_grid,par_file=None):
+    """Function to return energy terms of a ligand (vector) or of a list of
+    ligands (matrix with a row for each ligand) with a receptor"""
+
+    # Parameters, receptor, and columns
+    par_table = get_par_table(par_file)
+    receptor = get_atoms(receptor,par_file)
+    grid = get_grid(term_grid)
+
+    # Looping through ligands
+    ligands = ligand if isinstance(ligand,list) else [ligand]
+    x = np.empty((len(ligands),len(grid)))
+    for i,lig in enumerate(ligands):
+
+        # Pairwise data (lookups of unknown atom types show messages and
+        # raise errors)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                pair = pd.PairData(par_table,get_atoms(lig,par_file),receptor)
+        except (UnboundLocalError,NameError):
+            raise ValueError("Unknown atom types in ligand "+str(i)+
+                                " or receptor") from None
+        x[i] = grid.compute(pair)
+
+    # Return vector or matrix
+    return x if isinstance(ligand,list) else x[0]
@@ -0,0 +1,864 @@
+#!/usr/bin/env python3
+#
+################################################################################
+# SFSXplorer                                                                   #
+# Scoring Function Space eXplorer                                              #
+################################################################################
+#
+# Class to calculate metrics for all energy terms (columns) of the scoring
+# function space at once. Columns are standardized once and each metric is
+# obtained from matrix products over blocks of columns, which avoids calling
+# SciPy and Scikit-Learn functions for every single column. It also carries out
+# permutation tests with permutations of the experimental data shared by all
+# columns, giving empirical p-values and family-wise error rate (FWER)
+# adjusted p-values based on the maximum statistic (Westfall & Young, 1993;
+# Phipson & Smyth, 2010). Kendall tau-b (Kendall, 1945) and the concordance
+# index (Harrell et al., 1982) are calculated in O(n log n) for each column by
+# counting discordant pairs with a bottom-up merge sort (Knight, 1966) carried
+# out for a whole block of columns at once, with the sort order of the
+# experimental data shared by all columns. For virtual screening, ROC AUC,
+# BEDROC (Truchon & Bayly, 2007), and enrichment factors are obtained from a
+# single sort of each block of columns. Metrics for groups of rows (e.g.,
+# binding types) are obtained from grouped sums (one-hot matrix products)
+# over the feature matrix. Calibrated metrics are obtained from closed-form
+# least-squares fits of the experimental data on each column, with k-fold and
+# leave-one-out cross-validation from the same sufficient statistics. Linear
+# models combining one column of each family of energy terms are evaluated
+# from a Gram matrix calculated once, with batches of small linear systems
+# solved at once and leave-one-out errors from the diagonal of the hat matrix.
+# Redundant columns are clustered from column-column correlations calculated
+# in blocks, so the full correlation matrix is never stored.
+#
+# References:
+# Harrell FE Jr, Califf RM, Pryor DB, Lee KL, Rosati RA. Evaluating the Yield
+# of Medical Tests. JAMA. 1982; 247(18): 2543–2546.
+#
+# Kendall MG. The Treatment of Ties in Ranking Problems. Biometrika. 1945;
+# 33(3): 239–251.
+#
+# Knight WR. A Computer Method for Calculating Kendall's Tau with Ungrouped
+# Data. J Am Stat Assoc. 1966; 61(314): 436–439.
+#
+# Phipson B, Smyth GK. Permutation P-values Should Never Be Zero: Calculating
+# Exact P-values When Permutations Are Randomly Drawn. Stat Appl Genet Mol
+# Biol. 2010; 9(1): Article 39.
+#
+# Truchon JF, Bayly CI. Evaluating Virtual Screening Methods: Good and Bad
+# Metrics for the "Early Recognition" Problem. J Chem Inf Model. 2007; 47(2):
+# 488–508.
+#
+# Walsh I, Fishman D, Garcia-Gasulla D, Titma T, Pollastri G;
+# ELIXIR Machine Learning Focus Group; Harrow J, Psomopoulos FE, Tosatto SCE.
+# DOME: recommendations for supervised machine learning validation in biology.
+# Nat Methods. 2021; 18(10): 1122–1127.
+#
+# Westfall PH, Young SS. Resampling-Based Multiple Testing: Examples and
+# Methods for p-Value Adjustment. New York: Wiley; 1993.
+#
+################################################################################
+# Dr. Walter F. de Azevedo, Jr.                                                #
+# https://azevedolab.net/                                                      #
+# January 12, 2023                                                             #
+################################################################################
+#
+# Import section
+import numpy as np
+
+# Define BatchMetrics() class
+class BatchMetrics(object):
+    """Class to calculate metrics for all columns of a feature matrix at once"""
+
+    # Define constructor method
+    def __init__(self,y_exp,x_in,block_size=10000):
+        """Constructor method
+
+            Inputs
+            y_exp       : Experimental array (n_rows)
+            x_in        : Feature matrix (n_rows x n_columns)
+            block_size  : Number of columns per matrix product
+            """
+
+        # Set up attributes
+        self.y_exp = np.asarray(y_exp,dtype=float)
+        self.x_in = np.asarray(x_in,dtype=float)
+        self.block_size = max(1,int(block_size))
+        self.n_rows,self.n_cols = self.x_in.shape
+
+        # Standardized arrays are set up on demand by set_standardized()
+        self.z_x = None
+
+    # Define set_standardized() method
+    def set_standardized(self):
+        """Method to set up standardized arrays for Pearson and Spearman
+        correlations (only once)"""
+
+        # Check whether arrays are available
+        if self.z_x is not None:
+            return
+
+        # Get standardized arrays
+        self.z_x = self.standardize(self.x_in)
+        self.z_rank_x = self.standardize(self.rank(self.x_in))
+        self.z_y = self.standardize(self.y_exp)
+        self.z_rank_y = self.standardize(self.rank(self.y_exp))
+
+    # Define set_target() method
+    def set_target(self,y_exp):
+        """Method to replace the experimental array, keeping the standardized
+        feature matrix for targets with data for the same rows"""
+
+        # Set up new experimental array
+        self.y_exp = np.asarray(y_exp,dtype=float)
+
+        # Update standardized experimental arrays
+        if self.z_x is not None:
+            self.z_y = self.standardize(self.y_exp)
+            self.z_rank_y = self.standardize(self.rank(self.y_exp))
+
+    # Define rank() method
+    def rank(self,a):
+        """Method to rank data along rows (average ranks for ties)"""
+
+        # Import section
+        from scipy import stats
+
+        # Return ranks
+        return stats.rankdata(a,axis=0)
+
+    # Define standardize() method
+    def standardize(self,a):
+        """Method to center array along rows and scale it to unit norm.
+        Constant columns become NaN"""
+
+        # Center and scale
+        a_c = a - np.mean(a,axis=0)
+        norm = np.sqrt(np.sum(a_c**2,axis=0))
+        with np.errstate(divide="ignore",invalid="ignore"):
+            z = a_c/norm
+
+        # Return standardized array
+        return z
+
+    # Define blocks() method
+    def blocks(self):
+        """Method to return slices of columns with block_size columns"""
+
+        # Return list of slices
+        return [slice(i,min(i+self.block_size,self.n_cols))
+                for i in range(0,self.n_cols,self.block_size)]
+
+    # Define correlation_p_value() method
+    def correlation_p_value(self,r,n=None):
+        """Method to calculate two-sided p-values for correlation coefficients
+        based on the t distribution (same as scipy.stats.pearsonr and
+        scipy.stats.spearmanr)"""
+
+        # Import section
+        from scipy import stats
+
+        # Calculate t statistic and p-value
+        if n is None:
+            n = self.n_rows
+        df = np.asarray(n,dtype=float) - 2
+        with np.errstate(divide="ignore",invalid="ignore"):
+            t = r*np.sqrt(df/((1.0 - r)*(1.0 + r)))
+        p = 2*stats.t.sf(np.abs(t),df)
+
+        # Return p-value
+        return p
+
+    # Define correlations() method
+    def correlations(self):
+        """Method to calculate Pearson and Spearman correlation coefficients
+        and p-values for all columns"""
+
+        # Invoke set_standardized() method
+        self.set_standardized()
+
+        # Calculate correlation coefficients (one matrix product each)
+        r = np.clip(self.z_y @ self.z_x,-1.0,1.0)
+        rho = np.clip(self.z_rank_y @ self.z_rank_x,-1.0,1.0)
+
+        # Return coefficients and p-values
+        return r,self.correlation_p_value(r),rho,self.correlation_p_value(rho)
+
+    # Define errors() method
+    def errors(self):
+        """Method to calculate MAE, MSE, RMSE, RSS, R2, and standard deviation
+        for all columns"""
+
+        # Set up residuals
+        res = self.y_exp[:,np.newaxis] - self.x_in
+
+        # Calculate metrics
+        mae = np.mean(np.abs(res),axis=0)
+        rss = np.sum(res**2,axis=0)
+        mse = rss/self.n_rows
+        rmse = np.sqrt(mse)
+        tss = np.sum((self.y_exp - np.mean(self.y_exp))**2)
+        with np.errstate(divide="ignore",invalid="ignore"):
+            r2 = 1.0 - rss/tss
+        std_dev = np.std(self.x_in,axis=0,ddof=1)
+
+        # Return metrics
+        return mae,mse,rmse,rss,r2,std_dev
+
+    # Define permutations() method
+    def permutations(self,n_perm,seed):
+        """Method to return n_perm permutations of row indices (n_perm x
+        n_rows) shared by all columns"""
+
+        # Set up random number generator
+        rng = np.random.default_rng(seed)
+
+        # Return permutations
+        return rng.permuted(np.tile(np.arange(self.n_rows),(n_perm,1)),axis=1)
+
+    # Define permutation_test() method
+    def permutation_test(self,z_y,z_x,perm,perm_batch):
+        """Method to carry out a permutation test of the correlation between
+        z_y and every column of z_x. Each batch of permutations is scored
+        against each block of columns with a single matrix product.
+
+            Inputs
+            z_y         : Standardized experimental array (n_rows)
+            z_x         : Standardized feature matrix (n_rows x n_columns)
+            perm        : Permutations of row indices (n_perm x n_rows)
+            perm_batch  : Number of permutations per matrix product
+
+            Outputs
+            p_perm      : Empirical p-value for each column
+            max_null    : Maximum |r| over all columns for each permutation
+            """
+
+        # Set up arrays
+        n_perm = perm.shape[0]
+        r_abs = np.abs(z_y @ np.nan_to_num(z_x))
+        count = np.zeros(self.n_cols)
+        max_null = np.zeros(n_perm)
+
+        # Tolerance to count permutations identical to the observed data
+        tol = 1e-12
+
+        # Looping through blocks of columns
+        for block in self.blocks():
+            z_block = np.nan_to_num(z_x[:,block]).T
+            r_block = r_abs[block][:,np.newaxis] - tol
+
+            # Looping through batches of permutations
+            for i in range(0,n_perm,perm_batch):
+                batch = slice(i,min(i+perm_batch,n_perm))
+                r_null = np.abs(z_block @ z_y[perm[batch]].T)
+                count[block] += np.sum(r_null >= r_block,axis=1)
+                max_null[batch] = np.maximum(max_null[batch],
+                                             np.max(r_null,axis=0))
+
+        # Calculate empirical p-values (Phipson & Smyth, 2010)
+        p_perm = (count + 1.0)/(n_perm + 1.0)
+        p_perm[np.isnan(np.sum(z_x,axis=0))] = np.nan
+
+        # Return results
+        return p_perm,max_null
+
+    # Define fwer() method
+    def fwer(self,r,max_null,alpha):
+        """Method to calculate FWER-adjusted p-values and the |r| threshold
+        from the null distribution of the maximum statistic"""
+
+        # Sort null distribution
+        n_perm = len(max_null)
+        max_sorted = np.sort(max_null)
+
+        # Count permutations whose maximum is at least |r|
+        r_abs = np.abs(r) - 1e-12
+        count = n_perm - np.searchsorted(max_sorted,r_abs,side="left")
+        p_fwer = (count + 1.0)/(n_perm + 1.0)
+        p_fwer[np.isnan(r)] = np.nan
+
+        # Threshold for |r| at the alpha level
+        threshold = np.quantile(max_null,1.0 - alpha)
+
+        # Return results
+        return p_fwer,threshold
+
+    # Define permutation_bundle() method
+    def permutation_bundle(self,n_perm,perm_batch=100,seed=None,alpha=0.05):
+        """Method to carry out permutation tests for Pearson and Spearman
+        correlation coefficients using the same permutations"""
+
+        # Get permutations and correlation coefficients
+        perm = self.permutations(n_perm,seed)
+        r,_,rho,_ = self.correlations()
+
+        # Pearson correlation coefficient
+        p_perm_r,max_null_r = self.permutation_test(self.z_y,self.z_x,perm,
+                                                        perm_batch)
+        p_fwer_r,threshold_r = self.fwer(r,max_null_r,alpha)
+
+        # Spearman rank correlation coefficient
+        p_perm_rho,max_null_rho = self.permutation_test(self.z_rank_y,
+                                                self.z_rank_x,perm,perm_batch)
+        p_fwer_rho,threshold_rho = self.fwer(rho,max_null_rho,alpha)
+
+        # Return results
+        return p_perm_r,p_fwer_r,threshold_r,p_perm_rho,p_fwer_rho,threshold_rho
+
+    # Define tied_pairs() method
+    def tied_pairs(self,same):
+        """Method to count tied pairs from a boolean array (n_rows-1 x
+        n_columns) that is True where a sorted row is tied with the previous
+        one"""
+
+        # Get position of each row and of the first row of its run of ties
+        idx = np.arange(same.shape[0]+1)[:,np.newaxis]
+        start = np.where(np.vstack((np.zeros((1,same.shape[1]),dtype=bool),
+                                    same)),0,idx)
+        start = np.maximum.accumulate(start,axis=0)
+
+        # Each row is tied with all previous rows of its run
+        return np.sum(idx - start,axis=0).astype(float)
+
+    # Define count_inversions() method
+    def count_inversions(self,a):
+        """Method to count inversions (pairs i < j with a[i] > a[j]) in every
+        column of a using a bottom-up merge sort over all columns at once.
+        Each level merges runs of width w with a stable argsort of width 2w,
+        which numpy carries out with timsort: the two sorted halves are found
+        as runs and merged in linear time (insertion sort below 64 values),
+        so each level is O(n) and the count O(n log n) for each column"""
+
+        # Set up array with one sequence per row padded to a power of two
+        n_seq,n = a.shape[1],a.shape[0]
+        n_pad = 1
+        while n_pad < n:
+            n_pad *= 2
+        seq = np.full((n_seq,n_pad),np.inf)
+        seq[:,:n] = a.T
+        inv = np.zeros(n_seq)
+
+        # Merge sorted runs of width w
+        w = 1
+        while w < n_pad:
+            runs = seq.reshape(n_seq,n_pad//(2*w),2*w)
+            order = np.argsort(runs,axis=2,kind="stable")     # Linear merge
+
+            # Left elements placed after each right element are greater
+            pos = np.arange(2*w)
+            right = order >= w
+            n_left_before = pos - (order - w)
+            inv += np.sum(np.where(right,w - n_left_before,0),axis=(1,2))
+
+            # Update sequences with merged runs
+            seq = np.take_along_axis(runs,order,axis=2).reshape(n_seq,n_pad)
+            w *= 2
+
+        # Return number of inversions
+        return inv
+
+    # Define kendall() method
+    def kendall(self):
+        """Method to calculate Kendall tau-b and the concordance index
+        (C-index) for all columns"""
+
+        # Sort experimental data once (shared by all columns)
+        order_y = np.argsort(self.y_exp,kind="stable")
+        y_sorted = self.y_exp[order_y]
+        same_y = y_sorted[1:] == y_sorted[:-1]
+        group_y = np.concatenate(([0],np.cumsum(~same_y)))
+        has_ties_y = np.any(same_y)
+
+        # Number of pairs and pairs tied in y
+        n = self.n_rows
+        n0 = n*(n - 1)/2.0
+        n2 = self.tied_pairs(same_y[:,np.newaxis])[0]
+
+        # Set up arrays
+        tau_b = np.zeros(self.n_cols)
+        c_index = np.zeros(self.n_cols)
+
+        # Looping through blocks of columns
+        for block in self.blocks():
+            x_y = self.x_in[order_y,block]
+
+            # Break ties in y by x (lexicographic sort for each column)
+            if has_ties_y:
+                order_x = np.argsort(x_y,axis=0,kind="stable")
+                order_g = np.argsort(group_y[order_x],axis=0,kind="stable")
+                order_x = np.take_along_axis(order_x,order_g,axis=0)
+                x_y = np.take_along_axis(x_y,order_x,axis=0)
+                g_x = group_y[order_x]
+            else:
+                g_x = np.broadcast_to(group_y[:,np.newaxis],x_y.shape)
+
+            # Pairs tied in x and pairs tied in both x and y
+            x_sorted = np.sort(x_y,axis=0)
+            n1 = self.tied_pairs(x_sorted[1:] == x_sorted[:-1])
+            n3 = self.tied_pairs((x_y[1:] == x_y[:-1])&(g_x[1:] == g_x[:-1]))
+
+            # Discordant pairs are inversions of x sorted by (y,x)
+            n_d = self.count_inversions(x_y)
+            n_c = n0 - n1 - n2 + n3 - n_d
+
+            # Calculate Kendall tau-b and C-index
+            with np.errstate(divide="ignore",invalid="ignore"):
+                tau_b[block] = (n_c - n_d)/np.sqrt((n0 - n1)*(n0 - n2))
+                c_index[block] = (n_c + 0.5*(n1 - n3))/(n0 - n2)
+
+        # Columns with missing data
+        missing = np.isnan(np.sum(self.x_in,axis=0)) | \
+                    np.isnan(np.sum(self.y_exp))
+        tau_b[missing] = np.nan
+        c_index[missing] = np.nan
+
+        # Return results
+        return tau_b,c_index
+
+    # Define average_ranks() method
+    def average_ranks(self,a_sorted,same=None):
+        """Method to return average ranks (starting at 1) of the rows of an
+        array sorted along rows. Ties may be given as a boolean array that is
+        True where a row is tied with the previous one"""
+
+        # Get first and last positions of each run of ties
+        n = a_sorted.shape[0]
+        idx = np.arange(n)[:,np.newaxis]
+        if same is None:
+            same = a_sorted[1:] == a_sorted[:-1]
+        no_tie = np.ones((1,a_sorted.shape[1]),dtype=bool)
+        first = np.maximum.accumulate(
+                np.where(np.vstack((no_tie,~same)),idx,0),axis=0)
+        last = np.minimum.accumulate(
+                np.where(np.vstack((~same,no_tie)),idx,n)[::-1],axis=0)[::-1]
+
+        # Return average ranks
+        return 0.5*(first + last) + 1.0
+
+    # Define enrichment() method
+    def enrichment(self,alpha=20.0,ef_fractions=(0.01,0.05,0.10),
+                    ascending=True):
+        """Method to calculate ROC AUC, BEDROC, and enrichment factors for all
+        columns. y_exp holds the activity labels (1 for actives and 0 for
+        decoys).
+
+            Inputs
+            alpha       : BEDROC early recognition parameter
+            ef_fractions: Fractions of the ranked dataset for enrichment factors
+            ascending   : True if lower scores rank first (e.g., energies)
+
+            Outputs
+            auc         : ROC AUC for each column
+            bedroc      : BEDROC for each column
+            ef          : Enrichment factors (n_fractions x n_columns)
+            """
+
+        # Set up labels
+        active = self.y_exp > 0
+        n = self.n_rows
+        n_a = float(np.sum(active))
+        n_d = n - n_a
+        r_a = n_a/n
+
+        # Set up arrays
+        auc = np.zeros(self.n_cols)
+        bedroc = np.zeros(self.n_cols)
+        ef = np.zeros((len(ef_fractions),self.n_cols))
+        n_top = [max(1,int(np.ceil(f*n))) for f in ef_fractions]
+
+        # Constants for BEDROC (Truchon & Bayly, 2007)
+        rie_random = r_a*(1.0 - np.exp(-alpha))/(np.exp(alpha/n) - 1.0)
+        factor = r_a*np.sinh(alpha/2.0)/(np.cosh(alpha/2.0) - \
+                                            np.cosh(alpha/2.0 - alpha*r_a))
+        shift = 1.0/(1.0 - np.exp(alpha*(1.0 - r_a)))
+
+        # Looping through blocks of columns
+        for block in self.blocks():
+
+            # Higher g ranks first
+            g = -self.x_in[:,block] if ascending else self.x_in[:,block]
+
+            # Single sort of the block
+            order = np.argsort(g,axis=0,kind="stable")
+            g_sorted = np.take_along_axis(g,order,axis=0)
+            active_sorted = active[order]
+            ranks = self.average_ranks(g_sorted)
+
+            # ROC AUC (Mann-Whitney U statistic)
+            sum_ranks = np.sum(np.where(active_sorted,ranks,0.0),axis=0)
+            auc[block] = (sum_ranks - n_a*(n_a + 1)/2.0)/(n_a*n_d)
+
+            # BEDROC from positions of actives (1 is the best position)
+            pos = n + 1.0 - ranks
+            rie = np.sum(np.where(active_sorted,np.exp(-alpha*pos/n),0.0),
+                            axis=0)/rie_random
+            bedroc[block] = rie*factor + shift
+
+            # Enrichment factors
+            n_found = np.cumsum(active_sorted[::-1],axis=0)
+            for i,top in enumerate(n_top):
+                ef[i,block] = (n_found[top-1]/top)/r_a
+
+        # Columns with missing data
+        missing = np.isnan(np.sum(self.x_in,axis=0))
+        auc[missing] = np.nan
+        bedroc[missing] = np.nan
+        ef[:,missing] = np.nan
+
+        # Return results
+        return auc,bedroc,ef
+
+    # Define group_ranks() method
+    def group_ranks(self,a,group):
+        """Method to return average ranks of the rows of a within each group
+        (one sort for all groups)"""
+
+        # Sort by group and then by value
+        a = a.reshape(a.shape[0],-1)
+        order = np.argsort(a,axis=0,kind="stable")
+        order_g = np.argsort(group[order],axis=0,kind="stable")
+        order = np.take_along_axis(order,order_g,axis=0)
+        a_sorted = np.take_along_axis(a,order,axis=0)
+        g_sorted = group[order]
+
+        # Ties have the same group and value
+        same = (a_sorted[1:] == a_sorted[:-1])&(g_sorted[1:] == g_sorted[:-1])
+        ranks_sorted = self.average_ranks(a_sorted,same)
+
+        # Subtract number of rows in previous groups
+        offset = np.concatenate(([0],np.cumsum(np.bincount(group))))[g_sorted]
+        ranks = np.empty_like(ranks_sorted)
+        np.put_along_axis(ranks,order,ranks_sorted - offset,axis=0)
+
+        # Return ranks
+        return ranks
+
+    # Define grouped_pearson() method
+    def grouped_pearson(self,y,x,one_hot):
+        """Method to calculate Pearson correlation coefficients for every group
+        (rows of one_hot.T) and column of x from grouped sums"""
+
+        # Center data with global means to reduce round-off errors
+        y = y - np.mean(y)
+        x = x - np.mean(x,axis=0)
+
+        # Grouped sums (one matrix product each)
+        n_g = np.sum(one_hot,axis=0)[:,np.newaxis]
+        s_y = (one_hot.T @ y)[:,np.newaxis]
+        s_yy = (one_hot.T @ y**2)[:,np.newaxis]
+        s_x = one_hot.T @ x
+        s_xx = one_hot.T @ x**2
+        s_xy = one_hot.T @ (y[:,np.newaxis]*x)
+
+        # Calculate correlation coefficients
+        with np.errstate(divide="ignore",invalid="ignore"):
+            cov = s_xy - s_x*s_y/n_g
+            var_x = s_xx - s_x**2/n_g
+            var_y = s_yy - s_y**2/n_g
+            r = np.clip(cov/np.sqrt(var_x*var_y),-1.0,1.0)
+
+        # Return correlation coefficients
+        return r
+
+    # Define grouped() method
+    def grouped(self,group):
+        """Method to calculate metrics for every group of rows and column.
+
+            Inputs
+            group       : Group index (0 to n_groups-1) for each row
+
+            Outputs
+            metrics     : Dictionary with arrays (n_groups x n_columns)
+            """
+
+        # Set up one-hot matrix (n_rows x n_groups)
+        group = np.asarray(group,dtype=int)
+        n_groups = np.max(group) + 1
+        one_hot = np.zeros((self.n_rows,n_groups))
+        one_hot[np.arange(self.n_rows),group] = 1.0
+        n_g = np.sum(one_hot,axis=0)
+
+        # Set up dictionary
+        metrics = {"n":np.repeat(n_g.astype(int)[:,np.newaxis],self.n_cols,
+                                    axis=1)}
+
+        # Pearson and Spearman correlation coefficients
+        metrics["r"] = self.grouped_pearson(self.y_exp,self.x_in,one_hot)
+        metrics["rho"] = self.grouped_pearson(
+                            self.group_ranks(self.y_exp,group)[:,0],
+                            self.group_ranks(self.x_in,group),one_hot)
+        metrics["p_r"] = self.correlation_p_value(metrics["r"],metrics["n"])
+        metrics["p_rho"] = self.correlation_p_value(metrics["rho"],
+                                                    metrics["n"])
+
+        # Errors from grouped sums of residuals
+        res = self.y_exp[:,np.newaxis] - self.x_in
+        y_mean = (one_hot.T @ self.y_exp)/n_g
+        tss = one_hot.T @ (self.y_exp - y_mean[group])**2
+        metrics["mae"] = (one_hot.T @ np.abs(res))/n_g[:,np.newaxis]
+        metrics["rss"] = one_hot.T @ res**2
+        metrics["mse"] = metrics["rss"]/n_g[:,np.newaxis]
+        metrics["rmse"] = np.sqrt(metrics["mse"])
+        with np.errstate(divide="ignore",invalid="ignore"):
+            metrics["r2"] = 1.0 - metrics["rss"]/tss[:,np.newaxis]
+
+        # Kendall tau-b and C-index (O(n log n) for each group)
+        metrics["tau_b"] = np.zeros((n_groups,self.n_cols))
+        metrics["c_index"] = np.zeros((n_groups,self.n_cols))
+        for g in range(n_groups):
+            rows = group == g
+            engine = BatchMetrics(self.y_exp[rows],self.x_in[rows],
+                                    self.block_size)
+            metrics["tau_b"][g],metrics["c_index"][g] = engine.kendall()
+
+        # Return metrics
+        return metrics
+
+    # Define linear_fit() method
+    def linear_fit(self,y,x):
+        """Method to fit y = intercept + slope*x for every column of x in
+        closed form (least squares)"""
+
+        # Calculate slope and intercept
+        x_mean = np.mean(x,axis=0)
+        y_mean = np.mean(y)
+        x_c = x - x_mean
+        with np.errstate(divide="ignore",invalid="ignore"):
+            slope = ((y - y_mean) @ x_c)/np.sum(x_c**2,axis=0)
+        intercept = y_mean - slope*x_mean
+
+        # Return results
+        return slope,intercept
+
+    # Define calibrated() method
+    def calibrated(self):
+        """Method to calculate metrics for calibrated predictions
+        (intercept + slope*x) of all columns"""
+
+        # Fit experimental data on each column
+        slope,intercept = self.linear_fit(self.y_exp,self.x_in)
+
+        # Set up arrays
+        mae = np.zeros(self.n_cols)
+        rss = np.zeros(self.n_cols)
+
+        # Looping through blocks of columns
+        for block in self.blocks():
+            res = self.y_exp[:,np.newaxis] - (intercept[block] + \
+                                                slope[block]*self.x_in[:,block])
+            mae[block] = np.mean(np.abs(res),axis=0)
+            rss[block] = np.sum(res**2,axis=0)
+
+        # Calculate metrics
+        mse = rss/self.n_rows
+        tss = np.sum((self.y_exp - np.mean(self.y_exp))**2)
+        with np.errstate(divide="ignore",invalid="ignore"):
+            r2 = 1.0 - rss/tss
+
+        # Return results
+        return slope,intercept,mae,mse,np.sqrt(mse),r2
+
+    # Define cross_validated() method
+    def cross_validated(self,folds=None):
+        """Method to calculate cross-validated metrics of calibrated
+        predictions. Fits for each fold come from the sums over all rows minus
+        the sums over the rows of the fold.
+
+            Inputs
+            folds       : Fold index (0 to k-1) for each row, or None for
+                          leave-one-out cross-validation
+
+            Outputs
+            mae, rmse   : Cross-validated MAE and RMSE for each column
+            q2          : 1 - PRESS/TSS for each column
+            """
+
+        # Set up one-hot matrix for folds (leave-one-out has one row per fold)
+        if folds is None:
+            folds = np.arange(self.n_rows)
+        folds = np.asarray(folds,dtype=int)
+        one_hot = np.zeros((self.n_rows,np.max(folds) + 1))
+        one_hot[np.arange(self.n_rows),folds] = 1.0
+
+        # Number of training rows for each fold
+        n_train = (self.n_rows - np.sum(one_hot,axis=0))[:,np.newaxis]
+
+        # Set up arrays
+        mae = np.zeros(self.n_cols)
+        press = np.zeros(self.n_cols)
+
+        # Looping through blocks of columns
+        for block in self.blocks():
+
+            # Center with global means to reduce round-off errors
+            x = self.x_in[:,block] - np.mean(self.x_in[:,block],axis=0)
+            y = self.y_exp - np.mean(self.y_exp)
+
+            # Training sums for each fold (n_folds x n_columns)
+            s_x = np.sum(x,axis=0) - one_hot.T @ x
+            s_xx = np.sum(x**2,axis=0) - one_hot.T @ x**2
+            s_xy = y @ x - one_hot.T @ (y[:,np.newaxis]*x)
+            s_yc = np.sum(y) - one_hot.T @ y
+
+            # Closed-form fit for each fold
+            with np.errstate(divide="ignore",invalid="ignore"):
+                slope = (s_xy - s_x*s_yc[:,np.newaxis]/n_train)/\
+                        (s_xx - s_x**2/n_train)
+            intercept = s_yc[:,np.newaxis]/n_train - slope*s_x/n_train
+
+            # Predictions for rows left out
+            res = y[:,np.newaxis] - (intercept[folds] + slope[folds]*x)
+            mae[block] = np.mean(np.abs(res),axis=0)
+            press[block] = np.sum(res**2,axis=0)
+
+        # Calculate metrics
+        tss = np.sum((self.y_exp - np.mean(self.y_exp))**2)
+        with np.errstate(divide="ignore",invalid="ignore"):
+            q2 = 1.0 - press/tss
+
+        # Return results
+        return mae,np.sqrt(press/self.n_rows),q2
+
+    # Define combination_search() method
+    def combination_search(self,families,batch=10000):
+        """Method to fit linear models with one column from each family for
+        all combinations of columns, using a Gram matrix calculated once.
+
+            Inputs
+            families    : List of arrays with column indices of each family
+            batch       : Number of combinations solved at once
+
+            Outputs
+            combos      : Column indices of each combination (n_combos x
+                          n_families)
+            coef        : Slopes for each combination (n_combos x n_families)
+            intercept   : Intercept for each combination
+            r2, rmse    : R2 and RMSE of the fit
+            q2, rmse_loo: Leave-one-out Q2 and RMSE
+            """
+
+        # Standardize candidate columns (Gram matrix and cross-products)
+        cols = np.unique(np.concatenate(families))
+        x = self.x_in[:,cols]
+        x_mean = np.mean(x,axis=0)
+        x_std = np.std(x,axis=0)
+        x_std[x_std == 0] = 1.0
+        x_s = (x - x_mean)/x_std
+        y_c = self.y_exp - np.mean(self.y_exp)
+        gram = x_s.T @ x_s
+        x_y = x_s.T @ y_c
+        tss = y_c @ y_c
+
+        # Position of each family column in the candidate array
+        pos = [np.searchsorted(cols,f) for f in families]
+        sizes = [len(f) for f in families]
+        n_combos = int(np.prod(sizes))
+        n_f = len(families)
+
+        # Set up arrays
+        combos = np.zeros((n_combos,n_f),dtype=int)
+        coef = np.zeros((n_combos,n_f))
+        intercept = np.zeros(n_combos)
+        rss = np.zeros(n_combos)
+        press = np.zeros(n_combos)
+
+        # Looping through batches of combinations
+        for i in range(0,n_combos,batch):
+            idx = np.arange(i,min(i+batch,n_combos))
+            sel = np.stack([pos[f][j] for f,j in
+                            enumerate(np.unravel_index(idx,sizes))],axis=1)
+
+            # Small linear systems for the batch (n_batch x n_f x n_f)
+            g = gram[sel[:,:,np.newaxis],sel[:,np.newaxis,:]]
+            g += 1e-10*np.eye(n_f)
+            g_inv = np.linalg.inv(g)
+            beta = np.einsum("bij,bj->bi",g_inv,x_y[sel])
+
+            # Residuals and leverages (hat matrix diagonal)
+            x_b = x_s[:,sel]                            # n x n_batch x n_f
+            res = y_c[:,np.newaxis] - np.einsum("nbi,bi->nb",x_b,beta)
+            lev = 1.0/self.n_rows + \
+                np.einsum("nbi,bij,nbj->nb",x_b,g_inv,x_b)
+            rss[idx] = np.sum(res**2,axis=0)
+            with np.errstate(divide="ignore",invalid="ignore"):
+                press[idx] = np.sum((res/(1.0 - lev))**2,axis=0)
+
+            # Slopes in the original units
+            combos[idx] = cols[sel]
+            coef[idx] = beta/x_std[sel]
+
+            # Intercepts (means of columns calculated once)
+            intercept[idx] = np.mean(self.y_exp) - \
+                                np.sum(coef[idx]*x_mean[sel],axis=1)
+
+        # Metrics
+        with np.errstate(divide="ignore",invalid="ignore"):
+            r2 = 1.0 - rss/tss
+            q2 = 1.0 - press/tss
+
+        # Return results
+        return combos,coef,intercept,r2,np.sqrt(rss/self.n_rows),q2,\
+                np.sqrt(press/self.n_rows)
+
+    # Define redundancy_clusters() method
+    def redundancy_clusters(self,threshold):
+        """Method to cluster columns whose absolute Pearson correlation is at
+        least threshold (single linkage). Correlations are calculated for
+        pairs of blocks of columns and only the cluster labels are kept.
+
+            Outputs
+            labels      : Cluster label for each column (0 to n_clusters-1)
+            """
+
+        # Import section
+        from scipy.sparse import coo_matrix
+        from scipy.sparse.csgraph import connected_components
+
+        # Invoke set_standardized() method
+        self.set_standardized()
+        z_x = np.nan_to_num(self.z_x)
+
+        # Each column starts in its own cluster
+        labels = np.arange(self.n_cols)
+        blocks = self.blocks()
+
+        # Looping through pairs of blocks (upper triangle)
+        for i,block_i in enumerate(blocks):
+            for block_j in blocks[i:]:
+                corr = np.abs(z_x[:,block_i].T @ z_x[:,block_j])
+                rows,cols = np.nonzero(corr >= threshold)
+                rows += block_i.start
+                cols += block_j.start
+                keep = rows != cols
+                if not np.any(keep):
+                    continue
+
+                # Merge clusters linked by these pairs
+                edges = coo_matrix((np.ones(np.sum(keep)),
+                                (labels[rows[keep]],labels[cols[keep]])),
+                                shape=(self.n_cols,self.n_cols))
+                _,merged = connected_components(edges,directed=False)
+                labels = merged[labels]
+
+        # Return labels numbered from zero
+        return np.unique(labels,return_inverse=True)[1]
+
+    # Define top_n() method
+    def top_n(self,a,n,largest=True):
+        """Method to return the indices of the n best values of a (ranked)
+        by partial selection. NaN values rank last"""
+
+        # Best values as the smallest ones (NaN as worst)
+        a = np.asarray(a,dtype=float)
+        key = -a if largest else a.copy()
+        key[np.isnan(key)] = np.inf
+        n = min(n,len(key))
+        if n <= 0:
+            return np.zeros(0,dtype=int)
+
+        # Partial selection followed by sorting of the selected values only
+        if n < len(key):
+            idx = np.argpartition(key,n-1)[:n]
+        else:
+            idx = np.arange(len(key))
+
+        # Return ranked indices
+        return idx[np.argsort(key[idx],kind="stable")]
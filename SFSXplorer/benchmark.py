@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+#
+################################################################################
+# SFSXplorer                                                                   #
+# Scoring Function Space eXplorer                                              #
+################################################################################
+#
+# Classes to benchmark SFSXplorer on synthetic data. Ligand and receptor PDBQT
+# files of controlled size and atom-type mix are generated (no external data
+# needed). The benchmark times parsing of the AutoDock4 parameter file and of
+# PDBQT files, parameter lookup for each pair of atom types, each energy term
+# (FF_AD4.InterMol) for an increasing number of receptor atoms, and, end to end,
+# write_energy() and Stats.bundle() on small synthetic datasets. Results are
+# written as JSON and compared with a stored baseline, and slower timings are
+# reported as regressions.
+#
+################################################################################
+# Dr. Walter F. de Azevedo, Jr.                                                #
+# https://azevedolab.net/                                                      #
+# January 12, 2023                                                             #
+################################################################################
+#
+# Import section
+import os
+import sys
+import time
+import numpy as np
+from SFSXplorer import sfs
+from SFSXplorer import FF_AD4 as ad4
+from SFSXplorer import term_grid as tg
+from SFSXplorer import statistical_analysis as sa
+
+# Atom-type mix (fraction of atoms) of ligands and receptors
+LIGAND_TYPES = {"C ":0.45,"A ":0.15,"OA":0.15,"N ":0.05,"NA":0.05,"HD":0.15}
+RECEPTOR_TYPES = {"C ":0.40,"A ":0.05,"OA":0.15,"N ":0.15,"NA":0.03,"SA":0.02,
+                    "HD":0.20}
+
+# Parameters of energy terms timed by the benchmark (as columns of sfs.in)
+KERNEL_PARAMS = {"VDW":(12,6),"HB":(12,10),
+                "Elec_Log":(-8.5525,78.4,7.7839,0.003627),
+                "Elec_Tanh":(-8.5525,78.4,7.7839,0.003627),
+                "Elec_Log_Tanh":(-8.5525,78.4,7.7839,0.003627),
+                "Desol":(2.0,2.0,3.6)}
+
+# Define SyntheticData() class
+class SyntheticData(object):
+    """Class to write synthetic ligand and receptor PDBQT files"""
+
+    # Define constructor method
+    def __init__(self,dataset_dir,seed=0,ligand_types=None,
+                receptor_types=None):
+        """Constructor method"""
+
+        # Set up attributes
+        self.dataset_dir = dataset_dir      # Folder with one folder per complex
+        self.rng = np.random.default_rng(seed)
+        self.ligand_types = LIGAND_TYPES if ligand_types is None else \
+                                ligand_types
+        self.receptor_types = RECEPTOR_TYPES if receptor_types is None else \
+                                receptor_types
+
+    # Define write_pdbqt() method
+    def write_pdbqt(self,file_out,types,xyz,res_name):
+        """Method to write atoms in the PDBQT columns read by FF_AD4"""
+
+        # Atom types drawn from the mix
+        names = list(types.keys())
+        p = np.array([types[name] for name in names],dtype=float)
+        atom_types = self.rng.choice(len(names),size=len(xyz),p=p/np.sum(p))
+        charges = self.rng.normal(0.0,0.25,len(xyz))
+
+        # Write atoms
+        fo_out = open(file_out,"w")
+        for i,(x,y,z) in enumerate(xyz):
+            atom = names[atom_types[i]]
+            fo_out.write("{:6s}{:5d} {:<4s} {:3s} {:1s}{:4d}    {:8.3f}{:8.3f}"
+                        "{:8.3f}{:6.2f}{:6.2f}    {:6.3f} {:<2s}\n".format(
+                        "ATOM",i+1,atom.strip(),res_name,"A",1+i//10,x,y,z,
+                        1.0,0.0,charges[i],atom))
+        if res_name == "LIG":
+            fo_out.write("TORSDOF 5\n")
+        fo_out.close()
+
+    # Define write_complex() method
+    def write_complex(self,name_dir,n_lig,n_rec):
+        """Method to write a complex (ligand in a sphere with the receptor in
+        a shell around it, so no atom pair is closer than 2.5 A)"""
+
+        # Ligand atoms inside a sphere (about 1.5 A between atoms)
+        r_lig = 1.5*n_lig**(1.0/3.0)
+        xyz_lig = self.rng.normal(size=(n_lig,3))
+        xyz_lig *= (r_lig*self.rng.random(n_lig)**(1.0/3.0)/
+                    np.linalg.norm(xyz_lig,axis=1))[:,np.newaxis]
+
+        # Receptor atoms in a shell around the ligand
+        r_in = r_lig + 2.5
+        r_out = (r_in**3 + 1.5**3*n_rec)**(1.0/3.0)
+        xyz_rec = self.rng.normal(size=(n_rec,3))
+        radius = (r_in**3 + (r_out**3 - r_in**3)*
+                    self.rng.random(n_rec))**(1.0/3.0)
+        xyz_rec *= (radius/np.linalg.norm(xyz_rec,axis=1))[:,np.newaxis]
+
+        # Write files
+        os.makedirs(name_dir,exist_ok=True)
+        self.write_pdbqt(name_dir+"lig.pdbqt",self.ligand_types,xyz_lig,"LIG")
+        self.write_pdbqt(name_dir+"receptor.pdbqt",self.receptor_types,xyz_rec,
+                        "ALA")
+
+    # Define write_dataset() method
+    def write_dataset(self,n_complexes,n_lig,n_rec):
+        """Method to write complexes and their ligands.in (random pKd), and
+        return the path of ligands.in"""
+
+        # Write complexes and ligands.in
+        os.makedirs(self.dataset_dir,exist_ok=True)
+        ligands_in = self.dataset_dir+"ligands.in"
+        fo_out = open(ligands_in,"w")
+        fo_out.write("PDB,Ligand,Binding,pKd\n")
+        for c in range(n_complexes):
+            code = "S{:03d}".format(c)
+            self.write_complex(self.dataset_dir+code+"/",n_lig,n_rec)
+            fo_out.write(code+",LIG,Kd,{:.2f},0\n".format(
+                                                    self.rng.uniform(4.0,10.0)))
+        fo_out.close()
+
+        # Return file
+        return ligands_in
+
+# Define Benchmark() class
+class Benchmark(sfs.Explorer):
+    """Class to time parsing, parameter lookup, energy terms, write_energy(),
+    and Stats.bundle() on synthetic data"""
+
+    # Define constructor method
+    def __init__(self,sfs_in):
+        """Constructor method"""
+
+        # Set up attributes
+        self.sfs_in = sfs_in
+
+        # Show message
+        print("\nBenchmarking SFSXplorer on synthetic data...")
+
+    # Define read_benchmark_in() method
+    def read_benchmark_in(self):
+        """Method to read parameters for benchmarks"""
+
+        # Import section
+        import csv
+
+        # Invoke read_input() method (ranges of parameters for write_energy())
+        self.read_input()
+
+        # Set up default values
+        self.benchmark_dir = "benchmark/"   # Folder for data and results
+        self.benchmark_sizes = [100,400,1600]   # Receptor atoms
+        self.benchmark_ligand_atoms = 30    # Ligand atoms
+        self.benchmark_complexes = 4        # Complexes for write_energy()
+        self.benchmark_repeats = 5          # Repeats (best and median kept)
+        self.benchmark_seed = 0             # Seed for synthetic data
+        self.benchmark_baseline = None      # JSON baseline to compare with
+        self.benchmark_tolerance = 0.25     # Slowdown reported as regression
+        self.ligand_types = dict(LIGAND_TYPES)
+        self.receptor_types = dict(RECEPTOR_TYPES)
+
+        # Looping through sfs.in
+        fo_in = open(self.sfs_in,"r")
+        for line in csv.reader(fo_in):
+            if len(line) < 2 or line[0] == "#":
+                continue
+            elif line[0].strip() == "benchmark_dir":
+                self.benchmark_dir = line[1].strip()
+            elif line[0].strip() == "benchmark_sizes":
+                self.benchmark_sizes = [int(ele) for ele in line[1:]
+                                        if ele.strip() != ""]
+            elif line[0].strip() == "benchmark_ligand_atoms":
+                self.benchmark_ligand_atoms = int(line[1].strip())
+            elif line[0].strip() == "benchmark_complexes":
+                self.benchmark_complexes = int(line[1].strip())
+            elif line[0].strip() == "benchmark_repeats":
+                self.benchmark_repeats = int(line[1].strip())
+            elif line[0].strip() == "benchmark_seed":
+                self.benchmark_seed = int(line[1].strip())
+            elif line[0].strip() == "benchmark_baseline":
+                self.benchmark_baseline = line[1].strip()
+            elif line[0].strip() == "benchmark_tolerance":
+                self.benchmark_tolerance = float(line[1].strip())
+            elif line[0].strip() in ["benchmark_ligand_types",
+                                        "benchmark_receptor_types"]:
+                # Atom types and fractions (e.g., C:0.5,OA:0.3,HD:0.2)
+                types = {}
+                for ele in line[1:]:
+                    if ele.strip() != "":
+                        atom,fraction = ele.split(":")
+                        types["{:<2s}".format(atom.strip())] = float(fraction)
+                if line[0].strip() == "benchmark_ligand_types":
+                    self.ligand_types = types
+                else:
+                    self.receptor_types = types
+        fo_in.close()
+
+        # Set up output file
+        if not self.benchmark_dir.endswith("/"):
+            self.benchmark_dir += "/"
+        os.makedirs(self.benchmark_dir,exist_ok=True)
+        self.benchmark_out = self.benchmark_dir+"benchmark.json"
+
+        # Options of write_energy() that add work not being timed
+        self.run_report = False
+        self.trace = False
+        self.profile_slowest = 0
+        self.prune_warmup = 0
+
+    # Define time_it() method
+    def time_it(self,function,*args):
+        """Method to return the best and median wall time of a function call
+        (output discarded). Fast functions are called in loops of at least
+        20 ms, and the time of each of the benchmark_repeats loops is divided
+        by its number of calls"""
+
+        # Import section
+        import io
+        import contextlib
+
+        with contextlib.redirect_stdout(io.StringIO()):
+
+            # Warm-up loops to set the number of calls per loop
+            n_calls = 1
+            while True:
+                t0 = time.perf_counter()
+                for i in range(n_calls):
+                    function(*args)
+                if time.perf_counter() - t0 >= 0.02:
+                    break
+                n_calls *= 2
+
+            # Time loops
+            times = []
+            for j in range(self.benchmark_repeats):
+                t0 = time.perf_counter()
+                for i in range(n_calls):
+                    function(*args)
+                times.append((time.perf_counter() - t0)/n_calls)
+
+        # Return results
+        return {"best":min(times),"median":float(np.median(times)),
+                "calls":n_calls}
+
+    # Define lookup() method
+    def lookup(self,pot,par_list,family,pairs):
+        """Method to look up parameters of all pairs of atom types (as in the
+        loops of FF_AD4.InterMol)"""
+
+        # Looping through pairs of atom types
+        for atom_i,atom_j in pairs:
+            if family == "VDW":
+                try:
+                    pot.get_atom_par_VDW(par_list,atom_i,atom_j)
+                except:
+                    pot.get_atom_par_VDW_fallback(atom_i,atom_j)
+            elif family == "HB":
+                pot.get_atom_par_HB(par_list,atom_i,atom_j)
+            else:
+                pot.get_atom_par_Desol(par_list,atom_i,atom_j)
+
+    # Define kernel() method
+    def kernel(self,pot,par_list,lig_list,receptor_list,family):
+        """Method to calculate an energy term with KERNEL_PARAMS"""
+
+        # Invoke reference() function (same calls as calc_terms())
+        return tg.reference(pot,par_list,lig_list,receptor_list,family,
+                            KERNEL_PARAMS[family])
+
+    # Define explore() method
+    def explore(self,ligands_in,dataset_dir,scores_out):
+        """Method to run write_energy() on a dataset"""
+
+        # Invoke read_data() and write_energy() methods
+        self.ligands_in = ligands_in
+        self.dataset_dir = dataset_dir
+        self.scores_out = scores_out
+        self.read_data()
+        self.write_energy()
+
+    # Define write_stats_in() method
+    def write_stats_in(self,stats_in,scores_out):
+        """Method to write input of Stats with all columns of scores_out"""
+
+        # Columns with energy terms
+        fo_scores = open(scores_out,"r")
+        terms = [ele for ele in fo_scores.readline().strip().split(",")
+                    if ele.startswith("v_")]
+        fo_scores.close()
+
+        # Write input file
+        fo_stats = open(stats_in,"w")
+        fo_stats.write("scores_out,"+scores_out+"\n")
+        fo_stats.write("exp_string,pKd\n")
+        fo_stats.write("n_features_in,"+str(len(terms))+"\n")
+        fo_stats.write("features_in,"+",".join(terms)+"\n")
+        fo_stats.close()
+
+    # Define run() method
+    def run(self):
+        """Method to run all benchmarks for each number of receptor atoms"""
+
+        # Import section
+        import io
+        import contextlib
+
+        # Instantiate an object of the InterMol() class
+        pot = ad4.InterMol("misc/data/AD4.1_bound.dat")
+
+        # Size-independent benchmarks (parsing and parameter lookup)
+        self.results = {}
+        self.results["read_AD4_bound"] = {"all":self.time_it(
+                                                        pot.read_AD4_bound)}
+        par_list = pot.read_AD4_bound()
+        pairs = [(atom_i,atom_j) for atom_i in self.ligand_types
+                    for atom_j in self.receptor_types]
+        for family in ["VDW","HB","Desol"]:
+            self.results["lookup_"+family] = {"all":self.time_it(self.lookup,
+                                                pot,par_list,family,pairs)}
+        print("Parameter lookup: ",len(pairs)," pairs of atom types")
+
+        # Looping through sizes
+        for n_rec in self.benchmark_sizes:
+            size = str(n_rec)
+            print("\nReceptor atoms: ",n_rec,", ligand atoms: ",
+                    self.benchmark_ligand_atoms)
+
+            # Synthetic dataset
+            dataset_dir = self.benchmark_dir+"data_"+size+"/"
+            data = SyntheticData(dataset_dir,self.benchmark_seed+n_rec,
+                                self.ligand_types,self.receptor_types)
+            ligands_in = data.write_dataset(self.benchmark_complexes,
+                                    self.benchmark_ligand_atoms,n_rec)
+
+            # PDBQT parsing
+            name_dir = dataset_dir+"S000/"
+            self.add_result("read_PDBQT",size,self.time_it(pot.read_PDBQT,
+                                                name_dir+"receptor.pdbqt"))
+            lig_list = pot.read_PDBQT(name_dir+"lig.pdbqt")
+            receptor_list = pot.read_PDBQT(name_dir+"receptor.pdbqt")
+
+            # Energy terms
+            for family in KERNEL_PARAMS:
+                self.add_result(family,size,self.time_it(self.kernel,pot,
+                                par_list,lig_list,receptor_list,family))
+
+            # End to end
+            scores_out = self.benchmark_dir+"scores_"+size+".csv"
+            self.add_result("write_energy",size,self.time_it(self.explore,
+                                        ligands_in,dataset_dir,scores_out))
+            stats_in = self.benchmark_dir+"stats_"+size+".in"
+            self.write_stats_in(stats_in,scores_out)
+            with contextlib.redirect_stdout(io.StringIO()):
+                data1 = sa.Stats(stats_in)
+                data1.read_stats_in()
+                data1.read_data()
+            self.add_result("Stats.bundle",size,self.time_it(data1.bundle))
+
+    # Define add_result() method
+    def add_result(self,name,size,result):
+        """Method to keep and show the timing of a benchmark"""
+
+        # Keep result
+        if name not in self.results:
+            self.results[name] = {}
+        self.results[name][size] = result
+
+        # Show message
+        print("{:<16s} best {:12.6f} s, median {:12.6f} s".format(name,
+                                            result["best"],result["median"]))
+
+    # Define write_benchmark() method
+    def write_benchmark(self):
+        """Method to write results and compare them with the baseline (a
+        missing baseline file is created from these results)"""
+
+        # Import section
+        import json
+        import shutil
+        import platform
+
+        # Write results
+        report = {"python":platform.python_version(),"numpy":np.__version__,
+                "machine":platform.machine(),"processor":platform.processor(),
+                "date":time.strftime("%Y-%m-%d %H:%M:%S"),
+                "repeats":self.benchmark_repeats,
+                "ligand_atoms":self.benchmark_ligand_atoms,
+                "complexes":self.benchmark_complexes,
+                "ligand_types":self.ligand_types,
+                "receptor_types":self.receptor_types,
+                "results":self.results}
+        fo_out = open(self.benchmark_out,"w")
+        json.dump(report,fo_out,indent=1)
+        fo_out.close()
+        print("\nBenchmark written in "+self.benchmark_out)
+
+        # Store as baseline or compare with it
+        if self.benchmark_baseline is None:
+            print("\nDone!")
+            return
+        elif not os.path.isfile(self.benchmark_baseline):
+            shutil.copyfile(self.benchmark_out,self.benchmark_baseline)
+            print("Baseline written in "+self.benchmark_baseline)
+            print("\nDone!")
+            return
+
+        # Invoke compare() method
+        regressions = self.compare()
+        if len(regressions) > 0:
+            sys.exit("\nError! "+str(len(regressions))+" regressions (more "+
+                    "than "+str(100*self.benchmark_tolerance)+"% slower): "+
+                    ", ".join(regressions))
+        print("\nDone!")
+
+    # Define compare() method
+    def compare(self):
+        """Method to show the ratio of best times to those of the baseline and
+        return the benchmarks that are slower than the tolerance"""
+
+        # Import section
+        import json
+
+        # Read baseline
+        fo_base = open(self.benchmark_baseline,"r")
+        baseline = json.load(fo_base)["results"]
+        fo_base.close()
+
+        # Looping through benchmarks in both results
+        regressions = []
+        print("\nComparison with "+self.benchmark_baseline)
+        print("{:<16s}{:>8s}{:>14s}{:>14s}{:>8s}".format("Benchmark","Size",
+                                        "Baseline (s)","Current (s)","Ratio"))
+        for name in self.results:
+            for size in self.results[name]:
+                if name not in baseline or size not in baseline[name]:
+                    continue
+                t_base = baseline[name][size]["best"]
+                t_now = self.results[name][size]["best"]
+                ratio = t_now/t_base if t_base > 0 else np.inf
+                flag = ""
+                if ratio > 1.0 + self.benchmark_tolerance:
+                    flag = " REGRESSION"
+                    regressions.append(name+"@"+size)
+                elif ratio < 1.0/(1.0 + self.benchmark_tolerance):
+                    flag = " faster"
+                print("{:<16s}{:>8s}{:14.6f}{:14.6f}{:8.2f}{}".format(name,size,
+                                                t_base,t_now,ratio,flag))
+
+        # Return list of regressions
+        return regressions
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+#
+################################################################################
+# SFSXplorer                                                                   #
+# Scoring Function Space eXplorer                                              #
+################################################################################
+#
+# Class to compress the energy terms of the Scoring Function Space (one row for
+# each complex and one column for each term) with principal component analysis
+# (PCA) based on a randomized singular value decomposition (Halko et al., 2011).
+# The CSV file is converted once to a binary file with one row for each column
+# (term), and the randomized SVD reads it in blocks of columns, so the whole
+# matrix is never loaded into memory. Components are written to a NumPy file
+# and the projected scores (one row for each complex) to a CSV file.
+#
+# References:
+# Halko N, Martinsson PG, Tropp JA. Finding Structure with Randomness:
+# Probabilistic Algorithms for Constructing Approximate Matrix Decompositions.
+# SIAM Rev. 2011; 53(2): 217–288.
+#
+################################################################################
+# Dr. Walter F. de Azevedo, Jr.                                                #
+# https://azevedolab.net/                                                      #
+# January 12, 2023                                                             #
+################################################################################
+#
+# Import section
+import warnings
+import numpy as np
+
+# Define Compressor() class
+class Compressor(object):
+    """Class to compress the energy terms with a streaming randomized PCA"""
+
+    # Define constructor method
+    def __init__(self,sfs_in):
+        """Constructor method"""
+
+        # Set up attribute
+        self.sfs_in = sfs_in        # Input file with parameters
+
+        # Show message
+        print("\n\nCompressing energy terms...")
+
+    # Define read_compress_in() method
+    def read_compress_in(self):
+        """Method to read parameters for compression"""
+
+        # Import section
+        import csv
+        import sys
+
+        # Set up default values
+        self.n_components = 100     # Number of principal components
+        self.oversample = 10        # Additional random vectors
+        self.power_iter = 2         # Power iterations
+        self.compress_seed = None   # Seed for random vectors
+        self.compress_scale = True  # Scale terms to unit variance
+        self.block_columns = 10000  # Columns per block
+
+        # Try to open sfs.in file
+        try:
+            fo_in = open(self.sfs_in,"r")
+        except IOError:
+            sys.exit("\nIOError! I can't find "+self.sfs_in+" file!")
+
+        # Looping through sfs.in
+        for line in csv.reader(fo_in):
+            if len(line) < 2 or line[0] == "#":
+                continue
+            elif line[0].strip() == "scores_out":
+                self.scores_out = str(line[1])
+            elif line[0].strip() == "n_components":
+                self.n_components = int(line[1].strip())
+            elif line[0].strip() == "oversample":
+                self.oversample = int(line[1].strip())
+            elif line[0].strip() == "power_iter":
+                self.power_iter = int(line[1].strip())
+            elif line[0].strip() == "compress_seed":
+                self.compress_seed = int(line[1].strip())
+            elif line[0].strip() == "compress_scale":
+                self.compress_scale = line[1].strip().lower() in ["yes",
+                                                                "true","1"]
+            elif line[0].strip() == "block_columns":
+                self.block_columns = int(line[1].strip())
+
+        # Close file
+        fo_in.close()
+
+        # Set up output files
+        self.matrix_tmp = self.scores_out.replace(".csv","_matrix.npy")
+        self.components_out = self.scores_out.replace(".csv",
+                                                        "_pca_components.npy")
+        self.model_out = self.scores_out.replace(".csv","_pca_model.npz")
+        self.pca_scores_out = self.scores_out.replace(".csv","_pca_scores.csv")
+
+    # Define read_data() method
+    def read_data(self):
+        """Method to convert energy terms (columns starting with v_) of the
+        CSV file to a binary file with one row for each term, reading one line
+        at a time"""
+
+        # Count lines and get header
+        fo_data = open(self.scores_out,"r")
+        self.header = fo_data.readline().strip().split(",")
+        n_rows = sum(1 for line in fo_data if line.strip() != "")
+        fo_data.close()
+
+        # Columns with energy terms
+        self.cols = [i for i,term in enumerate(self.header)
+                        if term.startswith("v_")]
+        self.terms = [self.header[i] for i in self.cols]
+        self.n_rows,self.n_cols = n_rows,len(self.cols)
+        print("\nMatrix with ",self.n_rows," complexes and ",self.n_cols,
+                " energy terms")
+
+        # Set up binary file (terms x complexes)
+        self.matrix = np.lib.format.open_memmap(self.matrix_tmp,mode="w+",
+                            dtype=np.float64,shape=(self.n_cols,self.n_rows))
+
+        # Looping through lines
+        cols = np.array(self.cols)
+        self.ids = []
+        fo_data = open(self.scores_out,"r")
+        fo_data.readline()
+        r = 0
+        for line in fo_data:
+            if line.strip() == "":
+                continue
+            fields = np.array(line.strip().split(","))
+            self.ids.append(fields[0])
+            values = fields[cols]
+            values[values == ""] = "nan"
+            self.matrix[:,r] = values.astype(np.float64)
+            r += 1
+        fo_data.close()
+        self.matrix.flush()
+
+        # Mean and standard deviation of each term (by blocks, ignoring
+        # missing values; zero mean for terms without values)
+        self.mean = np.zeros(self.n_cols)
+        self.std = np.ones(self.n_cols)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore",RuntimeWarning)
+            for block in self.blocks():
+                self.mean[block] = np.nanmean(self.matrix[block],axis=1)
+                if self.compress_scale:
+                    self.std[block] = np.nanstd(self.matrix[block],axis=1)
+        self.mean = np.nan_to_num(self.mean)
+        self.std[~(self.std > 0)] = 1.0
+
+    # Define blocks() method
+    def blocks(self):
+        """Method to return slices of columns with block_columns columns"""
+
+        # Return list of slices
+        return [slice(i,min(i+self.block_columns,self.n_cols))
+                for i in range(0,self.n_cols,self.block_columns)]
+
+    # Define get_block() method
+    def get_block(self,block):
+        """Method to return centered (and scaled) terms of a block (terms x
+        complexes). Missing values are set to zero"""
+
+        # Return block
+        z = (self.matrix[block] - self.mean[block,np.newaxis])/\
+                self.std[block,np.newaxis]
+        return np.nan_to_num(z)
+
+    # Define compress() method
+    def compress(self):
+        """Method to carry out randomized PCA by blocks of columns and write
+        components and projected scores"""
+
+        # Import section
+        import os
+
+        # Number of random vectors
+        k = min(self.n_components,self.n_rows,self.n_cols)
+        k_over = min(k + self.oversample,self.n_rows,self.n_cols)
+        blocks = self.blocks()
+
+        # Range finder Y = A*Omega (random vectors generated for each block)
+        y = np.zeros((self.n_rows,k_over))
+        for i,block in enumerate(blocks):
+            rng = np.random.default_rng([i] if self.compress_seed is None
+                                        else [self.compress_seed,i])
+            omega = rng.standard_normal((block.stop - block.start,k_over))
+            y += self.get_block(block).T @ omega
+        q,_ = np.linalg.qr(y)
+
+        # Power iterations Y = A*A^T*Q
+        for it in range(self.power_iter):
+            y = np.zeros((self.n_rows,k_over))
+            for block in blocks:
+                z = self.get_block(block)
+                y += z.T @ (z @ q)
+            q,_ = np.linalg.qr(y)
+
+        # Small matrix B*B^T with B = Q^T*A
+        m = np.zeros((k_over,k_over))
+        for block in blocks:
+            b_t = self.get_block(block) @ q
+            m += b_t.T @ b_t
+        eigval,eigvec = np.linalg.eigh(m)
+        order = np.argsort(eigval)[::-1][:k]
+        s = np.sqrt(np.maximum(eigval[order],0.0))
+        u = q @ eigvec[:,order]
+
+        # Components V = A^T*U/S written by blocks
+        s_inv = np.where(s > 0,1.0/np.where(s > 0,s,1.0),0.0)
+        components = np.lib.format.open_memmap(self.components_out,mode="w+",
+                                    dtype=np.float32,shape=(self.n_cols,k))
+        for block in blocks:
+            components[block] = (self.get_block(block) @ u)*s_inv
+        components.flush()
+        del components
+
+        # Explained variance
+        total_var = 0.0
+        for block in blocks:
+            total_var += np.sum(self.get_block(block)**2)
+        explained = s**2/total_var if total_var > 0 else np.zeros(k)
+
+        # Write projected scores (one row for each complex)
+        pca_scores = u*s
+        fo_scores = open(self.pca_scores_out,"w")
+        fo_scores.write(self.header[0]+","+
+                    ",".join(["PC"+str(j+1) for j in range(k)])+"\n")
+        for r in range(self.n_rows):
+            fo_scores.write(self.ids[r]+","+
+                            ",".join([str(v) for v in pca_scores[r]])+"\n")
+        fo_scores.close()
+
+        # Write model to project new data
+        np.savez_compressed(self.model_out,terms=np.array(self.terms),
+                            mean=self.mean,std=self.std,singular_values=s,
+                            explained_variance_ratio=explained)
+
+        # Remove temporary binary file
+        del self.matrix
+        os.remove(self.matrix_tmp)
+
+        # Show message
+        print("\nExplained variance with ",k," components: ",np.sum(explained))
+        print("Projected scores written in "+self.pca_scores_out)
+        print("Components written in "+self.components_out)
+        print("PCA model written in "+self.model_out)
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+#
+################################################################################
+# SFSXplorer                                                                   #
+# Scoring Function Space eXplorer                                              #
+################################################################################
+#
+# Classes to run SFSXplorer as a long-lived local scoring service. The server
+# listens on a Unix socket (daemon_socket) or a localhost port (daemon_port)
+# and keeps AutoDock4 parameters (pair_data.ParTable) and parsed receptors
+# warm, the latter in an LRU cache evicted by memory (daemon_cache_mb).
+# Requests are lines of JSON with a ligand PDBQT file, a receptor PDBQT file,
+# and optionally a list of column names (all columns of sfs.in by default), and
+# responses are lines of JSON with the names and values of the energy terms.
+# Requests that arrive together (within daemon_batch_wait seconds) are scored
+# as a batch, grouped by receptor. Terms are calculated by pair_data.PairData.
+#
+# Example of request and response:
+# {"ligand":"1abc/lig.pdbqt","receptor":"1abc/receptor.pdbqt",
+#  "terms":["v_VDW_12_6","v_Desol_2.0_2.0_3.0"]}
+# {"names":["v_VDW_12_6","v_Desol_2.0_2.0_3.0"],"values":[-12.3,4.56]}
+# Other requests: {"command":"stats"} and {"command":"shutdown"}.
+#
+################################################################################
+# Dr. Walter F. de Azevedo, Jr.                                                #
+# https://azevedolab.net/                                                      #
+# January 12, 2023                                                             #
+################################################################################
+#
+# Import section
+import os
+import sys
+import json
+import stat
+import time
+import queue
+import threading
+import collections
+import socketserver
+from SFSXplorer import sfs
+from SFSXplorer import FF_AD4 as ad4
+from SFSXplorer import pair_data as pd
+from SFSXplorer import term_grid as tg
+
+# Define ReceptorCache() class
+class ReceptorCache(object):
+    """Class to keep parsed receptors in an LRU cache limited by memory"""
+
+    # Define constructor method
+    def __init__(self,pot,max_mb):
+        """Constructor method"""
+
+        # Set up attributes
+        self.pot = pot              # InterMol object (read_PDBQT())
+        self.max_bytes = max_mb*1048576.0
+        self.entries = collections.OrderedDict()    # Key: (atoms, bytes)
+        self.n_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    # Define get() method
+    def get(self,file_in):
+        """Method to return coordinates, charges, and atom types of a
+        receptor (files changed on disk are read again)"""
+
+        # Key with modification time and size of the file
+        file_stat = os.stat(file_in)
+        key = (os.path.abspath(file_in),file_stat.st_mtime_ns,
+                file_stat.st_size)
+
+        # Cached receptor (most recently used at the end)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key][0]
+
+        # Parse receptor
+        atoms = pd.PairData.get_atoms(None,self.pot.read_PDBQT(file_in))
+        n_bytes = atoms[0].nbytes + atoms[1].nbytes + 64*len(atoms[2])
+
+        # Keep receptor and evict least recently used ones
+        with self.lock:
+            self.misses += 1
+            self.entries[key] = (atoms,n_bytes)
+            self.n_bytes += n_bytes
+            while self.n_bytes > self.max_bytes and len(self.entries) > 1:
+                old_key,(old_atoms,old_bytes) = self.entries.popitem(
+                                                                last=False)
+                self.n_bytes -= old_bytes
+
+        # Return atoms
+        return atoms
+
+    # Define stats() method
+    def stats(self):
+        """Method to return cache statistics"""
+
+        # Return dictionary
+        with self.lock:
+            return {"receptors":len(self.entries),
+                    "cache_mb":self.n_bytes/1048576.0,
+                    "hits":self.hits,"misses":self.misses}
+
+# Define RequestHandler() class
+class RequestHandler(socketserver.StreamRequestHandler):
+    """Class to handle a connection (one JSON request per line)"""
+
+    # Define handle() method
+    def handle(self):
+        """Method to answer requests until the client closes the connection"""
+
+        # Looping through lines
+        for line in self.rfile:
+            if line.strip() == b"":
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError:
+                request = {}
+                response = {"error":"Invalid JSON request"}
+            else:
+                if isinstance(request,dict):
+                    response = self.server.scorer.submit(request)
+                else:
+                    request = {}
+                    response = {"error":"Request must be a JSON object"}
+            self.wfile.write((json.dumps(response)+"\n").encode())
+            self.wfile.flush()
+
+            # Stop server after the response is sent
+            if request.get("command") == "shutdown":
+                threading.Thread(target=self.server.shutdown).start()
+                return
+
+# Define ThreadingTCPServer() class
+class ThreadingTCPServer(socketserver.ThreadingMixIn,socketserver.TCPServer):
+    """Class for a threaded localhost server"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+# Define Daemon() class
+class Daemon(sfs.Explorer):
+    """Class to serve scoring requests with warm caches"""
+
+    # Define constructor method
+    def __init__(self,sfs_in):
+        """Constructor method"""
+
+        # Set up attributes
+        self.sfs_in = sfs_in
+
+        # Show message
+        print("\nStarting scoring service...")
+
+    # Define read_daemon_in() method
+    def read_daemon_in(self):
+        """Method to read parameters for the scoring service"""
+
+        # Import section
+        import csv
+
+        # Invoke read_input() method (default columns)
+        self.read_input()
+
+        # Set up default values
+        self.daemon_socket = None       # Unix socket (used if given)
+        self.daemon_port = 8765         # Localhost port
+        self.daemon_cache_mb = 256.0    # Memory for parsed receptors
+        self.daemon_batch_wait = 0.01   # Seconds to wait for a batch
+        self.daemon_batch_max = 32      # Requests in a batch
+
+        # Looping through sfs.in
+        fo_in = open(self.sfs_in,"r")
+        for line in csv.reader(fo_in):
+            if len(line) < 2 or line[0] == "#":
+                continue
+            elif line[0].strip() == "daemon_socket":
+                self.daemon_socket = line[1].strip()
+            elif line[0].strip() == "daemon_port":
+                self.daemon_port = int(line[1].strip())
+            elif line[0].strip() == "daemon_cache_mb":
+                self.daemon_cache_mb = float(line[1].strip())
+            elif line[0].strip() == "daemon_batch_wait":
+                self.daemon_batch_wait = float(line[1].strip())
+            elif line[0].strip() == "daemon_batch_max":
+                self.daemon_batch_max = int(line[1].strip())
+        fo_in.close()
+
+    # Define start() method
+    def start(self):
+        """Method to set up warm caches and the batching thread"""
+
+        # Parameters and receptors
+        self.pot = ad4.InterMol("misc/data/AD4.1_bound.dat")
+        self.par_table = pd.ParTable(self.pot,self.pot.read_AD4_bound())
+        self.receptors = ReceptorCache(self.pot,self.daemon_cache_mb)
+
+        # Default columns and grids of requested columns
+        self.get_term_grid()
+        self.grids = {}
+
+        # Queue of requests and batching thread
+        self.queue = queue.Queue()
+        self.n_requests = 0
+        self.n_batches = 0
+        self.batcher = threading.Thread(target=self.batch_loop,daemon=True)
+        self.batcher.start()
+
+    # Define submit() method
+    def submit(self,request):
+        """Method to queue a request and wait for its response (called by
+        connection threads)"""
+
+        # Commands
+        if request.get("command") == "stats":
+            response = self.receptors.stats()
+            response.update({"requests":self.n_requests,
+                            "batches":self.n_batches})
+            return response
+        elif request.get("command") == "shutdown":
+            return {"status":"shutting down"}
+
+        # Scoring request
+        reply = {"event":threading.Event()}
+        self.queue.put((request,reply))
+        reply["event"].wait()
+        return reply["response"]
+
+    # Define batch_loop() method
+    def batch_loop(self):
+        """Method to score queued requests in batches grouped by receptor"""
+
+        # Looping forever (daemon thread)
+        while True:
+            batch = [self.queue.get()]
+            t_end = time.perf_counter() + self.daemon_batch_wait
+            while len(batch) < self.daemon_batch_max:
+                try:
+                    batch.append(self.queue.get(timeout=max(0.0,
+                                                t_end - time.perf_counter())))
+                except queue.Empty:
+                    break
+
+            # Score requests (same receptor together)
+            self.n_batches += 1
+            batch.sort(key=lambda item: str(item[0].get("receptor","")))
+            for request,reply in batch:
+                self.n_requests += 1
+                try:
+                    reply["response"] = self.score_request(request)
+                except Exception as err:
+                    reply["response"] = {"error":type(err).__name__+": "+
+                                            str(err)}
+                reply["event"].set()
+
+    # Define get_grid() method
+    def get_grid(self,names):
+        """Method to return the grid of requested columns (cached for repeated
+        lists)"""
+
+        # Default columns
+        if names is None:
+            return self.term_grid
+
+        # Parse names
+        key = tuple(names)
+        if key not in self.grids:
+            self.grids[key] = tg.TermGrid(names)
+        return self.grids[key]
+
+    # Define score_request() method
+    def score_request(self,request):
+        """Method to return names and values of the terms of a request"""
+
+        # Check files
+        for key in ["ligand","receptor"]:
+            if key not in request:
+                return {"error":"Missing "+key}
+            elif not os.path.isfile(request[key]):
+                return {"error":"I can't find "+request[key]+" file"}
+
+        # Atoms and pairwise data
+        receptor = self.receptors.get(request["receptor"])
+        ligand = self.pot.read_PDBQT(request["ligand"])
+        pair = pd.PairData(self.par_table,ligand,receptor)
+
+        # Check columns (list of column names)
+        names = request.get("terms")
+        if names is not None and (not isinstance(names,list) or
+                            not all([isinstance(name,str) for name in names])):
+            return {"error":"terms must be a list of column names"}
+
+        # Return terms
+        grid = self.get_grid(names)
+        return {"names":grid.names,"values":grid.compute(pair).tolist()}
+
+    # Define serve() method
+    def serve(self):
+        """Method to serve requests until a shutdown request"""
+
+        # Set up server (Unix socket or localhost port)
+        if self.daemon_socket is not None:
+            if os.path.exists(self.daemon_socket):
+                if not stat.S_ISSOCK(os.stat(self.daemon_socket).st_mode):
+                    sys.exit("\nError! "+self.daemon_socket+
+                                " exists and is not a socket!")
+                os.remove(self.daemon_socket)
+            self.server = socketserver.ThreadingUnixStreamServer(
+                                        self.daemon_socket,RequestHandler)
+            self.server.daemon_threads = True
+            address = self.daemon_socket
+        else:
+            self.server = ThreadingTCPServer(("127.0.0.1",self.daemon_port),
+                                                RequestHandler)
+            address = "127.0.0.1:"+str(self.server.server_address[1])
+        self.server.scorer = self
+
+        # Serve requests
+        print("Listening on "+address+" ("+str(len(self.term_grid))+
+                " default columns)")
+        sys.stdout.flush()
+        self.server.serve_forever()
+        self.server.server_close()
+        if self.daemon_socket is not None and \
+                                    os.path.exists(self.daemon_socket) and \
+                    stat.S_ISSOCK(os.stat(self.daemon_socket).st_mode):
+            os.remove(self.daemon_socket)
+        print("\nDone!")
+
+# Define request() function
+def request(address,message):
+    """Function to send a request to a running service (address is a Unix
+    socket path or a localhost port) and return its response"""
+
+    # Import section
+    import socket
+
+    # Connect
+    if isinstance(address,int) or str(address).isdigit():
+        sock = socket.create_connection(("127.0.0.1",int(address)))
+    else:
+        sock = socket.socket(socket.AF_UNIX,socket.SOCK_STREAM)
+        sock.connect(address)
+
+    # Send request and read response
+    fo_sock = sock.makefile("rwb")
+    fo_sock.write((json.dumps(message)+"\n").encode())
+    fo_sock.flush()
+    response = json.loads(fo_sock.readline())
+    fo_sock.close()
+    sock.close()
+
+    # Return response
+    return response
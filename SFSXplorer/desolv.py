@@ -63,3 +63,20 @@ class PairwisePotDesol(object):
 
         # Return result
         return v
+
+    # Define potential_grad() method
+    def potential_grad(self,vol_i,sol_i,vol_j,sol_j,r,m,n,sigma):
+        """Method to calculate pairwise potential energy and its derivatives
+        with respect to m, n, and sigma (r may be an array)"""
+
+        # Calculate v(r)
+        g = r**n/(2*sigma**m)
+        v = ((vol_i*sol_i) + (vol_j*sol_j))*np.exp(-g)
+
+        # Derivatives
+        d_m = v*g*np.log(sigma)
+        d_n = -v*g*np.log(r)
+        d_sigma = v*g*m/sigma
+
+        # Return results
+        return v,d_m,d_n,d_sigma
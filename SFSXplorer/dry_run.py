@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+#
+################################################################################
+# SFSXplorer                                                                   #
+# Scoring Function Space eXplorer                                              #
+################################################################################
+#
+# Class to check the input of an exploration before any energy term is
+# calculated. It parses sfs.in and ligands.in, checks that every ligand and
+# receptor PDBQT file exists and parses (coordinates, charges, and atom types
+# in the columns read by FF_AD4), counts atoms and atom types, and flags atom
+# types without AutoDock4 parameters. Then it calculates the exact number of
+# columns and pair evaluations, and estimates run time and size of the output
+# from a quick calibration (one parameter set of each family on a few
+# complexes of median size).
+#
+################################################################################
+# Dr. Walter F. de Azevedo, Jr.                                                #
+# https://azevedolab.net/                                                      #
+# January 12, 2023                                                             #
+################################################################################
+#
+# Import section
+import os
+import sys
+import time
+import numpy as np
+from SFSXplorer import sfs
+from SFSXplorer import FF_AD4 as ad4
+from SFSXplorer import pair_data as pd
+from SFSXplorer import term_grid as tg
+
+# Keys of sfs.in required by write_energy()
+REQUIRED_KEYS = ["dataset_dir","ligands_in","scores_out",
+        "pot_VDW_m_min","pot_VDW_m_max","pot_VDW_n_min","pot_VDW_n_max",
+        "pot_HB_m_min","pot_HB_m_max","pot_HB_n_min","pot_HB_n_max",
+        "lambda_i","lambda_f","n_lambda","k_i","k_f","n_k","A_i","A_f","n_A",
+        "epsilon0_i","epsilon0_f","n_epsilon0","m_desol_i","m_desol_f",
+        "n_m_desol","n_desol_i","n_desol_f","n_n_desol","sigma_desol_i",
+        "sigma_desol_f","n_sigma_desol"]
+
+# Largest number of columns whose names are enumerated (counts and header
+# length of larger grids are calculated from the numbers of parameters)
+DRY_RUN_NAMES = 100000
+
+# Define count_pairs() function
+def count_pairs(n_min,n_max,m_min,m_max):
+    """Function to return the number of exponents (n, m) with n != m"""
+
+    # Return pairs without the common exponents
+    n_n = max(0,n_max - n_min + 1)
+    n_m = max(0,m_max - m_min + 1)
+    return n_n*n_m - max(0,min(n_max,m_max) - max(n_min,m_min) + 1)
+
+# Define mean_length() function
+def mean_length(values):
+    """Function to return the mean length of values written as strings"""
+
+    # Return mean
+    return np.mean([len(str(v)) for v in values]) if len(values) > 0 else 0.0
+
+# Define DryRun() class
+class DryRun(sfs.Explorer):
+    """Class to check input and estimate the cost of an exploration"""
+
+    # Define constructor method
+    def __init__(self,sfs_in):
+        """Constructor method"""
+
+        # Set up attributes
+        self.sfs_in = sfs_in
+        self.errors = []            # Problems that stop the exploration
+        self.warnings = []          # Problems that change results
+
+        # Show message
+        print("\nDry run of the exploration of the Scoring Function Space...")
+
+    # Define read_dry_run_in() method
+    def read_dry_run_in(self):
+        """Method to read sfs.in and check its parameters"""
+
+        # Import section
+        import csv
+
+        # Invoke read_input() method (invalid numbers are errors)
+        if not os.path.isfile(self.sfs_in):
+            sys.exit("\nError! I can't find "+self.sfs_in+" file!")
+        try:
+            self.read_input()
+        except ValueError as err:
+            sys.exit("\nError! Invalid number in "+self.sfs_in+": "+str(err))
+
+        # Set up default values
+        self.dry_run_calibrate = 2      # Complexes for calibration
+
+        # Looping through sfs.in
+        fo_in = open(self.sfs_in,"r")
+        for line in csv.reader(fo_in):
+            if len(line) < 2 or line[0] == "#":
+                continue
+            elif line[0].strip() == "dry_run_calibrate":
+                self.dry_run_calibrate = int(line[1].strip())
+        fo_in.close()
+
+        # Missing keys
+        missing = [key for key in REQUIRED_KEYS if not hasattr(self,key)]
+        if len(missing) > 0:
+            sys.exit("\nError! Missing keys in "+self.sfs_in+": "+
+                        ", ".join(missing))
+
+        # Ranges of parameters
+        for key in ["pot_VDW_m","pot_VDW_n","pot_HB_m","pot_HB_n"]:
+            if getattr(self,key+"_min") > getattr(self,key+"_max"):
+                self.errors.append(key+"_min is larger than "+key+"_max")
+        for key in ["lambda","k","A","epsilon0","m_desol","n_desol",
+                    "sigma_desol"]:
+            if getattr(self,"n_"+key) < 1:
+                self.errors.append("n_"+key+" must be at least 1")
+        if not os.path.isfile(self.ligands_in):
+            sys.exit("\nError! I can't find "+self.ligands_in+" file!")
+        if not os.path.isdir(os.path.dirname(os.path.abspath(
+                                                    self.scores_out))):
+            self.errors.append("Folder of scores_out "+self.scores_out+
+                                " doesn't exist")
+        self.dry_run_out = self.scores_out.replace(".csv","_dry_run.json")
+
+    # Define count_columns() method
+    def count_columns(self):
+        """Method to return the exact number of columns of each family from
+        the numbers of parameters, without enumerating them. The length of
+        the names of the columns in the header (self.terms_length) and the
+        first parameter set of each family (self.first_params) are kept.
+        Names are enumerated only for grids with up to DRY_RUN_NAMES columns
+        (and only then are columns_in and columns_filter applied)"""
+
+        # van der Waals and hydrogen-bond columns (n != m)
+        columns = {}
+        for family,key in [("VDW","pot_VDW_"),("HB","pot_HB_")]:
+            columns[family] = count_pairs(getattr(self,key+"n_min"),
+                            getattr(self,key+"n_max"),getattr(self,key+"m_min"),
+                            getattr(self,key+"m_max"))
+
+        # Electrostatic and desolvation columns (grid or samples)
+        elec_keys = ["A","epsilon0","k","lambda"]
+        desol_keys = ["m_desol","n_desol","sigma_desol"]
+        if self.sampling == "grid":
+            n_elec = int(np.prod([getattr(self,"n_"+key) for key in elec_keys]))
+            n_desol = int(np.prod([getattr(self,"n_"+key)
+                                    for key in desol_keys]))
+        elif self.sampling in ["sobol","lhs"]:
+            n_elec,n_desol = self.sample_sizes(columns["VDW"]+columns["HB"])
+        else:
+            sys.exit("\nError! Sampling must be grid, sobol, or lhs!")
+        for family in pd.ELEC_WEIGHTS:
+            columns[family] = n_elec
+        columns["Desol"] = n_desol
+
+        # Names of small grids
+        if sum(columns.values()) <= DRY_RUN_NAMES:
+            self.get_term_grid()
+            self.terms_length = len(",".join(self.term_grid.names))
+            self.first_params = dict([(family,self.term_grid.params(family)[0])
+                                for family in pd.FAMILIES
+                                if len(self.term_grid.family(family)) > 0])
+            return self.term_grid.counts()
+        if len(self.columns_in) > 0 or len(self.columns_filter) > 0:
+            self.warnings.append("columns_in and columns_filter are not "+
+                    "applied to estimates of grids with more than "+
+                    str(DRY_RUN_NAMES)+" columns")
+
+        # First parameter sets (first values of the ranges)
+        self.first_params = {}
+        for family,key in [("VDW","pot_VDW_"),("HB","pot_HB_")]:
+            n_min,m_min = getattr(self,key+"n_min"),getattr(self,key+"m_min")
+            if columns[family] > 0:
+                self.first_params[family] = (n_min,m_min) if n_min != m_min \
+                    else ((n_min,m_min+1) if m_min < getattr(self,key+"m_max")
+                        else (n_min+1,m_min))
+        for family in pd.ELEC_WEIGHTS:
+            self.first_params[family] = tuple([float(getattr(self,key+"_i"))
+                                            for key in elec_keys])
+        self.first_params["Desol"] = tuple([float(getattr(self,key+"_i"))
+                                            for key in desol_keys])
+
+        # Length of names (from up to 1000 values of each parameter)
+        self.terms_length = sum(columns.values()) - 1
+        for family,key in [("VDW","pot_VDW_"),("HB","pot_HB_")]:
+            lengths = [mean_length(np.unique(np.linspace(getattr(self,
+                        key+e+"_min"),getattr(self,key+e+"_max"),
+                        1000).astype(int))) for e in ["n","m"]]
+            self.terms_length += columns[family]*(len("v_"+family+"_") + 1 +
+                                                    sum(lengths))
+        for families,keys,n in [(list(pd.ELEC_WEIGHTS),elec_keys,n_elec),
+                                (["Desol"],desol_keys,n_desol)]:
+            lengths = 0.0
+            for key in keys:
+                lo,hi = float(getattr(self,key+"_i")),float(getattr(self,
+                                                                key+"_f"))
+                if self.sampling == "grid":
+                    n_values = getattr(self,"n_"+key)
+                    i = np.unique(np.linspace(0,max(n_values-1,0),
+                                    min(n_values,1000)).astype(int))
+                    values = lo + (hi - lo)*i/max(n_values-1,1)
+                else:
+                    # Samples rounded to six significant digits (golden
+                    # ratio sequence in place of sobol or lhs samples)
+                    u = (np.arange(1,1001)*0.6180339887498949) % 1.0
+                    values = [float("{:.6g}".format(v)) for v in
+                                lo + (hi - lo)*u]
+                lengths += mean_length(values)
+            for family in families:
+                self.terms_length += n*(len("v_"+family+"_") + len(keys) - 1 +
+                                        lengths)
+
+        # Return columns
+        return columns
+
+    # Define check_pdbqt() method
+    def check_pdbqt(self,file_in):
+        """Method to return the number of atoms and atom types of a PDBQT
+        file, or None if it doesn't exist or doesn't parse"""
+
+        # Check file
+        if not os.path.isfile(file_in):
+            self.errors.append("Missing "+file_in)
+            return None
+
+        # Looping through atom lines (as read_PDBQT() and the loops of InterMol)
+        types = {}
+        fo_in = open(file_in,"r")
+        for i,line in enumerate(fo_in):
+            if line[0:6] == "HETATM" or line[0:6] == "ATOM  ":
+                try:
+                    float(line[30:38]),float(line[38:46]),float(line[46:54])
+                    float(line[66:75])
+                except ValueError:
+                    fo_in.close()
+                    self.errors.append("Invalid coordinates or charge in "+
+                                        file_in+" line "+str(i+1))
+                    return None
+                types[line[77:79]] = types.get(line[77:79],0) + 1
+        fo_in.close()
+
+        # Empty file
+        if len(types) == 0:
+            self.errors.append("No atoms in "+file_in)
+            return None
+
+        # Return atoms and atom types
+        return sum(types.values()),types
+
+    # Define check_complexes() method
+    def check_complexes(self):
+        """Method to check ligands.in and the PDBQT files of each complex"""
+
+        # Lines with complexes
+        header = []
+        self.complexes = []         # (PDB, ligand atoms, receptor atoms,
+                                    # line length)
+        self.types_lig = {}         # Atoms of each type
+        self.types_rec = {}
+        self.complex_types = {}     # Ligand and receptor atom types
+        codes = {}
+        for line in self.csv0:
+            if len(line) == 0:
+                continue
+            elif line[0].strip() == "PDB":
+                header = line
+                continue
+            elif "#" in line[0].strip():
+                continue
+
+            # Fields (write_energy() drops the last one)
+            code = str(line[0].strip())
+            if code in codes:
+                self.warnings.append("Complex "+code+" appears more than once "+
+                                    "in "+self.ligands_in)
+            codes[code] = True
+            if len(header) > 0 and len(line) != len(header) + 1:
+                self.warnings.append("Complex "+code+" has "+str(len(line))+
+                        " fields (header has "+str(len(header))+", and the "+
+                        "last field of each line is dropped)")
+
+            # PDBQT files
+            name_dir = self.dataset_dir+code+"/"
+            lig = self.check_pdbqt(name_dir+"lig.pdbqt")
+            rec = self.check_pdbqt(name_dir+"receptor.pdbqt")
+            if lig is None or rec is None:
+                continue
+            for types,counts in [(self.types_lig,lig[1]),
+                                    (self.types_rec,rec[1])]:
+                for atom,n in counts.items():
+                    types[atom] = types.get(atom,0) + n
+            data_in = ",".join(line)+","
+            self.complexes.append((code,lig[0],rec[0],len(data_in)-3))
+            self.complex_types[code] = (set(lig[1]),set(rec[1]))
+        self.fo0.close()
+
+        # Header
+        if len(header) == 0:
+            self.errors.append("No header (PDB,...) in "+self.ligands_in)
+        self.header_length = len(",".join(header)+",")
+        if len(self.complexes) == 0:
+            self.errors.append("No valid complexes in "+self.ligands_in)
+
+    # Define check_types() method
+    def check_types(self,pot,par_list):
+        """Method to flag atom types without AutoDock4 parameters and pairs of
+        atom types for which parameter lookup fails (errors if it raises an
+        exception, which stops write_energy(), and warnings if it shows a
+        message)"""
+
+        # Import section
+        import io
+        import contextlib
+
+        # Atom types of the parameter file
+        known = set([line[9:11] for line in par_list])
+        for atom in sorted(set(self.types_lig) | set(self.types_rec)):
+            if atom not in known:
+                self.warnings.append("Unknown atom type '"+atom.strip()+"' ("+
+                        str(self.types_lig.get(atom,0))+" ligand and "+
+                        str(self.types_rec.get(atom,0))+" receptor atoms)")
+
+        # Looping through pairs of atom types found in the same complex
+        par_table = pd.ParTable(pot,par_list)
+        self.bad_pairs = set()
+        for atom_i in sorted(self.types_lig):
+            for atom_j in sorted(self.types_rec):
+                n_complexes = sum([atom_i in lig and atom_j in rec for lig,rec
+                                    in self.complex_types.values()])
+                if n_complexes == 0:
+                    continue
+                pair = "('"+atom_i.strip()+"','"+atom_j.strip()+"') in "+\
+                        str(n_complexes)+" complexes"
+                for family,get in [("VDW",par_table.get_vdw),
+                                ("HB",par_table.get_hb),
+                                ("Desol",par_table.get_desol)]:
+                    message = io.StringIO()
+                    try:
+                        with contextlib.redirect_stdout(message):
+                            par_ij = get(atom_i,atom_j)
+                    except Exception as err:
+                        self.bad_pairs.add((atom_i,atom_j))
+                        self.errors.append(family+" parameter lookup fails "+
+                            "for pair "+pair+" ("+type(err).__name__+")")
+                        continue
+                    if par_ij is None or message.getvalue().strip() != "":
+                        self.warnings.append(family+" parameters not found "+
+                            "for pair "+pair)
+
+    # Define calibrate() method
+    def calibrate(self,pot,par_list,columns):
+        """Method to return the time of one term of each family per pair
+        evaluation, time to read a complex, and mean length of a value in the
+        output, from complexes of median size"""
+
+        # Import section
+        import io
+        import contextlib
+
+        # Complexes of median size (without pairs of atom types that fail)
+        valid = [c for c in self.complexes if not any([(atom_i,atom_j) in
+                    self.bad_pairs for atom_i in self.complex_types[c[0]][0]
+                    for atom_j in self.complex_types[c[0]][1]])]
+        if len(valid) == 0:
+            return None
+        pairs = np.array([n_lig*n_rec for code,n_lig,n_rec,n in valid])
+        order = np.argsort(np.abs(pairs - np.median(pairs)))
+        sample = [valid[i] for i in order[:self.dry_run_calibrate]]
+
+        # One parameter set of each family (the first column)
+        params = dict([(family,self.first_params[family]) for family
+                        in columns if columns[family] > 0])
+
+        # Looping through complexes
+        t_pair = dict([(family,0.0) for family in columns])
+        t_read = 0.0
+        lengths = []
+        n_pairs = 0
+        for code,n_lig,n_rec,n in sample:
+            name_dir = self.dataset_dir+code+"/"
+            t0 = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                lig_list = pot.read_PDBQT(name_dir+"lig.pdbqt")
+                receptor_list = pot.read_PDBQT(name_dir+"receptor.pdbqt")
+            t_read += time.perf_counter() - t0
+            n_pairs += n_lig*n_rec
+
+            # One term of each family (skipped for families without columns)
+            for family in columns:
+                if family not in params:
+                    continue
+                t0 = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    v = tg.reference(pot,par_list,lig_list,receptor_list,
+                                        family,params[family])
+                t_pair[family] += time.perf_counter() - t0
+                lengths.append(len(str(v)))
+
+        # Return time per pair evaluation, time per complex, and value length
+        for family in t_pair:
+            t_pair[family] /= max(n_pairs,1)
+        return t_pair,t_read/len(sample),np.mean(lengths)
+
+    # Define run() method
+    def run(self):
+        """Method to check input and estimate run time and output size"""
+
+        # Import section
+        import json
+
+        # Columns of each family
+        columns = self.count_columns()
+        n_columns = sum(columns.values())
+        print("\nColumns: ",n_columns)
+        for family in columns:
+            print("  {:<15s}{:>12d}".format(family,columns[family]))
+
+        # Complexes and atom types
+        self.check_complexes()
+        pot = ad4.InterMol("misc/data/AD4.1_bound.dat")
+        par_list = pot.read_AD4_bound()
+        self.check_types(pot,par_list)
+        print("\nValid complexes: ",len(self.complexes))
+        for name,types in [("Ligand",self.types_lig),
+                            ("Receptor",self.types_rec)]:
+            print(name+" atom types: "+", ".join(["{}:{}".format(atom.strip(),
+                    n) for atom,n in sorted(types.items())]))
+
+        # Pair evaluations
+        n_pairs = sum([n_lig*n_rec for code,n_lig,n_rec,n in self.complexes])
+        n_evaluations = n_pairs*n_columns
+        print("\nAtom pairs: ",n_pairs)
+        print("Pair evaluations: ",n_evaluations)
+
+        # Estimates from calibration
+        report = {"columns":columns,"complexes":len(self.complexes),
+                "pairs":n_pairs,"pair_evaluations":n_evaluations,
+                "ligand_types":self.types_lig,"receptor_types":self.types_rec}
+        calibration = None
+        if len(self.complexes) > 0:
+            calibration = self.calibrate(pot,par_list,columns)
+        if calibration is not None:
+            t_pair,t_read,length = calibration
+            t_run = len(self.complexes)*t_read + \
+                    n_pairs*sum([t_pair[f]*columns[f] for f in columns])
+            size = self.header_length + self.terms_length + 1 + \
+                    sum([n + 1 + n_columns*(length+1) for code,n_lig,n_rec,n
+                        in self.complexes])
+            report.update({"seconds_per_pair_evaluation":t_pair,
+                        "seconds_to_read_complex":t_read,
+                        "estimated_run_time":t_run,
+                        "estimated_output_bytes":int(size)})
+            print("\nEstimated run time: "+self.format_time(t_run)+
+                    " ("+self.format_time(t_run/max(self.n_workers,1))+
+                    " with "+str(self.n_workers)+" workers, ideal)")
+            if size < 1048576:
+                print("Estimated output size: {:.1f} kB".format(size/1024.0))
+            else:
+                print("Estimated output size: {:.1f} MB".format(
+                                                            size/1048576.0))
+            if self.prune_warmup > 0:
+                print("Pruning after warm-up may reduce both estimates")
+
+        # Write report
+        report["warnings"] = self.warnings
+        report["errors"] = self.errors
+        fo_out = open(self.dry_run_out,"w")
+        json.dump(report,fo_out,indent=1)
+        fo_out.close()
+        print("\nDry run written in "+self.dry_run_out)
+
+        # Show problems
+        for warning in self.warnings:
+            print("Warning! "+warning)
+        if len(self.errors) > 0:
+            sys.exit("\nError! "+str(len(self.errors))+" problems found:\n"+
+                        "\n".join(self.errors))
+        print("\nDone!")
+
+    # Define format_time() method
+    def format_time(self,seconds):
+        """Method to return time as days, hours, minutes, and seconds"""
+
+        # Return string
+        seconds = int(round(seconds))
+        days,seconds = divmod(seconds,86400)
+        hours,seconds = divmod(seconds,3600)
+        minutes,seconds = divmod(seconds,60)
+        return "{}d {:02d}:{:02d}:{:02d}".format(days,hours,minutes,seconds)
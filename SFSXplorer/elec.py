@@ -112,6 +112,50 @@ class PairwiseElecPot(object):
         # Return result
         return e0_r
     
+    # Define epsilon0_grad() method
+    def epsilon0_grad(self,r,l,k,A,e0):
+        """Method to calculate the sigmoidal dielectric function and its
+        derivatives with respect to A, e0, k, and l (r may be an array)"""
+
+        # Dielectric function (as in epsilon0())
+        B = e0 - A
+        E = np.exp(-l*B*r)
+        D = 1 + k*E
+        e0_r = A + B/D
+
+        # Derivatives (B depends on A and e0)
+        d_B = 1/D + B*k*l*r*E/D**2
+        d_A = 1 - d_B
+        d_e0 = d_B
+        d_k = -B*E/D**2
+        d_l = B**2*k*r*E/D**2
+
+        # Return results
+        return e0_r,d_A,d_e0,d_k,d_l
+
+    # Define epsilon0_tanh_grad() method
+    def epsilon0_tanh_grad(self,r,l,k,A,e0):
+        """Method to calculate the hyperbolic tangent dielectric function and
+        its derivatives with respect to A, e0, k, and l (r may be an array)"""
+
+        # Dielectric function (as in epsilon0_tanh())
+        B = e0 - A
+        P = np.exp(l*B*r)
+        M = np.exp(-l*B*r)
+        Q = P + k*M
+        T = (P - k*M)/Q
+        e0_r = A + B*T
+
+        # Derivatives (dT/d(lBr) = 1 - T^2 and dT/dk = -2/Q^2)
+        d_B = T + B*(1 - T**2)*l*r
+        d_A = 1 - d_B
+        d_e0 = d_B
+        d_k = -2*B/Q**2
+        d_l = B**2*(1 - T**2)*r
+
+        # Return results
+        return e0_r,d_A,d_e0,d_k,d_l
+
     # Define potential() method
     def potential(self,ligand,receptor,l,k,a,e0,log_w,tanh_w):
         """Method to calculate pairwise electric potential energy based on the
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+#
+################################################################################
+# SFSXplorer                                                                   #
+# Scoring Function Space eXplorer                                              #
+################################################################################
+#
+# Class to optimize the parameters of the electrostatic (A, epsilon0, k, and
+# lambda) and desolvation (m, n, and sigma) terms as continuous variables. It
+# maximizes the Pearson correlation coefficient between an energy term and
+# experimental data (exp_string) with a bounded quasi-Newton method (L-BFGS-B)
+# started from Latin hypercube points within the ranges in sfs.in. Gradients
+# come from analytic derivatives of the dielectric functions and the
+# desolvation potential, and pairwise data of each complex are kept in memory
+# (pair_data.PairData). Only the Pearson correlation coefficient is supported
+# (optimize_metric,r), since rank correlations (rho and tau-b) are piecewise
+# constant in the parameters; use Adaptive for them.
+#
+################################################################################
+# Dr. Walter F. de Azevedo, Jr.                                                #
+# https://azevedolab.net/                                                      #
+# January 12, 2023                                                             #
+################################################################################
+#
+# Import section
+import sys
+import numpy as np
+from SFSXplorer import adaptive as ad
+from SFSXplorer import pair_data as pd
+
+# Define Optimizer() class
+class Optimizer(ad.Refiner):
+    """Class to optimize electrostatic and desolvation parameters"""
+
+    # Define constructor method
+    def __init__(self,sfs_in):
+        """Constructor method"""
+
+        # Set up attributes
+        self.sfs_in = sfs_in
+
+        # Show message
+        print("\nOptimizing parameters of the Scoring Function Space...")
+
+    # Define read_optimize_in() method
+    def read_optimize_in(self):
+        """Method to read parameters for optimization"""
+
+        # Import section
+        import csv
+
+        # Invoke read_adaptive_in() method (ranges and exp_string)
+        self.read_adaptive_in()
+
+        # Set up default values
+        self.optimize_families = ["Elec_Log","Elec_Tanh","Elec_Log_Tanh",
+                                    "Desol"]
+        self.optimize_starts = 8        # Starting points for each family
+        self.optimize_metric = "r"      # Metric (r only)
+        self.optimize_sign = "abs"      # Maximize abs, max, or min of r
+        self.optimize_seed = None       # Seed for starting points
+        self.optimize_maxiter = 200     # Iterations for each local search
+
+        # Looping through sfs.in
+        fo_in = open(self.sfs_in,"r")
+        for line in csv.reader(fo_in):
+            if len(line) < 2 or line[0] == "#":
+                continue
+            elif line[0].strip() == "optimize_families":
+                self.optimize_families = [ele.strip() for ele in line[1:]
+                                            if ele.strip() != ""]
+            elif line[0].strip() == "optimize_starts":
+                self.optimize_starts = int(line[1].strip())
+            elif line[0].strip() == "optimize_metric":
+                self.optimize_metric = line[1].strip()
+            elif line[0].strip() == "optimize_sign":
+                self.optimize_sign = line[1].strip().lower()
+            elif line[0].strip() == "optimize_seed":
+                self.optimize_seed = int(line[1].strip())
+            elif line[0].strip() == "optimize_maxiter":
+                self.optimize_maxiter = int(line[1].strip())
+        fo_in.close()
+
+        # Check metric (gradients of the Pearson correlation coefficient)
+        if self.optimize_metric != "r":
+            sys.exit("\nError! Invalid optimize_metric "+self.optimize_metric+
+                        " (only r is supported)!")
+
+        # Check families (continuous parameters only)
+        for family in self.optimize_families:
+            if family not in ["Elec_Log","Elec_Tanh","Elec_Log_Tanh","Desol"]:
+                sys.exit("\nError! Family "+family+" can't be optimized!")
+
+        # Set up output files
+        self.optimize_log = self.scores_out.replace(".csv","_optimize.csv")
+        self.optimized_out = self.scores_out.replace(".csv","_optimized.csv")
+
+    # Define objective() method
+    def objective(self,u,family,lower,upper,free):
+        """Method to return minus the score of the Pearson correlation
+        coefficient and its gradient with respect to the free parameters
+        scaled to the unit interval"""
+
+        # Parameters from the unit hypercube
+        params = lower.copy()
+        params[free] = lower[free] + u*(upper[free] - lower[free])
+
+        # Terms and gradients for complexes with experimental data
+        x = np.zeros(len(self.y_exp))
+        dx = np.zeros((len(self.y_exp),len(params)))
+        for i,pair in enumerate(self.pairs_exp):
+            x[i],dx[i] = pair.term_grad(family,params)
+
+        # Pearson correlation coefficient and its gradient
+        x_c = x - np.mean(x)
+        s_xx = np.sum(x_c**2)
+        if not np.isfinite(s_xx) or s_xx == 0:
+            return 0.0,np.zeros(len(u))
+        r = np.sum(x_c*self.y_c)/np.sqrt(s_xx*self.s_yy)
+        dr_dx = self.y_c/np.sqrt(s_xx*self.s_yy) - r*x_c/s_xx
+        grad = (dr_dx @ dx)[free]*(upper[free] - lower[free])
+
+        # Return minus score and its gradient
+        sign = self.get_sign(r)
+        return -sign*r,-sign*grad
+
+    # Define get_sign() method
+    def get_sign(self,r):
+        """Method to return the sign that turns r into the score (larger is
+        better)"""
+
+        # Sign for abs, min, or max of r
+        if self.optimize_sign == "abs":
+            return np.sign(r) if r != 0 else 1.0
+        elif self.optimize_sign == "min":
+            return -1.0
+        else:
+            return 1.0
+
+    # Define correlation() method
+    def correlation(self,family,params):
+        """Method to return the Pearson correlation coefficient of a term"""
+
+        # Terms for complexes with experimental data
+        x = np.array([pair.term(family,params) for pair in self.pairs_exp])
+        x_c = x - np.mean(x)
+
+        # Return correlation coefficient
+        return np.sum(x_c*self.y_c)/np.sqrt(np.sum(x_c**2)*self.s_yy)
+
+    # Define optimize() method
+    def optimize(self):
+        """Method to carry out multi-start local searches for each family"""
+
+        # Import section
+        from scipy.optimize import minimize
+        from scipy.stats import qmc
+
+        # Complexes with experimental data
+        self.pairs_exp = [pair for pair,row in zip(self.pairs,self.rows_exp)
+                            if row]
+        self.y_exp = self.y[self.rows_exp]
+        self.y_c = self.y_exp - np.mean(self.y_exp)
+        self.s_yy = np.sum(self.y_c**2)
+
+        # Looping through families
+        self.results = []           # (family, start, params, r, score, nit,
+                                    # success)
+        self.best = {}              # Best parameters for each family
+        for f,family in enumerate(self.optimize_families):
+            axes = self.get_axes(family)
+            lower = np.array([min(axis[0],axis[1]) for axis in axes],
+                                dtype=float)
+            upper = np.array([max(axis[0],axis[1]) for axis in axes],
+                                dtype=float)
+            free = upper > lower
+
+            # Latin hypercube starting points for free parameters
+            seed = None
+            if self.optimize_seed is not None:
+                seed = np.random.default_rng([self.optimize_seed,f])
+            if np.any(free):
+                sampler = qmc.LatinHypercube(d=int(np.sum(free)),seed=seed)
+                starts = sampler.random(self.optimize_starts)
+            else:
+                starts = np.zeros((1,0))
+
+            # Local searches
+            for s,u0 in enumerate(starts):
+                if len(u0) > 0:
+                    res = minimize(self.objective,u0,jac=True,
+                            args=(family,lower,upper,free),method="L-BFGS-B",
+                            bounds=[(0.0,1.0)]*len(u0),
+                            options={"maxiter":self.optimize_maxiter})
+                    u,nit,success = res.x,res.nit,res.success
+                else:
+                    u,nit,success = u0,0,True
+
+                # Rounded parameters and their correlation coefficient
+                params = lower.copy()
+                params[free] = lower[free] + u*(upper[free] - lower[free])
+                params = tuple(self.set_value(p,axis) for p,axis in
+                                zip(params,axes))
+                r = self.correlation(family,params)
+                score = self.get_sign(r)*r
+                self.results.append((family,s,params,r,score,nit,success))
+
+                # Keep best parameters (non-finite scores are replaced)
+                if family not in self.best or score > self.best[family][1] or \
+                        not np.isfinite(self.best[family][1]):
+                    self.best[family] = (params,score)
+
+            # Show message
+            params,score = self.best[family]
+            print("Best "+pd.term_name(family,params)+" (score ",score,")")
+
+    # Define write_optimize() method
+    def write_optimize(self):
+        """Method to write local searches and the best term of each family
+        for all complexes"""
+
+        # Write local searches
+        fo_log = open(self.optimize_log,"w")
+        fo_log.write("Family,Start,Term,r,Score,Iterations,Converged\n")
+        for family,s,params,r,score,nit,success in self.results:
+            fo_log.write(family+","+str(s)+","+pd.term_name(family,params)+","+
+                        str(r)+","+str(score)+","+str(nit)+","+str(success)+
+                        "\n")
+        fo_log.close()
+
+        # Write best terms (as write_energy())
+        terms = [(family,self.best[family][0]) for family in
+                    self.optimize_families]
+        fo_out = open(self.optimized_out,"w")
+        fo_out.write(self.header_in+",".join([pd.term_name(family,params)
+                                        for family,params in terms])+"\n")
+        for data_in,pair in zip(self.rows_in,self.pairs):
+            fo_out.write(data_in+","+",".join([str(pair.term(family,params))
+                                        for family,params in terms])+"\n")
+        fo_out.close()
+
+        # Show message
+        print("\nLocal searches written in "+self.optimize_log)
+        print("Best terms written in "+self.optimized_out)
+        print("\nDone!")
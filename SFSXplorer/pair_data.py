@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+#
+################################################################################
+# SFSXplorer                                                                   #
+# Scoring Function Space eXplorer                                              #
+################################################################################
+#
+# Classes to keep the pairwise data of a protein-ligand complex in memory
+# (distances, charge products, and force field parameters for each
+# ligand-receptor atom pair) and to calculate the energy terms of the Scoring
+# Function Space from them. Each energy term is a vectorized reduction over all
+# atom pairs with the same expressions used in FF_AD4.InterMol, vdw, hb, elec,
+# and desolv, so a complex is read once and its terms can be calculated for any
+# set of parameters.
+#
+################################################################################
+# Dr. Walter F. de Azevedo, Jr.                                                #
+# https://azevedolab.net/                                                      #
+# January 12, 2023                                                             #
+################################################################################
+#
+# Import section
+import numpy as np
+from SFSXplorer import elec as e1
+from SFSXplorer import desolv as ds1
+
+# Weights for logistic and hyperbolic tangent dielectric functions
+ELEC_WEIGHTS = {"Elec_Log":(1.0,0.0),"Elec_Tanh":(0.0,1.0),
+                "Elec_Log_Tanh":(0.5,0.5)}
+
+# Families of energy terms (in the order of the columns of write_energy())
+FAMILIES = ["VDW","HB","Elec_Log","Elec_Tanh","Elec_Log_Tanh","Desol"]
+
+# Define term_name() function
+def term_name(family,params):
+    """Function to return the column name of an energy term (e.g., v_VDW_12_6,
+    v_Elec_Log_-8.5525_78.4_7.7839_0.003627, or v_Desol_2.0_2.0_3.0)"""
+
+    # Return name
+    return "v_"+family+"_"+"_".join([str(p) for p in params])
+
+# Define parse_term_name() function
+def parse_term_name(name):
+    """Function to return the family and parameters of a column name (inverse
+    of term_name(); ValueError for invalid names)"""
+
+    # Longest prefix first (Elec_Log_Tanh before Elec_Log)
+    for family in sorted(FAMILIES,key=len,reverse=True):
+        prefix = "v_"+family+"_"
+        if name.startswith(prefix):
+            fields = name[len(prefix):].split("_")
+            if family in ["VDW","HB"] and len(fields) == 2:
+                return family,(int(fields[0]),int(fields[1]))
+            elif family == "Desol" and len(fields) == 3:
+                return family,tuple([float(field) for field in fields])
+            elif family in ELEC_WEIGHTS and len(fields) == 4:
+                return family,tuple([float(field) for field in fields])
+            break
+
+    # Invalid name
+    raise ValueError("Invalid term name "+name)
+
+# Define ParTable() class
+class ParTable(object):
+    """Class to keep AutoDock4 parameters for each pair of atom types"""
+
+    # Define constructor method
+    def __init__(self,pot,par_list):
+        """Constructor method"""
+
+        # Set up attributes
+        self.pot = pot              # InterMol object
+        self.par_list = par_list    # Lines from read_AD4_bound()
+        self.vdw = {}               # Parameters for each pair of atom types
+        self.hb = {}
+        self.desol = {}
+
+    # Define get_vdw() method
+    def get_vdw(self,atom_i,atom_j):
+        """Method to return van der Waals parameters (None for unknown pairs)"""
+
+        # Same lookup as InterMol.intermol_pot_VDW()
+        if (atom_i,atom_j) not in self.vdw:
+            try:
+                par_ij = self.pot.get_atom_par_VDW(self.par_list,atom_i,atom_j)
+            except:
+                par_ij = self.pot.get_atom_par_VDW_fallback(atom_i,atom_j)
+            self.vdw[atom_i,atom_j] = par_ij
+
+        # Return parameters
+        return self.vdw[atom_i,atom_j]
+
+    # Define get_hb() method
+    def get_hb(self,atom_i,atom_j):
+        """Method to return hydrogen-bond parameters"""
+
+        # Same lookup as InterMol.intermol_pot_HB()
+        if (atom_i,atom_j) not in self.hb:
+            self.hb[atom_i,atom_j] = self.pot.get_atom_par_HB(self.par_list,
+                                                                atom_i,atom_j)
+
+        # Return parameters
+        return self.hb[atom_i,atom_j]
+
+    # Define get_desol() method
+    def get_desol(self,atom_i,atom_j):
+        """Method to return solvation parameters"""
+
+        # Same lookup as InterMol.intermol_pot_Desol()
+        if (atom_i,atom_j) not in self.desol:
+            self.desol[atom_i,atom_j] = self.pot.get_atom_par_Desol(
+                                                self.par_list,atom_i,atom_j)
+
+        # Return parameters
+        return self.desol[atom_i,atom_j]
+
+# Define PairData() class
+class PairData(object):
+    """Class to keep pairwise data of a complex and calculate energy terms"""
+
+    # Define constructor method
+    def __init__(self,par_table,ligand,receptor):
+        """Constructor method (ligand and receptor are lists of atom lines
+        from read_PDBQT() or tuples of coordinates, charges, and atom types
+        from get_atoms())"""
+
+        # Get coordinates, charges, and atom types
+        xyz_lig,q_lig,types_lig = self.get_atoms(ligand)
+        xyz_rec,q_rec,types_rec = self.get_atoms(receptor)
+        self.n_lig,self.n_rec = len(types_lig),len(types_rec)
+        self.n_pairs = self.n_lig*self.n_rec
+
+        # Distances and charge products (n_lig x n_rec)
+        d = xyz_lig[:,np.newaxis,:] - xyz_rec[np.newaxis,:,:]
+        self.r = np.sqrt(d[:,:,0]**2 + d[:,:,1]**2 + d[:,:,2]**2)
+        self.qq = q_lig[:,np.newaxis]*q_rec[np.newaxis,:]
+
+        # Invoke set_parameters() method
+        self.set_parameters(par_table,types_lig,types_rec)
+
+    # Define get_atoms() method
+    def get_atoms(self,atom_list):
+        """Method to return coordinates, charges, and atom types"""
+
+        # Atoms already parsed
+        if isinstance(atom_list,tuple):
+            return atom_list
+
+        # Same columns read by InterMol and PairwiseElecPot
+        xyz = np.array([[float(line[30:38]),float(line[38:46]),
+                        float(line[46:54])] for line in atom_list]).reshape(-1,3)
+        q = np.array([float(line[66:75]) for line in atom_list])
+        types = [line[77:79] for line in atom_list]
+
+        # Return results
+        return xyz,q,types
+
+    # Define set_parameters() method
+    def set_parameters(self,par_table,types_lig,types_rec):
+        """Method to set up force field parameters for each atom pair"""
+
+        # Set up arrays
+        shape = (self.n_lig,self.n_rec)
+        vdw = np.full(shape+(4,),np.nan)
+        hb = np.zeros(shape+(4,))
+        desol = np.zeros(shape)
+        unknown_vdw = False
+
+        # Looping through pairs of atom types
+        for atom_i in set(types_lig):
+            rows = np.array([t == atom_i for t in types_lig])
+            for atom_j in set(types_rec):
+                mask = rows[:,np.newaxis] & \
+                    np.array([t == atom_j for t in types_rec])[np.newaxis,:]
+                par_ij = par_table.get_vdw(atom_i,atom_j)
+                if par_ij is None:
+                    unknown_vdw = True
+                else:
+                    vdw[mask] = par_ij
+                hb[mask] = par_table.get_hb(atom_i,atom_j)
+                vol_i,sol_i,vol_j,sol_j = par_table.get_desol(atom_i,atom_j)
+                desol[mask] = (vol_i*sol_i) + (vol_j*sol_j)
+
+        # Unknown van der Waals pairs keep the parameters of the previous pair
+        # (as in the loop of InterMol.intermol_pot_VDW())
+        if unknown_vdw:
+            vdw = vdw.reshape(-1,4)
+            for p in range(1,len(vdw)):
+                if np.isnan(vdw[p,0]):
+                    vdw[p] = vdw[p-1]
+            vdw = vdw.reshape(shape+(4,))
+
+        # van der Waals parameters (mean radius and geometric mean well depth)
+        self.vdw_reqm = 0.5*(vdw[:,:,0]+vdw[:,:,2])
+        self.vdw_epsilon = np.sqrt(vdw[:,:,1]*vdw[:,:,3])
+
+        # Hydrogen-bond parameters (largest radius and well depth)
+        self.hb_reqm = np.maximum(hb[:,:,0],hb[:,:,2])
+        self.hb_epsilon = np.maximum(hb[:,:,1],hb[:,:,3])
+
+        # Desolvation weights
+        self.desol_w = desol
+
+    # Define mie() method
+    def mie(self,reqm,epsilon,n,m):
+        """Method to return the sum of the n-m potential over all pairs"""
+
+        # Same expression as vdw.PairwisePot and hb.PairwisePotHB
+        if n == m:
+            return np.nan
+        cm = (n/(n-m))*epsilon*reqm**m
+        cn = (m/(n-m))*epsilon*reqm**n
+        return np.sum(cn/self.r**n - cm/self.r**m)
+
+    # Define vdw() method
+    def vdw(self,n,m):
+        """Method to return the van der Waals term"""
+
+        # Return sum over pairs
+        return self.mie(self.vdw_reqm,self.vdw_epsilon,n,m)
+
+    # Define hb() method
+    def hb(self,n,m):
+        """Method to return the hydrogen-bond term"""
+
+        # Return sum over pairs
+        return self.mie(self.hb_reqm,self.hb_epsilon,n,m)
+
+    # Define dielectric() method
+    def dielectric(self,l,k,a,e0,log_w,tanh_w):
+        """Method to return the weighted distance-dependent dielectric
+        function for all pairs"""
+
+        # Same expressions as elec.PairwiseElecPot (both are evaluated)
+        b = e0 - a
+        e_log = a + b/(1+k*np.exp(-l*b*self.r))
+        e_tanh = a + b*(np.exp(l*b*self.r)-k*np.exp(-l*b*self.r))/\
+                    (np.exp(l*b*self.r)+k*np.exp(-l*b*self.r))
+
+        # Return dielectric function
+        return log_w*e_log + tanh_w*e_tanh
+
+    # Define elec() method
+    def elec(self,l,k,a,e0,log_w,tanh_w):
+        """Method to return the electrostatic term"""
+
+        # Return sum over pairs
+        return np.sum(self.qq/(self.r*self.dielectric(l,k,a,e0,log_w,tanh_w)))
+
+    # Define desol() method
+    def desol(self,m,n,sigma):
+        """Method to return the desolvation term (parameters in the order of
+        the column name, v_Desol_m_n_sigma)"""
+
+        # Same expression as write_energy() through desolv.PairwisePotDesol
+        return np.sum(self.desol_w*np.exp(-self.r**m/(2*sigma**n)))
+
+    # Define elec_grad() method
+    def elec_grad(self,l,k,a,e0,log_w,tanh_w):
+        """Method to return the electrostatic term and its derivatives with
+        respect to (a, e0, k, l)"""
+
+        # Dielectric functions and their derivatives
+        EL1 = e1.PairwiseElecPot()
+        e_log = EL1.epsilon0_grad(self.r,l,k,a,e0)
+        e_tanh = EL1.epsilon0_tanh_grad(self.r,l,k,a,e0)
+        ep = log_w*e_log[0] + tanh_w*e_tanh[0]
+
+        # Pairwise potential and derivative with respect to dielectric
+        v = self.qq/(self.r*ep)
+        d_ep = -v/ep
+
+        # Return sum over pairs and gradient
+        grad = np.array([np.sum(d_ep*(log_w*e_log[i] + tanh_w*e_tanh[i]))
+                        for i in range(1,5)])
+        return np.sum(v),grad
+
+    # Define desol_grad() method
+    def desol_grad(self,m,n,sigma):
+        """Method to return the desolvation term and its derivatives with
+        respect to (m, n, sigma) in the order of the column name"""
+
+        # Desolvation weights are already combined (vol_i*sol_i + vol_j*sol_j)
+        Desol1 = ds1.PairwisePotDesol()
+        v,d_n,d_m,d_sigma = Desol1.potential_grad(self.desol_w,1.0,0.0,0.0,
+                                                    self.r,n,m,sigma)
+
+        # Return sum over pairs and gradient
+        return np.sum(v),np.array([np.sum(d_m),np.sum(d_n),np.sum(d_sigma)])
+
+    # Define term_grad() method
+    def term_grad(self,family,params):
+        """Method to return an electrostatic or desolvation term and its
+        derivatives with respect to params (in the order of the column name)"""
+
+        # Select family
+        if family in ELEC_WEIGHTS:
+            a,e0,k,l = params
+            log_w,tanh_w = ELEC_WEIGHTS[family]
+            return self.elec_grad(l,k,a,e0,log_w,tanh_w)
+        elif family == "Desol":
+            return self.desol_grad(params[0],params[1],params[2])
+        else:
+            return np.nan,np.full(len(params),np.nan)
+
+    # Define term() method
+    def term(self,family,params):
+        """Method to return the energy term of a family (VDW, HB, Elec_Log,
+        Elec_Tanh, Elec_Log_Tanh, or Desol) for parameters in the order of
+        the column name"""
+
+        # Select family
+        if family == "VDW":
+            return self.vdw(params[0],params[1])
+        elif family == "HB":
+            return self.hb(params[0],params[1])
+        elif family in ELEC_WEIGHTS:
+            a,e0,k,l = params
+            log_w,tanh_w = ELEC_WEIGHTS[family]
+            return self.elec(l,k,a,e0,log_w,tanh_w)
+        elif family == "Desol":
+            return self.desol(params[0],params[1],params[2])
+        else:
+            return np.nan
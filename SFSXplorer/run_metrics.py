@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+#
+################################################################################
+# SFSXplorer                                                                   #
+# Scoring Function Space eXplorer                                              #
+################################################################################
+#
+# Class to record throughput of the exploration of the Scoring Function Space.
+# For each complex it keeps wall time, number of atoms, atom pairs, pair
+# evaluations, and time spent in each stage (reading PDBQT files and each
+# family of energy terms). It shows a progress line with estimated time to
+# finish and writes a JSON report at the end of the run. Optionally, stages are
+# recorded as spans in the Chrome trace-event format (chrome://tracing or
+# Perfetto), with the process id of each worker. A second class profiles
+# stages with cProfile and writes the hot functions of each stage. Complexes
+# calculated by worker processes add their stage times, trace events, and peak
+# memory to the metrics of the main process.
+#
+################################################################################
+# Dr. Walter F. de Azevedo, Jr.                                                #
+# https://azevedolab.net/                                                      #
+# January 12, 2023                                                             #
+################################################################################
+#
+# Import section
+import os
+import sys
+import time
+
+# Define peak_rss() function
+def peak_rss():
+    """Function to return the peak resident memory of this process in MB
+    (None where the resource module is not available)"""
+
+    # Import section
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    # Return peak memory (ru_maxrss is in kB on Linux and bytes on macOS)
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return rss/1048576.0
+    return rss/1024.0
+
+# Define RunMetrics() class
+class RunMetrics(object):
+    """Class to record run-level and per-complex metrics"""
+
+    # Define constructor method
+    def __init__(self,n_total,trace=False):
+        """Constructor method"""
+
+        # Set up attributes
+        self.n_total = n_total      # Number of complexes in ligands.in
+        self.trace = trace          # Record trace events
+        self.complexes = []         # Metrics for each complex
+        self.stage_time = {}        # Time for each stage (all complexes)
+        self.events = []            # Trace events
+        self.peak_rss_workers = 0.0 # Largest peak memory of workers (MB)
+        self.t_start = time.perf_counter()
+
+    # Define start_complex() method
+    def start_complex(self,name):
+        """Method to start recording a complex"""
+
+        # Set up metrics for this complex
+        self.current = {"PDB":name,"stage_time":{}}
+        self.t_complex = time.perf_counter()
+        self.t_stage = self.t_complex
+
+    # Define lap() method
+    def lap(self,stage):
+        """Method to add the time since the previous lap to a stage"""
+
+        # Add time to stage
+        t = time.perf_counter()
+        stage_time = self.current["stage_time"]
+        stage_time[stage] = stage_time.get(stage,0.0) + t - self.t_stage
+        if self.trace:
+            self.add_event(stage,"stage",self.t_stage,t)
+        self.t_stage = t
+
+    # Define add_event() method
+    def add_event(self,name,category,t_begin,t_end):
+        """Method to record a span as a complete trace event (times from
+        time.perf_counter(), which is shared by processes on the same host)"""
+
+        # Append event (times in microseconds)
+        self.events.append({"name":name,"cat":category,"ph":"X",
+                            "ts":1e6*t_begin,"dur":1e6*(t_end - t_begin),
+                            "pid":os.getpid(),"tid":0,
+                            "args":{"PDB":self.current["PDB"]}})
+
+    # Define get_worker() method
+    def get_worker(self):
+        """Method to return the metrics of the current complex recorded in a
+        worker process"""
+
+        # Return stage times, wall time, trace events, and peak memory
+        return {"stage_time":self.current["stage_time"],
+                "worker_time":self.t_stage - self.t_complex,
+                "events":self.events,"peak_rss_mb":peak_rss()}
+
+    # Define add_worker() method
+    def add_worker(self,worker):
+        """Method to add metrics from get_worker() to the current complex"""
+
+        # Add stage times and trace events
+        stage_time = self.current["stage_time"]
+        for stage,dt in worker["stage_time"].items():
+            stage_time[stage] = stage_time.get(stage,0.0) + dt
+        self.current["worker_time"] = worker["worker_time"]
+        self.events += worker["events"]
+        if worker["peak_rss_mb"] is not None:
+            self.peak_rss_workers = max(self.peak_rss_workers,
+                                        worker["peak_rss_mb"])
+
+    # Define end_complex() method
+    def end_complex(self,n_lig,n_rec,n_columns):
+        """Method to finish recording a complex and show progress"""
+
+        # Metrics for this complex
+        t = time.perf_counter()
+        self.current["wall_time"] = t - self.t_complex
+        self.current["ligand_atoms"] = n_lig
+        self.current["receptor_atoms"] = n_rec
+        self.current["pairs"] = n_lig*n_rec
+        self.current["pair_evaluations"] = n_lig*n_rec*n_columns
+        self.complexes.append(self.current)
+        if self.trace:
+            self.add_event(self.current["PDB"],"complex",self.t_complex,t)
+        for stage,dt in self.current["stage_time"].items():
+            self.stage_time[stage] = self.stage_time.get(stage,0.0) + dt
+
+        # Show progress
+        print(self.progress())
+
+    # Define progress() method
+    def progress(self):
+        """Method to return a progress line with throughput and estimated
+        time to finish"""
+
+        # Throughput
+        n_done = len(self.complexes)
+        elapsed = time.perf_counter() - self.t_start
+        rate = 3600.0*n_done/elapsed if elapsed > 0 else 0.0
+        eta = (self.n_total - n_done)*elapsed/n_done if n_done > 0 else 0.0
+
+        # Return line
+        line_o = self.current["PDB"]+" ["+str(n_done)+"/"+str(self.n_total)+"]"
+        line_o += " {:.3f} s, {:.1f} complexes/h, ETA {}".format(
+                    self.current["wall_time"],rate,self.format_time(eta))
+        return line_o
+
+    # Define format_time() method
+    def format_time(self,seconds):
+        """Method to return time as hh:mm:ss"""
+
+        # Return string
+        seconds = int(round(max(seconds,0.0)))
+        return "{:02d}:{:02d}:{:02d}".format(seconds//3600,(seconds%3600)//60,
+                                            seconds%60)
+
+    # Define write_report() method
+    def write_report(self,report_out,extra=None):
+        """Method to write a JSON report of the run"""
+
+        # Import section
+        import json
+
+        # Run-level metrics
+        elapsed = time.perf_counter() - self.t_start
+        n_done = len(self.complexes)
+        report = {"complexes":n_done,"wall_time":elapsed,
+                "complexes_per_hour":3600.0*n_done/elapsed if elapsed > 0
+                                        else 0.0,
+                "pairs":sum([c["pairs"] for c in self.complexes]),
+                "pair_evaluations":sum([c["pair_evaluations"]
+                                        for c in self.complexes]),
+                "stage_time":self.stage_time,
+                "peak_rss_main_mb":peak_rss(),
+                "peak_rss_worker_mb":self.peak_rss_workers}
+        if extra is not None:
+            report.update(extra)
+        report["per_complex"] = self.complexes
+
+        # Write report
+        fo_report = open(report_out,"w")
+        json.dump(report,fo_report,indent=1)
+        fo_report.close()
+
+        # Show message
+        print("\nRun metrics written in "+report_out)
+
+    # Define write_trace() method
+    def write_trace(self,trace_out,events=None):
+        """Method to write trace events (events from all workers, or the
+        events of this object if None) in the Chrome trace-event format"""
+
+        # Import section
+        import json
+
+        # Name processes (main process and workers)
+        if events is None:
+            events = self.events
+        pids = sorted(set([event["pid"] for event in events]))
+        names = [{"name":"process_name","ph":"M","pid":pid,"tid":0,
+                "args":{"name":"main" if pid == os.getpid() else
+                        "worker "+str(pid)}} for pid in pids]
+
+        # Write trace
+        fo_trace = open(trace_out,"w")
+        json.dump({"traceEvents":names+events,"displayTimeUnit":"ms"},fo_trace)
+        fo_trace.close()
+
+        # Show message
+        print("Trace written in "+trace_out)
+
+# Define StageProfiler() class
+class StageProfiler(object):
+    """Class to profile stages with cProfile (same interface as RunMetrics)"""
+
+    # Define constructor method
+    def __init__(self):
+        """Constructor method"""
+
+        # Set up attributes
+        self.stats = {}             # pstats.Stats for each stage
+        self.names = []             # Profiled complexes
+        self.profiler = None
+
+    # Define start_complex() method
+    def start_complex(self,name):
+        """Method to start profiling a complex"""
+
+        # Import section
+        import cProfile
+
+        # Start profiler for the first stage
+        self.names.append(name)
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+
+    # Define lap() method
+    def lap(self,stage):
+        """Method to add the profile since the previous lap to a stage"""
+
+        # Import section
+        import cProfile
+        import pstats
+
+        # Keep profile of this stage and start the next one
+        self.profiler.disable()
+        if stage in self.stats:
+            self.stats[stage].add(self.profiler)
+        else:
+            self.stats[stage] = pstats.Stats(self.profiler)
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+
+    # Define end_complex() method
+    def end_complex(self,n_lig=0,n_rec=0,n_columns=0):
+        """Method to stop profiling a complex"""
+
+        # Stop profiler
+        self.profiler.disable()
+
+    # Define write_summary() method
+    def write_summary(self,summary_out,top=15):
+        """Method to write the functions with the largest internal time for
+        each stage"""
+
+        # Write top functions for each stage
+        fo_summary = open(summary_out,"w")
+        fo_summary.write("Profiled complexes: "+", ".join(self.names)+"\n")
+        for stage,stats in self.stats.items():
+            fo_summary.write("\n"+"#"*80+"\n# Stage: "+stage+"\n"+"#"*80+"\n")
+            stats.stream = fo_summary
+            stats.sort_stats("tottime").print_stats(top)
+        fo_summary.close()
+
+        # Show message
+        print("Profile summary written in "+summary_out)
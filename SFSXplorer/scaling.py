@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+#
+################################################################################
+# SFSXplorer                                                                   #
+# Scoring Function Space eXplorer                                              #
+################################################################################
+#
+# Class to study how the exploration of the Scoring Function Space scales with
+# the number of worker processes (n_workers). Strong scaling runs the same
+# dataset with each number of workers; weak scaling keeps the number of
+# complexes per worker. Each run is a separate Explore process on synthetic
+# complexes (benchmark.SyntheticData) or on the first complexes of ligands.in,
+# with the parameter ranges of sfs.in. Throughput, parallel efficiency, peak
+# memory, and I/O time come from the run metrics of each run, and the stage
+# that limits throughput (compute in workers, serialization of results, or the
+# ordered writer of the main process) is identified from the busy time of each.
+#
+################################################################################
+# Dr. Walter F. de Azevedo, Jr.                                                #
+# https://azevedolab.net/                                                      #
+# January 12, 2023                                                             #
+################################################################################
+#
+# Import section
+import os
+import sys
+import numpy as np
+from SFSXplorer import sfs
+from SFSXplorer import benchmark as bk
+from SFSXplorer import pair_data as pd
+
+# Keys of sfs.in set by each run
+RUN_KEYS = ["dataset_dir","ligands_in","scores_out","n_workers","run_report",
+            "trace","profile_slowest"]
+
+# Define Scaling() class
+class Scaling(sfs.Explorer):
+    """Class to carry out strong and weak scaling studies of write_energy()"""
+
+    # Define constructor method
+    def __init__(self,sfs_in):
+        """Constructor method"""
+
+        # Set up attributes
+        self.sfs_in = sfs_in
+
+        # Show message
+        print("\nScaling study of the exploration of the Scoring Function "+
+                "Space...")
+
+    # Define read_scaling_in() method
+    def read_scaling_in(self):
+        """Method to read parameters for the scaling study"""
+
+        # Import section
+        import csv
+
+        # Invoke read_input() method
+        self.read_input()
+
+        # Set up default values
+        self.scaling_dir = "scaling/"       # Folder for data and results
+        self.scaling_workers = [1,2,4]      # Numbers of workers
+        self.scaling_sizes = [8,32]         # Complexes (strong scaling) or
+                                            # complexes per worker (weak)
+        self.scaling_mode = "both"          # strong, weak, or both
+        self.scaling_dataset = "synthetic"  # synthetic or sample (ligands.in)
+        self.scaling_receptor_atoms = 400   # Atoms of synthetic receptors
+        self.scaling_ligand_atoms = 30      # Atoms of synthetic ligands
+        self.scaling_seed = 0               # Seed for synthetic data
+
+        # Looping through sfs.in
+        fo_in = open(self.sfs_in,"r")
+        for line in csv.reader(fo_in):
+            if len(line) < 2 or line[0] == "#":
+                continue
+            elif line[0].strip() == "scaling_dir":
+                self.scaling_dir = line[1].strip()
+            elif line[0].strip() == "scaling_workers":
+                self.scaling_workers = [int(ele) for ele in line[1:]
+                                        if ele.strip() != ""]
+            elif line[0].strip() == "scaling_sizes":
+                self.scaling_sizes = [int(ele) for ele in line[1:]
+                                        if ele.strip() != ""]
+            elif line[0].strip() == "scaling_mode":
+                self.scaling_mode = line[1].strip().lower()
+            elif line[0].strip() == "scaling_dataset":
+                self.scaling_dataset = line[1].strip().lower()
+            elif line[0].strip() == "scaling_receptor_atoms":
+                self.scaling_receptor_atoms = int(line[1].strip())
+            elif line[0].strip() == "scaling_ligand_atoms":
+                self.scaling_ligand_atoms = int(line[1].strip())
+            elif line[0].strip() == "scaling_seed":
+                self.scaling_seed = int(line[1].strip())
+        fo_in.close()
+
+        # Check parameters
+        if self.scaling_mode not in ["strong","weak","both"]:
+            sys.exit("\nError! scaling_mode must be strong, weak, or both!")
+        if self.scaling_dataset not in ["synthetic","sample"]:
+            sys.exit("\nError! scaling_dataset must be synthetic or sample!")
+
+        # Set up output files
+        if not self.scaling_dir.endswith("/"):
+            self.scaling_dir += "/"
+        os.makedirs(self.scaling_dir,exist_ok=True)
+        self.scaling_out = self.scaling_dir+"scaling.csv"
+
+    # Define get_dataset() method
+    def get_dataset(self,n_complexes):
+        """Method to return ligands.in and dataset folder with n_complexes
+        complexes (written once for each size)"""
+
+        # Synthetic complexes
+        if self.scaling_dataset == "synthetic":
+            dataset_dir = self.scaling_dir+"data_"+str(n_complexes)+"/"
+            ligands_in = dataset_dir+"ligands.in"
+            if not os.path.isfile(ligands_in):
+                data = bk.SyntheticData(dataset_dir,
+                                    self.scaling_seed+n_complexes)
+                data.write_dataset(n_complexes,self.scaling_ligand_atoms,
+                                    self.scaling_receptor_atoms)
+            return ligands_in,dataset_dir,n_complexes
+
+        # First complexes of ligands.in
+        fo_in = open(self.ligands_in,"r")
+        lines = fo_in.readlines()
+        fo_in.close()
+        header = [line for line in lines if line.startswith("PDB")][:1]
+        data = [line for line in lines if line.strip() != "" and
+                    not line.startswith("PDB") and "#" not in
+                    line.split(",")[0]][:n_complexes]
+        if len(data) < n_complexes:
+            print("Warning! Only ",len(data)," complexes in "+self.ligands_in)
+        ligands_in = self.scaling_dir+"ligands_"+str(n_complexes)+".in"
+        fo_out = open(ligands_in,"w")
+        fo_out.write("".join(header+data))
+        fo_out.close()
+        return ligands_in,self.dataset_dir,len(data)
+
+    # Define explore_run() method
+    def explore_run(self,ligands_in,dataset_dir,n_workers,label):
+        """Method to run Explore in a new process and return its run
+        metrics"""
+
+        # Import section
+        import csv
+        import json
+        import subprocess
+
+        # Input file of this run (sfs.in with dataset and workers replaced)
+        run_in = self.scaling_dir+label+".in"
+        scores_out = self.scaling_dir+label+".csv"
+        fo_sfs = open(self.sfs_in,"r")
+        lines = [line for line in csv.reader(fo_sfs) if len(line) == 0 or
+                    line[0].strip() not in RUN_KEYS]
+        fo_sfs.close()
+        fo_run = open(run_in,"w")
+        csv.writer(fo_run,lineterminator="\n").writerows(lines)
+        fo_run.write("dataset_dir,"+dataset_dir+"\n")
+        fo_run.write("ligands_in,"+ligands_in+"\n")
+        fo_run.write("scores_out,"+scores_out+"\n")
+        fo_run.write("n_workers,"+str(n_workers)+"\n")
+        fo_run.write("run_report,yes\ntrace,no\nprofile_slowest,0\n")
+        fo_run.close()
+
+        # Run Explore (output in a log file)
+        sfsxplorer = os.path.join(os.path.dirname(os.path.dirname(
+                                    os.path.abspath(__file__))),"sfsxplorer.py")
+        fo_log = open(self.scaling_dir+label+".log","w")
+        status = subprocess.call([sys.executable,sfsxplorer,run_in,"Explore"],
+                                    stdout=fo_log,stderr=subprocess.STDOUT)
+        fo_log.close()
+        if status != 0:
+            sys.exit("\nError! Run "+label+" failed (see "+self.scaling_dir+
+                        label+".log)")
+
+        # Return run metrics
+        fo_report = open(scores_out.replace(".csv","_run_metrics.json"),"r")
+        report = json.load(fo_report)
+        fo_report.close()
+        return report
+
+    # Define summarize() method
+    def summarize(self,mode,n_complexes,n_workers,report):
+        """Method to return a row of the scaling table from run metrics"""
+
+        # Busy time of workers (reading and energy terms), serialization, and
+        # the ordered writer
+        stage_time = report["stage_time"]
+        compute = sum([dt for stage,dt in stage_time.items() if stage in
+                        pd.FAMILIES+["read_AD4_bound","read_PDBQT"]])
+        serialize = stage_time.get("serialize",0.0)
+        deserialize = stage_time.get("deserialize",0.0)
+        writer = stage_time.get("format",0.0) + stage_time.get("write",0.0)
+        io_time = stage_time.get("read_AD4_bound",0.0) + \
+                    stage_time.get("read_PDBQT",0.0) + \
+                    stage_time.get("write",0.0)
+
+        # Fraction of wall time each stage keeps its processes busy
+        wall = report["wall_time"]
+        busy = {"compute":compute/(n_workers*wall),
+                "serialization":(serialize/n_workers + deserialize)/wall,
+                "writer":writer/wall}
+        bottleneck = max(busy,key=busy.get)
+
+        # Peak memory (main process and all workers)
+        peak = report.get("peak_rss_main_mb") or 0.0
+        if n_workers > 1:
+            peak += n_workers*report.get("peak_rss_worker_mb",0.0)
+
+        # Return row
+        return {"Mode":mode,"Complexes":n_complexes,"Workers":n_workers,
+                "Wall time (s)":wall,
+                "Complexes/h":report["complexes_per_hour"],
+                "Speedup":np.nan,"Efficiency":np.nan,
+                "Peak memory (MB)":peak,"I/O time (s)":io_time,
+                "Compute busy":busy["compute"],
+                "Serialization busy":busy["serialization"],
+                "Writer busy":busy["writer"],"Bottleneck":bottleneck}
+
+    # Define run() method
+    def run(self):
+        """Method to run strong and weak scaling studies"""
+
+        # Runs (mode, complexes, workers)
+        runs = []
+        if self.scaling_mode in ["strong","both"]:
+            runs += [("strong",size,w) for size in self.scaling_sizes
+                        for w in self.scaling_workers]
+        if self.scaling_mode in ["weak","both"]:
+            runs += [("weak",self.scaling_sizes[0]*w,w)
+                        for w in self.scaling_workers]
+
+        # Looping through runs
+        self.rows = []
+        done = {}
+        for mode,size,n_workers in runs:
+            ligands_in,dataset_dir,n_complexes = self.get_dataset(size)
+            key = (n_complexes,n_workers)
+            if key not in done:
+                print("Running ",n_complexes," complexes with ",n_workers,
+                        " workers...")
+                done[key] = self.explore_run(ligands_in,dataset_dir,n_workers,
+                        "run_"+str(n_complexes)+"_"+str(n_workers))
+            self.rows.append(self.summarize(mode,n_complexes,n_workers,
+                                            done[key]))
+
+        # Speedup and efficiency relative to the run with fewest workers
+        w_min = min(self.scaling_workers)
+        for row in self.rows:
+            if row["Mode"] == "strong":
+                ref = [r for r in self.rows if r["Mode"] == "strong" and
+                        r["Complexes"] == row["Complexes"] and
+                        r["Workers"] == w_min][0]
+                row["Speedup"] = ref["Wall time (s)"]/row["Wall time (s)"]
+            else:
+                # Same work per worker, so ideal wall time is constant
+                ref = [r for r in self.rows if r["Mode"] == "weak" and
+                        r["Workers"] == w_min][0]
+                row["Speedup"] = row["Workers"]/w_min*ref["Wall time (s)"]/\
+                                    row["Wall time (s)"]
+            row["Efficiency"] = row["Speedup"]*w_min/row["Workers"]
+
+    # Define write_scaling() method
+    def write_scaling(self):
+        """Method to show and write the scaling table"""
+
+        # Show table
+        columns = list(self.rows[0].keys())
+        print("\n{:<7s}{:>10s}{:>8s}{:>10s}{:>13s}{:>9s}{:>11s}{:>10s}"
+                "{:>9s}  {}".format("Mode","Complexes","Workers","Wall (s)",
+                "Complexes/h","Speedup","Efficiency","Peak (MB)","I/O (s)",
+                "Bottleneck"))
+        for row in self.rows:
+            print("{:<7s}{:>10d}{:>8d}{:>10.3f}{:>13.1f}{:>9.2f}{:>11.2f}"
+                    "{:>10.1f}{:>9.3f}  {}".format(row["Mode"],
+                    row["Complexes"],row["Workers"],row["Wall time (s)"],
+                    row["Complexes/h"],row["Speedup"],row["Efficiency"],
+                    row["Peak memory (MB)"],row["I/O time (s)"],
+                    row["Bottleneck"]))
+
+        # Write table
+        fo_out = open(self.scaling_out,"w")
+        fo_out.write(",".join(columns)+"\n")
+        for row in self.rows:
+            fo_out.write(",".join([str(row[column]) for column in columns])+
+                            "\n")
+        fo_out.close()
+
+        # Bottleneck with the largest number of workers
+        row = max(self.rows,key=lambda r: (r["Workers"],r["Complexes"]))
+        print("\nBottleneck with ",row["Workers"]," workers: "+
+                row["Bottleneck"]+" (busy: compute {:.2f}, serialization "
+                "{:.2f}, writer {:.2f})".format(row["Compute busy"],
+                row["Serialization busy"],row["Writer busy"]))
+        print("\nScaling table written in "+self.scaling_out)
+        print("\nDone!")
@@ -58,9 +58,13 @@
 ################################################################################
 #
 # Import section
+import os
 import sys
 import numpy as np
 from SFSXplorer import FF_AD4 as ad4
+from SFSXplorer import run_metrics as rm
+from SFSXplorer import pair_data as pd
+from SFSXplorer import term_grid as tg
 
 # Define Explorer() class
 class Explorer(object):
@@ -119,6 +123,26 @@ class Explorer(object):
             msg_out += "Finishing execution."
             sys.exit(msg_out)
         
+        # Set up default values for optional parameters
+        self.prune_warmup = 0       # Complexes before pruning (0 for none)
+        self.prune_tol = 1e-12      # Relative tolerance for constant columns
+        self.prune_corr_tol = 1e-6  # Collinear columns: |r| >= 1 - tol (0 for
+                                    # none)
+        self.sampling = "grid"      # Sampling of electrostatic and desolvation
+                                    # parameters (grid, sobol, or lhs)
+        self.sample_budget = 0      # Total columns for sobol or lhs sampling
+        self.sample_seed = None     # Seed for sobol or lhs sampling
+        self.run_report = True      # Write JSON report with run metrics
+        self.trace = False          # Write trace of stages (Chrome format)
+        self.profile_slowest = 0    # Slowest complexes to profile (0 for none)
+        self.profile_top = 15       # Functions shown for each stage
+        self.n_workers = 1          # Processes to calculate energy terms
+        self.columns_in = []        # Columns to calculate (names or files
+                                    # with features_in; all for empty lists)
+        self.columns_filter = []    # Families and ranges of parameters of
+                                    # columns to calculate (e.g., VDW,n=12)
+        self.columns_merge = True   # Merge selected columns into scores_out
+        
         # Looping through input file with commands (e.g., sfs.in)
         for line in csv:
             if line[0] == "#":
@@ -132,6 +156,48 @@ class Explorer(object):
             elif line[0].strip() == "binding_type":
                 self.binding_type = str(line[1])
             
+            # For pruning of columns during exploration
+            elif line[0].strip() == "prune_warmup":
+                self.prune_warmup = handle_hash("int",line[1])
+            elif line[0].strip() == "prune_tol":
+                self.prune_tol = handle_hash("float",line[1])
+            elif line[0].strip() == "prune_corr_tol":
+                self.prune_corr_tol = handle_hash("float",line[1])
+            
+            # For quasi-random sampling of continuous parameters
+            elif line[0].strip() == "sampling":
+                self.sampling = str(line[1]).strip().lower()
+            elif line[0].strip() == "sample_budget":
+                self.sample_budget = handle_hash("int",line[1])
+            elif line[0].strip() == "sample_seed":
+                self.sample_seed = handle_hash("int",line[1])
+            
+            # For run metrics
+            elif line[0].strip() == "run_report":
+                self.run_report = str(line[1]).strip().lower() in ["yes",
+                                                                "true","1"]
+            elif line[0].strip() == "trace":
+                self.trace = str(line[1]).strip().lower() in ["yes","true","1"]
+            elif line[0].strip() == "profile_slowest":
+                self.profile_slowest = handle_hash("int",line[1])
+            elif line[0].strip() == "profile_top":
+                self.profile_top = handle_hash("int",line[1])
+            
+            # For parallel exploration
+            elif line[0].strip() == "n_workers":
+                self.n_workers = handle_hash("int",line[1])
+            
+            # For selected columns
+            elif line[0].strip() == "columns_in":
+                self.columns_in += [ele.strip() for ele in line[1:]
+                                    if ele.strip() != ""]
+            elif line[0].strip() == "columns_filter":
+                self.columns_filter.append([ele.strip() for ele in line[1:]
+                                            if ele.strip() != ""])
+            elif line[0].strip() == "columns_merge":
+                self.columns_merge = str(line[1]).strip().lower() in ["yes",
+                                                                "true","1"]
+            
             # For van der Waals potential
             elif line[0].strip() == "pot_VDW_m_min":
                 self.pot_VDW_m_min = handle_hash("int",line[1])
@@ -217,86 +283,337 @@ class Explorer(object):
         self.fo0 = open(self.ligands_in,"r")
         self.csv0 = csv.reader(self.fo0)
 
+    # Define count_complexes() method
+    def count_complexes(self):
+        """Method to return the number of complexes in ligands.in"""
+        
+        # Import section
+        import csv
+        
+        # Count lines with complexes
+        fo_count = open(self.ligands_in,"r")
+        n_complexes = 0
+        for line in csv.reader(fo_count):
+            if len(line) > 0 and line[0].strip() != "PDB" and \
+                                                "#" not in line[0].strip():
+                n_complexes += 1
+        fo_count.close()
+        
+        # Return number of complexes
+        return n_complexes
+    
+    # Define set_parameter_sets() method
+    def set_parameter_sets(self):
+        """Method to set up parameters of electrostatic (A, epsilon0, k, lambda)
+        and desolvation (m, n, sigma) terms, on evenly spaced grids (sampling,
+        grid) or as Sobol (sampling, sobol) or Latin hypercube (sampling, lhs)
+        samples of the same ranges"""
+        
+        # Import section
+        import itertools
+        
+        # Ranges of parameters
+        elec_ranges = [(self.A_i,self.A_f),(self.epsilon0_i,self.epsilon0_f),
+                        (self.k_i,self.k_f),(self.lambda_i,self.lambda_f)]
+        desol_ranges = [(self.m_desol_i,self.m_desol_f),
+                        (self.n_desol_i,self.n_desol_f),
+                        (self.sigma_desol_i,self.sigma_desol_f)]
+        
+        # Evenly spaced grids (Cartesian product)
+        if self.sampling == "grid":
+            self.elec_params = list(itertools.product(
+                np.linspace(self.A_i,self.A_f,self.n_A),
+                np.linspace(self.epsilon0_i,self.epsilon0_f,self.n_epsilon0),
+                np.linspace(self.k_i,self.k_f,self.n_k),
+                np.linspace(self.lambda_i,self.lambda_f,self.n_lambda)))
+            self.desol_params = list(itertools.product(
+                np.linspace(self.m_desol_i,self.m_desol_f,self.n_m_desol),
+                np.linspace(self.n_desol_i,self.n_desol_f,self.n_n_desol),
+                np.linspace(self.sigma_desol_i,self.sigma_desol_f,
+                            self.n_sigma_desol)))
+            return
+        elif self.sampling not in ["sobol","lhs"]:
+            sys.exit("\nError! Sampling must be grid, sobol, or lhs!")
+        
+        # Invoke sample_sizes() method (columns left by van der Waals and
+        # hydrogen-bond terms)
+        n_vdw_hb = len(self.get_vdw_hb_terms())
+        n_elec,n_desol = self.sample_sizes(n_vdw_hb)
+        
+        # Samples scaled to ranges
+        self.elec_params = self.sample_parameters(elec_ranges,n_elec,0)
+        self.desol_params = self.sample_parameters(desol_ranges,n_desol,1)
+        
+        # Show message
+        print("\nSampling ("+self.sampling+"): ",n_elec,
+                " electrostatic and ",n_desol," desolvation parameter sets (",
+                n_vdw_hb + 3*n_elec + n_desol," of ",self.sample_budget,
+                " columns)")
+    
+    # Define sample_sizes() method
+    def sample_sizes(self,n_vdw_hb):
+        """Method to return the numbers of electrostatic and desolvation
+        parameter sets for sobol or lhs sampling, from the columns of
+        sample_budget left by n_vdw_hb van der Waals and hydrogen-bond terms
+        (rounded down to powers of two for sobol)"""
+        
+        # Columns left by van der Waals and hydrogen-bond terms
+        n_left = self.sample_budget - n_vdw_hb
+        if n_left < 4:
+            sys.exit("\nError! sample_budget must leave at least 4 columns "+
+                    "after "+str(n_vdw_hb)+" van der Waals and hydrogen-bond "+
+                    "terms!")
+        
+        # Columns shared by dimension (three electrostatic columns per sample;
+        # powers of two for sobol, whose sequences are balanced only for them)
+        n_elec = max(1,int(n_left*4/7)//3)
+        if self.sampling == "sobol":
+            n_elec = 2**(n_elec.bit_length() - 1)
+        n_desol = max(1,n_left - 3*n_elec)
+        if self.sampling == "sobol":
+            n_desol = 2**(n_desol.bit_length() - 1)
+        
+        # Return numbers of parameter sets
+        return n_elec,n_desol
+    
+    # Define get_term_grid() method
+    def get_term_grid(self):
+        """Method to set up the columns of sfs.in (self.term_grid), in the
+        order of write_energy() and with parameters in the order of column
+        names"""
+        
+        # Invoke set_parameter_sets() method
+        self.set_parameter_sets()
+        
+        # Invoke get_vdw_hb_terms() method
+        terms = self.get_vdw_hb_terms()
+        
+        # Electrostatic and desolvation terms
+        for family in ["Elec_Log","Elec_Tanh","Elec_Log_Tanh"]:
+            terms += [(family,tuple(params)) for params in self.elec_params]
+        terms += [("Desol",tuple(params)) for params in self.desol_params]
+        
+        # Instantiate an object of the TermGrid() class
+        self.term_grid = tg.TermGrid(terms)
+        
+        # Invoke select_columns() method (columns_in and columns_filter)
+        if len(self.columns_in) > 0 or len(self.columns_filter) > 0:
+            self.term_grid = self.select_columns(self.term_grid)
+        
+        # Return grid
+        return self.term_grid
+    
+    # Define get_vdw_hb_terms() method
+    def get_vdw_hb_terms(self):
+        """Method to return (family, (n, m)) of van der Waals and hydrogen-bond
+        columns (n != m), in the order of write_energy()"""
+        
+        # Looping through exponents
+        terms = []
+        for family,key in [("VDW","pot_VDW_"),("HB","pot_HB_")]:
+            for n_exp in range(getattr(self,key+"n_min"),
+                                getattr(self,key+"n_max")+1):
+                for m_exp in range(getattr(self,key+"m_min"),
+                                    getattr(self,key+"m_max")+1):
+                    # To avoid n_exp == m_exp
+                    if n_exp != m_exp:
+                        terms.append((family,(n_exp,m_exp)))
+        
+        # Return list of terms
+        return terms
+    
+    # Define select_columns() method
+    def select_columns(self,grid):
+        """Method to return the columns of columns_in (names, or files with a
+        features_in line such as those of Stats) and the columns of grid that
+        pass a filter of columns_filter (family followed by ranges of
+        parameters, e.g., VDW,n=12,m=5:6), grouped by family in the order of
+        write_energy()"""
+        
+        # Import section
+        import csv
+        
+        # Names of columns_in
+        names = []
+        for ele in self.columns_in:
+            if ele.startswith("v_"):
+                names.append(ele)
+            elif os.path.isfile(ele):
+                fo_features = open(ele,"r")
+                for line in csv.reader(fo_features):
+                    if len(line) > 0 and line[0].strip() == "features_in":
+                        names += [name.strip() for name in line[1:]
+                                    if name.strip() != ""]
+                fo_features.close()
+            else:
+                sys.exit("\nError! I can't find columns_in "+ele+"!")
+        
+        # Columns of grid that pass a filter (ranges as min:max or value)
+        for column_filter in self.columns_filter:
+            family,ranges = column_filter[0],{}
+            for condition in column_filter[1:]:
+                try:
+                    name,interval = condition.split("=")
+                    limits = [float(v) for v in interval.split(":")]
+                    ranges[name.strip()] = (limits[0],limits[-1])
+                except ValueError:
+                    sys.exit("\nError! Invalid columns_filter condition "+
+                                condition+" (e.g., n=12 or k=5.0:8.0)!")
+                if name.strip() not in sum(tg.PARAM_NAMES.values(),[]):
+                    sys.exit("\nError! Unknown parameter "+name.strip()+
+                                " in columns_filter!")
+            names += [term.name for term in grid.select(family,ranges)]
+        
+        # Unique columns grouped by family
+        try:
+            selected = tg.TermGrid(list(dict.fromkeys(names)))
+        except ValueError as err:
+            sys.exit("\nError! "+str(err)+" in columns_in!")
+        selected = tg.TermGrid(sorted(selected,key=lambda term:
+                                        pd.FAMILIES.index(term.family)))
+        
+        # Show message
+        print("\nSelected ",len(selected)," of ",len(grid)," columns")
+        
+        # Return grid
+        return selected
+    
+    # Define read_merge() method
+    def read_merge(self):
+        """Method to read the columns of an existing scores_out to be merged
+        with selected columns (None for explorations of all columns or new
+        files). Selected columns already in scores_out are removed from
+        self.term_grid"""
+        
+        # Import section
+        import csv
+        
+        # Selected columns and existing scores_out
+        if not self.columns_merge or not os.path.isfile(self.scores_out) or \
+                (len(self.columns_in) == 0 and len(self.columns_filter) == 0):
+            return None
+        fo_old = open(self.scores_out,"r")
+        rows = [line for line in csv.reader(fo_old) if len(line) > 0]
+        fo_old.close()
+        if len(rows) == 0:
+            return None
+        
+        # Columns and values of energy terms for each complex
+        n_data = len(rows[0])
+        for i,name in enumerate(rows[0]):
+            if name.startswith("v_"):
+                n_data = i
+                break
+        old_terms = rows[0][n_data:]
+        old_values = dict([(str(row[0].strip()),row[n_data:]) 
+                            for row in rows[1:]])
+        
+        # Complexes of ligands.in must be in scores_out
+        fo_codes = open(self.ligands_in,"r")
+        missing = [str(line[0].strip()) for line in csv.reader(fo_codes)
+                    if len(line) > 0 and line[0].strip() != "PDB" and 
+                    "#" not in line[0].strip() and 
+                    str(line[0].strip()) not in old_values]
+        fo_codes.close()
+        if len(old_terms) > 0 and len(missing) > 0:
+            sys.exit("\nError! Complexes missing in "+self.scores_out+" ("+
+                    ", ".join(missing[:5])+"); set columns_merge,no or "+
+                    "explore all columns!")
+        
+        # Selected columns not in scores_out
+        n_selected = len(self.term_grid)
+        self.term_grid = tg.TermGrid([term for term in self.term_grid
+                                        if term.name not in old_terms])
+        print("\nMerging with ",len(old_terms)," columns of "+
+                self.scores_out+" (",n_selected - len(self.term_grid),
+                " selected columns already there)")
+        
+        # Return columns and values
+        return old_terms,old_values
+    
+    # Define merge_scores() method
+    def merge_scores(self,merge_in,n_new,file_in):
+        """Method to write scores_out with the columns read by read_merge()
+        followed by the n_new columns just calculated (in file_in, which
+        replaces scores_out only after the merge is written)"""
+        
+        # Import section
+        import csv
+        
+        # Read new columns
+        old_terms,old_values = merge_in
+        fo_new = open(file_in,"r")
+        rows = [line for line in csv.reader(fo_new) if len(line) > 0]
+        fo_new.close()
+        n_data = len(rows[0]) - n_new
+        
+        # Write data, old columns, and new columns of each complex
+        fo_out = open(file_in,"w")
+        fo_out.write(",".join(rows[0][:n_data]+old_terms+rows[0][n_data:])+
+                        "\n")
+        for row in rows[1:]:
+            fo_out.write(",".join(row[:n_data]+old_values[str(row[0].strip())]
+                        +row[n_data:])+"\n")
+        fo_out.close()
+        os.replace(file_in,self.scores_out)
+        
+        # Show message
+        print("\nMerged ",n_new," new columns into "+self.scores_out)
+    
+    # Define sample_parameters() method
+    def sample_parameters(self,ranges,n_samples,stream):
+        """Method to return n_samples tuples of parameters within ranges
+        (rounded to six significant digits; n_samples is a power of two for
+        sobol)"""
+        
+        # Import section
+        from scipy.stats import qmc
+        
+        # Seed for each set of parameters
+        seed = None
+        if self.sample_seed is not None:
+            seed = np.random.default_rng([self.sample_seed,stream])
+        
+        # Samples in the unit hypercube
+        if self.sampling == "sobol":
+            sampler = qmc.Sobol(d=len(ranges),scramble=True,seed=seed)
+            u = sampler.random_base2(n_samples.bit_length() - 1)
+        else:
+            sampler = qmc.LatinHypercube(d=len(ranges),seed=seed)
+            u = sampler.random(n_samples)
+        
+        # Scale samples to ranges
+        lower = np.array([r[0] for r in ranges],dtype=float)
+        upper = np.array([r[1] for r in ranges],dtype=float)
+        x = lower + u*(upper - lower)
+        
+        # Return parameters
+        return [tuple(float("{:.6g}".format(v)) for v in row) for row in x]
+    
     # Define write_energy() method
     def write_energy(self):
-        """Method to write energy terms"""
-        
-        # Open scores_ff_all.csv
-        self.fo1 = open(self.scores_out,"w")
+        """Method to write energy terms (only selected columns with
+        columns_in or columns_filter, merged into an existing scores_out)"""
         
         ########################################################################
-        # For van der Waals potential
+        # Invoke get_term_grid() method (columns of sfs.in)
+        self.get_term_grid()
         
-        # Set up headers
-        headers_VDW = ""
-        for n_exp in range(self.pot_VDW_n_min,self.pot_VDW_n_max+1):
-            for m_exp in range(self.pot_VDW_m_min,self.pot_VDW_m_max+1):
-                # To avoid n_exp == m_exp
-                if n_exp != m_exp:
-                    headers_VDW += "v_VDW_"+str(n_exp)+"_"+str(m_exp)+","
+        # Invoke read_merge() method (columns of an existing scores_out)
+        merge_in = self.read_merge()
+        if merge_in is not None and len(self.term_grid) == 0:
+            self.fo0.close()
+            print("\nAll selected columns are in "+self.scores_out)
+            print("\nDone!")
+            return
+        
+        # Open scores_ff_all.csv (a temporary file next to it when merging,
+        # so that scores_out is kept until the merge is written)
+        file_out = self.scores_out
+        if merge_in is not None:
+            file_out = self.scores_out+".tmp"
+        self.fo1 = open(file_out,"w")
         
-        ########################################################################
-        # For van der Waals potential
-        
-        # Set up headers
-        headers_HB = ""
-        for n_exp in range(self.pot_HB_n_min,self.pot_HB_n_max+1):
-            for m_exp in range(self.pot_HB_m_min,self.pot_HB_m_max+1):
-                # To avoid n_exp == m_exp
-                if n_exp != m_exp:
-                    headers_HB += "v_HB_"+str(n_exp)+"_"+str(m_exp)+","
-        
-        # Put together van der Waals and hydrogen bond potentials
-        terms_VDW_HB = headers_VDW+headers_HB 
-
-        ########################################################################
-        # For Electrostatic Potential
-                
-        # Set up arrays
-        a_array = np.linspace(self.A_i,self.A_f,self.n_A)
-        e0_array = np.linspace(self.epsilon0_i,self.epsilon0_f,self.n_epsilon0)
-        k_array = np.linspace(self.k_i,self.k_f,self.n_k)
-        l_array = np.linspace(self.lambda_i,self.lambda_f,self.n_lambda)
-                                
-        # Set up empty strings
-        v_Elec_logistic_terms = ""
-        v_Elec_tanh_terms = ""
-        v_Elec_logistic_tanh_terms = ""
-                                
-        # Looping through a_array, e0_array, k_array, and l_array
-        for a in a_array:
-            for e0 in e0_array:
-                for k in k_array:
-                    for l in l_array:
-                                
-                        # Set up headers for electrostatic potential
-                        v_Elec_logistic_terms += "v_Elec_Log_"+str(a)+"_"+\
-                        str(e0)+"_"+str(k)+"_"+str(l)+","
-                        v_Elec_tanh_terms += "v_Elec_Tanh_"+str(a)+"_"+\
-                        str(e0)+"_"+str(k)+"_"+str(l)+","
-                        v_Elec_logistic_tanh_terms += "v_Elec_Log_Tanh_"+\
-                        str(a)+"_"+str(e0)+"_"+str(k)+"_"+str(l)+","
-                                
-        ########################################################################
-        # For desolvation potentials
-                
-        # Set up empty string
-        v_Desol_terms = ""
-        
-        # Set up arrays
-        m_array_desol = np.linspace(self.m_desol_i,self.m_desol_f,self.n_m_desol)
-        n_array_desol = np.linspace(self.n_desol_i,self.n_desol_f,self.n_n_desol)
-        s_array_desol = np.linspace(self.sigma_desol_i,self.sigma_desol_f,
-                                    self.n_sigma_desol)
-                
-        # Looping through m_array_desol, n_array_desol, and s_array_desol
-        for m in m_array_desol:
-            for n in n_array_desol:
-                for sigma in s_array_desol:
-            
-                    # Set up headers for desolvation potential
-                    v_Desol_terms+="v_Desol_"+str(m)+"_"+str(n)+"_"+str(sigma)+","
-                                
         ########################################################################
         # Instantiating an object of the InterMol() class and assign it to pot.
         # It uses AutoDock4 force field parameters.
@@ -314,152 +631,330 @@ class Explorer(object):
 
             break
         
-        # Write header
-        line_out = header_in+terms_VDW_HB+v_Elec_logistic_terms
-        line_out += v_Elec_tanh_terms+v_Elec_logistic_tanh_terms
-        line_out += v_Desol_terms[:len(v_Desol_terms)-1]
-        self.fo1.write(line_out+"\n")
-                    
-        # Looping through csv0
-        for line in self.csv0:
-    
-            # Check keyword to get ligand data
-            if line[0].strip() != "PDB" and "#" not in line[0].strip():
-            
-                # Assign directory for a specific PDB to name_dir 
-                name_dir = self.dataset_dir+str(line[0].strip())+"/" 
-        
-                # Show from where it is reading
-                print(name_dir)
+        # Set up list of terms (one per column)
+        terms_all = list(self.term_grid.names)
         
-                # Invoking read_AD4_bound() method
-                par_list = pot.read_AD4_bound()
+        # Set up pruning of constant, non-finite, and duplicate columns
+        self.pruned = {}            # Pruned columns and reasons
+        buffer_out = []             # Lines kept until the end of warm-up
+        if self.prune_warmup > 0:
+            print("\nPruning columns after ",self.prune_warmup," complexes")
+        else:
+            # Write header
+            self.fo1.write(header_in+",".join(terms_all)+"\n")
         
-                # Invoking read_PDBQT() method
-                lig_list = pot.read_PDBQT(name_dir+"lig.pdbqt")
+        # Instantiate an object of the RunMetrics() class
+        metrics = rm.RunMetrics(self.count_complexes(),self.trace)
         
-                # Invoking read_PDBQT() method
-                receptor_list = pot.read_PDBQT(name_dir+"receptor.pdbqt")
+        # Lines with complexes (warm-up lines first, so that pruned columns are
+        # skipped by workers after warm-up)
+        lines = [line for line in self.csv0 if len(line) > 0 and
+                    line[0].strip() != "PDB" and "#" not in line[0].strip()]
+        if self.prune_warmup > 0:
+            phases = [lines[:self.prune_warmup],lines[self.prune_warmup:]]
+        else:
+            phases = [lines]
         
-                ################################################################
-                # Calculate van der Waals potentials
-                string_VDW = ""
-                for n_exp in range(self.pot_VDW_n_min,self.pot_VDW_n_max+1):
-                    for m_exp in range(self.pot_VDW_m_min,self.pot_VDW_m_max+1):
-                        # To avoid n_exp == m_exp
-                        if n_exp != m_exp:
-                            v_VDW_n_m = pot.intermol_pot_VDW(par_list,lig_list,
-                                    receptor_list,n_exp,m_exp) 
-                            string_VDW += ","+str(v_VDW_n_m) 
-                
-                ################################################################
-                # Calculate hydrongen-bond potentials
-                string_HB = ""
-                for n_exp in range(self.pot_HB_n_min,self.pot_HB_n_max+1):
-                    for m_exp in range(self.pot_HB_m_min,self.pot_HB_m_max+1):
-                        # Avoid n_exp == m_exp
-                        if n_exp != m_exp:
-                            v_HB_n_m = pot.intermol_pot_HB(par_list,lig_list,
-                            receptor_list,n_exp,m_exp) 
-                            string_HB += ","+str(v_HB_n_m) 
-                
-                ################################################################
-                # For Electrostatic Potential (Logistic Function)
-                                
-                # Set up empty string
-                v_Elec_logistic = ""
-                
-                # Set up weights for logistic function
-                log_w = 1.0
-                tanh_w = 0.0
-                
-                # Looping through a_array, e0_array, k_array, and l_array
-                for a in a_array:
-                    for e0 in e0_array:
-                        for k in k_array:
-                            for l in l_array:
-                                
-                                # Invoking intermol_electro() method 
-                                v_Elec_pot = pot.intermol_electro(lig_list,
-                                        receptor_list,l,k,a,e0,log_w,tanh_w)
-                                v_Elec_logistic +=str(v_Elec_pot)+","
-
-                ################################################################
-                # For Electrostatic Potential (Hyperbolic Tangent Function)
-                                
-                # Set up empty string
-                v_Elec_tanh = ""
-                
-                # Set up weights for hyperbolic tangent function
-                log_w = 0.0
-                tanh_w = 1.0
-                
-                # Looping through a_array, e0_array, k_array, and l_array
-                for a in a_array:
-                    for e0 in e0_array:
-                        for k in k_array:
-                            for l in l_array:
-                                
-                                # Invoking intermol_electro() method 
-                                v_Elec_pot = pot.intermol_electro(lig_list,
-                                        receptor_list,l,k,a,e0,log_w,tanh_w)
-                                v_Elec_tanh +=str(v_Elec_pot)+","                
-                
-                ################################################################
-                # For Electrostatic Potential (Logistic + 
-                # Hyperbolic Tangent Function)
-                                
-                # Set up empty string
-                v_Elec_logistic_tanh = ""
-                
-                # Set up weights for hyperbolic tangent function
-                log_w = 0.5
-                tanh_w = 0.5
-                
-                # Looping through a_array, e0_array, k_array, and l_array
-                for a in a_array:
-                    for e0 in e0_array:
-                        for k in k_array:
-                            for l in l_array:
-                                
-                                # Invoking intermol_pot_Desol() method 
-                                v_Elec_pot = pot.intermol_electro(lig_list,
-                                receptor_list,l,k,a,e0,log_w,tanh_w)
-                                v_Elec_logistic_tanh +=str(v_Elec_pot)+"," 
-                
-                ################################################################
-                # For desolvation potential
-                
-                # Set up empty string
-                v_Desol = ""
-                                
-                # Looping through m_array_desol, n_array_desol, and s_array_desol
-                for m in m_array_desol:
-                    for n in n_array_desol:
-                        for sigma in s_array_desol:
+        # Set up pool of workers
+        pool = None
+        if self.n_workers > 1:
+            pool = self.start_pool()
             
-                            # Invoking intermol_pot_Desol() method
-                            v_Desol_pot = pot.intermol_pot_Desol(par_list,lig_list,
-                            receptor_list,m,n,sigma)
-                            v_Desol += str(v_Desol_pot)+","
-                                
+        # Looping through complexes
+        for phase in phases:
+            for line,result in zip(phase,self.calc_complexes(pot,phase,
+                                                            metrics,pool)):
+                values,n_lig,n_rec = result
+                        
                 ################################################################
-                # Set up line_VDW_HB
-                line_VDW_HB = string_VDW+string_HB 
-                
                 # Set up an empty string
                 data_in = ""
         
                 # Looping through the data (from bind_####.csv)
                 for count,ele in enumerate(line):
                     data_in += line[count]+","
+                data_in = data_in[:len(data_in)-3]
+                metrics.lap("format")
+                
+                # Keep lines during warm-up
+                if self.prune_warmup > 0 and len(buffer_out) < \
+                                                            self.prune_warmup:
+                    buffer_out.append((data_in,values))
+                    
+                    # Invoke prune_terms() method at the end of warm-up
+                    if len(buffer_out) == self.prune_warmup:
+                        terms_all = self.prune_terms(header_in,terms_all,
+                                                        buffer_out)
+                    metrics.lap("write")
+                    metrics.end_complex(n_lig,n_rec,len(values))
+                    continue
                 
                 # Write line
-                self.fo1.write(data_in[:len(data_in)-3]+\
-                line_VDW_HB+","+v_Elec_logistic+\
-                v_Elec_tanh+v_Elec_logistic_tanh+v_Desol[:len(v_Desol)-1]+"\n")
+                self.fo1.write(data_in+","+",".join(values)+"\n")
+                metrics.lap("write")
+                metrics.end_complex(n_lig,n_rec,len(values))
+        
+        # Close pool of workers
+        if pool is not None:
+            pool.close()
+            pool.join()
+        
+        # Write lines for datasets smaller than warm-up (nothing pruned)
+        if self.prune_warmup > 0 and len(buffer_out) < self.prune_warmup:
+            self.fo1.write(header_in+",".join(terms_all)+"\n")
+            for data_in,values in buffer_out:
+                self.fo1.write(data_in+","+",".join(values)+"\n")
         
         # Close files
         self.fo0.close()
         self.fo1.close()
-        print("\nDone!")
\ No newline at end of file
+        
+        # Invoke merge_scores() method
+        if merge_in is not None:
+            self.merge_scores(merge_in,len(terms_all),file_out)
+        
+        # Write run metrics
+        if self.run_report:
+            metrics.write_report(self.scores_out.replace(".csv",
+                    "_run_metrics.json"),{"columns":len(terms_all),
+                    "pruned_columns":len(self.pruned),
+                    "n_workers":self.n_workers})
+        if self.trace:
+            metrics.write_trace(self.scores_out.replace(".csv","_trace.json"))
+        
+        # Invoke profile_slowest_complexes() method
+        if self.profile_slowest > 0:
+            self.profile_slowest_complexes(pot,metrics)
+        print("\nDone!")
+    
+    # Define profile_slowest_complexes() method
+    def profile_slowest_complexes(self,pot,metrics):
+        """Method to run the slowest complexes again with cProfile and write
+        the functions with the largest internal time for each stage"""
+        
+        # Slowest complexes (wall time from run metrics)
+        slowest = sorted(metrics.complexes,key=lambda c: c.get("worker_time",
+                    c["wall_time"]),reverse=True)[:self.profile_slowest]
+        print("\nProfiling ",len(slowest)," slowest complexes...")
+        
+        # Instantiate an object of the StageProfiler() class
+        profiler = rm.StageProfiler()
+        
+        # Looping through slowest complexes
+        for complex_in in slowest:
+            name_dir = self.dataset_dir+complex_in["PDB"]+"/"
+            profiler.start_complex(complex_in["PDB"])
+            self.calc_terms(pot,name_dir,profiler)
+            profiler.end_complex()
+        
+        # Write summary
+        profiler.write_summary(self.scores_out.replace(".csv","_profile.txt"),
+                                self.profile_top)
+    
+    # Define start_pool() method
+    def start_pool(self):
+        """Method to start a pool of n_workers processes, each with a copy of
+        the parameters of this object"""
+        
+        # Import section
+        import multiprocessing
+        
+        # Attributes without open files
+        state = dict([(key,value) for key,value in self.__dict__.items() 
+                        if key not in ["fo0","csv0","fo1"]])
+        
+        # Show message
+        print("\nCalculating energy terms with ",self.n_workers," workers")
+        
+        # Return pool
+        return multiprocessing.Pool(self.n_workers,initializer=init_worker,
+                                    initargs=(state,))
+    
+    # Define calc_complexes() method
+    def calc_complexes(self,pot,lines,metrics,pool):
+        """Generator of energy terms of complexes in the order of lines,
+        calculated here (pool is None) or by a pool of workers"""
+        
+        # Import section
+        import pickle
+        
+        # Calculate terms in this process
+        if pool is None:
+            for line in lines:
+                metrics.start_complex(str(line[0].strip()))
+                yield self.calc_terms(pot,self.dataset_dir+
+                                        str(line[0].strip())+"/",metrics)
+            return
+        
+        # Calculate terms in workers (results are returned in order)
+        tasks = [(str(line[0].strip()),self.dataset_dir+
+                    str(line[0].strip())+"/",self.pruned,metrics.trace) 
+                    for line in lines]
+        results = pool.imap(calc_complex,tasks)
+        for task in tasks:
+            metrics.start_complex(task[0])
+            values_bytes,n_lig,n_rec,worker = next(results)
+            metrics.lap("wait")
+            values = pickle.loads(values_bytes)
+            metrics.lap("deserialize")
+            metrics.add_worker(worker)
+            yield values,n_lig,n_rec
+    
+    # Define calc_terms() method
+    def calc_terms(self,pot,name_dir,metrics):
+        """Method to read a complex and calculate its energy terms (columns in
+        self.pruned are skipped). Returns values as strings and the number of
+        ligand and receptor atoms"""
+        
+        # Invoking read_AD4_bound() method
+        par_list = pot.read_AD4_bound()
+        metrics.lap("read_AD4_bound")
+        
+        # Invoking read_PDBQT() method
+        lig_list = pot.read_PDBQT(name_dir+"lig.pdbqt")
+        
+        # Invoking read_PDBQT() method
+        receptor_list = pot.read_PDBQT(name_dir+"receptor.pdbqt")
+        metrics.lap("read_PDBQT")
+        
+        # Looping through families of the grid of columns (columns in
+        # self.pruned are skipped)
+        values = []
+        for family in pd.FAMILIES:
+            for term in self.term_grid.family(family):
+                if term.index in self.pruned:
+                    continue
+                
+                # Invoking reference() function (loops of InterMol)
+                values.append(str(tg.reference(pot,par_list,lig_list,
+                                receptor_list,term.family,term.params)))
+            metrics.lap(family)
+        
+        # Return results
+        return values,len(lig_list),len(receptor_list)
+    
+    # Define prune_terms() method
+    def prune_terms(self,header_in,terms_all,buffer_out):
+        """Method to find constant, non-finite, duplicate, and collinear
+        columns in the warm-up lines, write header and warm-up lines without
+        them, and record pruned terms. Returns the list of remaining terms"""
+        
+        # Set up matrix with warm-up values (complexes x terms)
+        warm = np.array([[float(v) for v in values] 
+                            for data_in,values in buffer_out])
+        
+        # Looping through terms
+        kept = []
+        seen = {}
+        for j,term in enumerate(terms_all):
+            col = warm[:,j]
+            if not np.all(np.isfinite(col)):
+                self.pruned[j] = ("non-finite","")
+            elif np.max(col) - np.min(col) <= \
+                                    self.prune_tol*max(1.0,np.abs(np.mean(col))):
+                self.pruned[j] = ("constant",str(col[0]))
+            elif col.tobytes() in seen:
+                self.pruned[j] = ("duplicate",seen[col.tobytes()])
+            else:
+                seen[col.tobytes()] = term
+                kept.append(j)
+        
+        # Invoke collinear_terms() method (at least three warm-up lines)
+        if self.prune_corr_tol > 0 and len(buffer_out) > 2:
+            for j,i in self.collinear_terms(warm,kept).items():
+                self.pruned[j] = ("collinear",terms_all[i])
+            kept = [j for j in kept if j not in self.pruned]
+        
+        # Write header and warm-up lines
+        terms_kept = [terms_all[j] for j in kept]
+        self.fo1.write(header_in+",".join(terms_kept)+"\n")
+        for data_in,values in buffer_out:
+            self.fo1.write(data_in+","+",".join([values[j] for j in kept])+"\n")
+        
+        # Write pruned terms
+        pruned_out = self.scores_out.replace(".csv","_pruned.csv")
+        fo_pruned = open(pruned_out,"w")
+        fo_pruned.write("Term,Reason,Reference\n")
+        for j in sorted(self.pruned):
+            fo_pruned.write(terms_all[j]+","+",".join(self.pruned[j])+"\n")
+        fo_pruned.close()
+        
+        # Show message
+        print("\nPruned ",len(self.pruned)," of ",len(terms_all),
+                " columns after warm-up (see "+pruned_out+")")
+        
+        # Return remaining terms
+        return terms_kept
+    
+    # Define collinear_terms() method
+    def collinear_terms(self,warm,kept):
+        """Method to return a dictionary with columns of warm (among kept)
+        whose |r| with an earlier remaining column is at least
+        1 - prune_corr_tol, and that column"""
+        
+        # Import section
+        from scipy.spatial import cKDTree
+        
+        # Unit vectors of centered columns (|r| >= 1 - tol when z_i or -z_i is
+        # within sqrt(2 tol) of z_j)
+        z = warm[:,kept] - np.mean(warm[:,kept],axis=0)
+        z /= np.linalg.norm(z,axis=0)
+        n_kept = len(kept)
+        
+        # Candidate pairs from a projection on three orthonormal directions
+        # (distances do not increase), checked with correlation coefficients
+        basis,_ = np.linalg.qr(np.random.default_rng(0).normal(size=(len(z),
+                                                            min(3,len(z)))))
+        u = basis.T @ z
+        tree = cKDTree(np.vstack((u.T,-u.T)))
+        pairs = tree.query_pairs(np.sqrt(2.0*self.prune_corr_tol),
+                                    output_type="ndarray") % n_kept
+        pairs = pairs[pairs[:,0] != pairs[:,1]]
+        r = np.einsum("ij,ij->j",z[:,pairs[:,0]],z[:,pairs[:,1]])
+        pairs = pairs[np.abs(r) >= 1.0 - self.prune_corr_tol]
+        
+        # Earlier neighbors of each column
+        neighbors = {}
+        for a,b in pairs:
+            neighbors.setdefault(max(a,b),[]).append(min(a,b))
+        
+        # Looping through columns (pruned ones are not references)
+        collinear = {}
+        for q in sorted(neighbors):
+            for p in sorted(neighbors[q]):
+                if kept[p] not in collinear:
+                    collinear[kept[q]] = kept[p]
+                    break
+        
+        # Return columns and references
+        return collinear
+
+# Define init_worker() function
+def init_worker(state):
+    """Function to set up an Explorer object in a worker process"""
+    
+    # Explorer with parameters of the main process
+    global worker_space,worker_pot
+    worker_space = Explorer.__new__(Explorer)
+    worker_space.__dict__.update(state)
+    worker_pot = ad4.InterMol("misc/data/AD4.1_bound.dat")
+
+# Define calc_complex() function
+def calc_complex(task):
+    """Function to calculate energy terms of a complex in a worker process.
+    Values are pickled here, so the time to serialize them is recorded"""
+    
+    # Import section
+    import pickle
+    
+    # Calculate terms (columns pruned in the main process are skipped)
+    name,name_dir,pruned,trace = task
+    worker_space.pruned = pruned
+    metrics = rm.RunMetrics(0,trace)
+    metrics.start_complex(name)
+    values,n_lig,n_rec = worker_space.calc_terms(worker_pot,name_dir,metrics)
+    values_bytes = pickle.dumps(values)
+    metrics.lap("serialize")
+    
+    # Return results
+    return values_bytes,n_lig,n_rec,metrics.get_worker()
@@ -66,6 +66,33 @@ class Stats(object):
         except IOError:
             sys.exit("\nIOError! I can't find ",self.sfs_input," file!")
         
+        # Set up default values for optional parameters
+        self.n_permutations = 0     # Number of permutations (0 for no test)
+        self.permutation_batch = 100    # Permutations per matrix product
+        self.permutation_seed = None    # Seed for permutations
+        self.alpha_fwer = 0.05      # Significance level for FWER threshold
+        self.block_columns = 10000  # Columns per block in batched metrics
+        self.exp_string = None      # Column with experimental data
+        self.exp_strings = []       # Columns with experimental data (targets)
+        self.activity_string = None # Column with activity labels (1 or 0)
+        self.score_order = "ascending"  # Lower scores rank first
+        self.bedroc_alpha = 20.0    # BEDROC early recognition parameter
+        self.ef_fractions = [0.01,0.05,0.10]    # Fractions for enrichment
+        self.group_string = None    # Categorical column to group rows
+        self.group_values = []      # Groups to analyze (all if empty)
+        self.min_group_size = 3     # Minimum number of rows in a group
+        self.calibrate = False      # Metrics for calibrated predictions
+        self.cv_folds = 0           # Folds for cross-validated calibration
+                                    # (0 for none, -1 for leave-one-out)
+        self.cv_seed = None         # Seed to assign rows to folds
+        self.combination_search = False # Search combinations of families
+        self.combo_top_k = 10       # Columns per family (0 for all)
+        self.combo_top_n = 100      # Combinations in the leaderboard
+        self.combo_batch = 10000    # Combinations solved at once
+        self.redundancy_threshold = 0.0 # |r| to cluster columns (0 for none)
+        self.leaderboard_top = 10   # Columns per metric in the leaderboard
+        self.verbose = False        # Show metrics for every column
+        
         # Looping through stats.in
         for line in csv_stats:
             if line[0] == "#":
@@ -74,8 +101,15 @@ class Stats(object):
                 self.scores_out = str(line[1])
                 self.stats_analysis = self.scores_out.replace(".csv",
                                                     "_stats_analysis.csv")
+                self.enrichment_analysis = self.scores_out.replace(".csv",
+                                                "_enrichment_analysis.csv")
             elif line[0].strip() == "exp_string":
-                self.exp_string = str(line[1])
+                # One or more targets (e.g., pKd,pKi,pIC50)
+                self.exp_strings = [str(ele) for ele in line[1:]
+                                        if ele.strip() != ""]
+                if len(self.exp_strings) == 0:
+                    sys.exit("\nError! exp_string needs at least one column!")
+                self.exp_string = self.exp_strings[0]
             elif line[0].strip() == "n_features_in":
                 self.n_features_in = int(line[1].strip())
             elif line[0].strip() == "features_in":
@@ -85,6 +119,56 @@ class Stats(object):
                 # Looping through the features
                 for i in range(1,self.n_features_in+1):
                     features_list.append(line[i])
+            elif line[0].strip() == "n_permutations":
+                self.n_permutations = int(line[1].strip())
+            elif line[0].strip() == "permutation_batch":
+                self.permutation_batch = int(line[1].strip())
+            elif line[0].strip() == "permutation_seed":
+                self.permutation_seed = int(line[1].strip())
+            elif line[0].strip() == "alpha_fwer":
+                self.alpha_fwer = float(line[1].strip())
+            elif line[0].strip() == "block_columns":
+                self.block_columns = int(line[1].strip())
+            elif line[0].strip() == "activity_string":
+                self.activity_string = str(line[1])
+            elif line[0].strip() == "group_string":
+                self.group_string = str(line[1])
+            elif line[0].strip() == "group_values":
+                self.group_values = [str(ele).strip() for ele in line[1:]
+                                        if ele.strip() != ""]
+            elif line[0].strip() == "min_group_size":
+                self.min_group_size = int(line[1].strip())
+            elif line[0].strip() == "calibrate":
+                self.calibrate = line[1].strip().lower() in ["yes","true","1"]
+            elif line[0].strip() == "cv_folds":
+                if line[1].strip().lower() == "loo":
+                    self.cv_folds = -1
+                else:
+                    self.cv_folds = int(line[1].strip())
+            elif line[0].strip() == "cv_seed":
+                self.cv_seed = int(line[1].strip())
+            elif line[0].strip() == "combination_search":
+                self.combination_search = line[1].strip().lower() in ["yes",
+                                                                "true","1"]
+            elif line[0].strip() == "combo_top_k":
+                self.combo_top_k = int(line[1].strip())
+            elif line[0].strip() == "combo_top_n":
+                self.combo_top_n = int(line[1].strip())
+            elif line[0].strip() == "combo_batch":
+                self.combo_batch = int(line[1].strip())
+            elif line[0].strip() == "redundancy_threshold":
+                self.redundancy_threshold = float(line[1].strip())
+            elif line[0].strip() == "leaderboard_top":
+                self.leaderboard_top = int(line[1].strip())
+            elif line[0].strip() == "verbose":
+                self.verbose = line[1].strip().lower() in ["yes","true","1"]
+            elif line[0].strip() == "score_order":
+                self.score_order = line[1].strip().lower()
+            elif line[0].strip() == "bedroc_alpha":
+                self.bedroc_alpha = float(line[1].strip())
+            elif line[0].strip() == "ef_fractions":
+                self.ef_fractions = [float(ele) for ele in line[1:]
+                                        if ele.strip() != ""]
         
         # Close file
         fo_stats.close()
@@ -147,6 +231,14 @@ class Stats(object):
         
         # Write header
         header_string = "Feature,r,p-value,r2,rho,p-value,MSE,RMSE,RSS,MAE,R2"
+        header_string += ",tau-b,C-index"
+        if self.calibrate:
+            header_string += ",slope,intercept,MSE(cal),RMSE(cal),MAE(cal)"
+            header_string += ",R2(cal)"
+            if self.cv_folds != 0:
+                header_string += ",RMSE(cv),MAE(cv),Q2(cv)"
+        if self.n_permutations > 0:
+            header_string += ",p-perm(r),p-FWER(r),p-perm(rho),p-FWER(rho)"
         fo_metrics.write(header_string+"\n")
         
         # Looping through self.columns()
@@ -158,13 +250,77 @@ class Stats(object):
             line_o += str(self.rho_array[i])+","+str(self.p_v_rho_array[i])+","
             line_o += str(self.mse_array[i])+","+str(self.rmse_array[i])+","
             line_o += str(self.rss_array[i])+","+str(self.mae_array[i])+","
-            line_o += str(self.r2_array[i])
+            line_o += str(self.r2_array[i])+","
+            line_o += str(self.tau_b_array[i])+","+str(self.c_index_array[i])
+            if self.calibrate:
+                line_o += ","+str(self.slope_array[i])
+                line_o += ","+str(self.intercept_array[i])
+                line_o += ","+str(self.mse_cal_array[i])
+                line_o += ","+str(self.rmse_cal_array[i])
+                line_o += ","+str(self.mae_cal_array[i])
+                line_o += ","+str(self.r2_cal_array[i])
+                if self.cv_folds != 0:
+                    line_o += ","+str(self.rmse_cv_array[i])
+                    line_o += ","+str(self.mae_cv_array[i])
+                    line_o += ","+str(self.q2_cv_array[i])
+            if self.n_permutations > 0:
+                line_o += ","+str(self.p_perm_r_array[i])
+                line_o += ","+str(self.p_fwer_r_array[i])
+                line_o += ","+str(self.p_perm_rho_array[i])
+                line_o += ","+str(self.p_fwer_rho_array[i])
             fo_metrics.write(line_o+"\n")
-            print(line_o)
+            if self.verbose:
+                print(line_o)
         
         # Close file
         fo_metrics.close()
         
+    # Define leaderboard_metrics() method
+    def leaderboard_metrics(self):
+        """Method to return metrics ranked in the leaderboard as tuples
+        (name, array, True if larger is better)"""
+        
+        # Metrics for all analyses
+        metrics = [("rho",self.rho_array,True),("r",self.r_array,True),
+                    ("tau-b",self.tau_b_array,True),
+                    ("C-index",self.c_index_array,True),
+                    ("MAE",self.mae_array,False),("MSE",self.mse_array,False),
+                    ("RMSE",self.rmse_array,False),("RSS",self.rss_array,False),
+                    ("R2",self.r2_array,True)]
+        
+        # Optional metrics
+        if self.calibrate:
+            metrics.append(("RMSE(cal)",self.rmse_cal_array,False))
+            if self.cv_folds != 0:
+                metrics.append(("RMSE(cv)",self.rmse_cv_array,False))
+                metrics.append(("Q2(cv)",self.q2_cv_array,True))
+        if self.n_permutations > 0:
+            metrics.append(("p-FWER(r)",self.p_fwer_r_array,False))
+            metrics.append(("p-FWER(rho)",self.p_fwer_rho_array,False))
+        
+        # Return list
+        return metrics
+    
+    # Define write_leaderboard() method
+    def write_leaderboard(self):
+        """Method to write the top columns for each metric"""
+        
+        # Leaderboard file for the current analysis
+        self.leaderboard_out = self.stats_analysis.replace("_stats_analysis",
+                                                            "_leaderboard")
+        
+        # Write ranked columns for each metric
+        fo_board = open(self.leaderboard_out,"w")
+        fo_board.write("Metric,Rank,Feature,Value\n")
+        for metric,array,largest,idx in self.leaders:
+            for rank,i in enumerate(idx[:self.leaderboard_top]):
+                fo_board.write(metric+","+str(rank+1)+","+self.terms[i]+","+
+                                str(array[i])+"\n")
+        fo_board.close()
+        
+        # Show message
+        print("\nLeaderboard written in "+self.leaderboard_out)
+    
     # Define get_experimental_index() method
     def get_experimental_index(self):
         """Method to get index of experimental column from a CSV file"""
@@ -234,6 +390,43 @@ class Stats(object):
         # Return array
         return data_array
             
+    # Define get_matrix() method
+    def get_matrix(self,cols_in):
+        """Method to get a matrix with the columns in cols_in (one row per
+        complex)"""
+        
+        # Import section
+        import numpy as np
+        
+        # Update column numbers and return matrix
+        return self.pie2go[:,np.array(cols_in,dtype=int)-1]
+            
+    # Define get_categories() method
+    def get_categories(self,string_in):
+        """Method to get a categorical column (e.g., binding type) as an array
+        of strings"""
+        
+        # Import section
+        import csv
+        import numpy as np
+        
+        # Get column index
+        index_in = self.header.index(string_in)
+        
+        # Open CSV file
+        fo1 = open(self.scores_out,"r")
+        csv1 = csv.reader(fo1)
+        
+        # Looping through csv1 (skip header)
+        next(csv1)
+        categories = [line[index_in].strip() for line in csv1 if len(line) > 0]
+        
+        # Close file
+        fo1.close()
+        
+        # Return array
+        return np.array(categories)
+            
     # Define calc_ESS() method
     def calc_ESS(self,x,y_pred):
         """Calculate Explained Sum of Squares (ESS).
@@ -281,101 +474,427 @@ class Stats(object):
         # Return rss
         return rss
 
+    # Define enrichment() method
+    def enrichment(self):
+        """Method to calculate virtual screening metrics (ROC AUC, BEDROC, and
+        enrichment factors) against the activity labels in activity_string"""
+        
+        # Import section
+        import numpy as np
+        from SFSXplorer import batch_metrics as bm
+        
+        # Get activity labels, keeping rows with labels only
+        index_activity = self.header.index(self.activity_string)
+        print("\nString "+self.activity_string+" in column: ",index_activity)
+        labels = self.get_array(index_activity)
+        rows = ~np.isnan(labels)
+        x_in = self.get_matrix(self.columns)[rows]
+        
+        # Instantiate an object of the BatchMetrics() class
+        engine = bm.BatchMetrics(labels[rows],x_in,self.block_columns)
+        
+        # Calculate ROC AUC, BEDROC, and enrichment factors
+        self.auc_array,self.bedroc_array,self.ef_array = \
+                engine.enrichment(self.bedroc_alpha,self.ef_fractions,
+                                    self.score_order == "ascending")
+        
+        # Open file to store enrichment analysis
+        fo_enrich = open(self.enrichment_analysis,"w")
+        
+        # Write header
+        header_string = "Feature,ROC AUC,BEDROC"
+        for f in self.ef_fractions:
+            header_string += ",EF"+str(100*f)+"%"
+        fo_enrich.write(header_string+"\n")
+        
+        # Looping through self.columns()
+        for i in range(len(self.columns)):
+            line_o = self.terms[i]+","+str(self.auc_array[i])+","
+            line_o += str(self.bedroc_array[i])
+            for j in range(len(self.ef_fractions)):
+                line_o += ","+str(self.ef_array[j,i])
+            fo_enrich.write(line_o+"\n")
+        
+        # Close file
+        fo_enrich.close()
+        
+        # Show maximum values for metrics
+        print("\nMaximum ROC AUC: ",np.nanmax(self.auc_array))
+        print("Maximum BEDROC: ",np.nanmax(self.bedroc_array))
+        for j,f in enumerate(self.ef_fractions):
+            print("Maximum EF"+str(100*f)+"%: ",np.nanmax(self.ef_array[j]))
+        print("\nEnrichment analysis written in "+self.enrichment_analysis)
+        
     # Define bundle()
     def bundle(self):
         """Method to calculate metrics"""
         
         # Import section
         import numpy as np
-        from sklearn.metrics import r2_score
-        from scipy import stats
-        from sklearn.metrics import mean_absolute_error
-        from sklearn.metrics import mean_squared_error
-        
-        # Set up np.arrays
-        self.rho_array = np.zeros(self.n_features_in)
-        self.p_v_rho_array = np.zeros(self.n_features_in)
-        self.r_array = np.zeros(self.n_features_in)
-        self.p_v_r_array = np.zeros(self.n_features_in)
-        self.r2_array = np.zeros(self.n_features_in)
-        self.mae_array = np.zeros(self.n_features_in)
-        self.mse_array = np.zeros(self.n_features_in)
-        self.rmse_array = np.zeros(self.n_features_in)
-        self.rss_array = np.zeros(self.n_features_in)
-        self.std_dev_array = np.zeros(self.n_features_in)
-        
-        # Invoke get_experimental_index() method
-        self.get_experimental_index()
-        
-        # Get experimental array
-        y_exp = self.get_array(self.index_experimental)
+        from SFSXplorer import batch_metrics as bm
         
-        # Looping through self.columns()
-        for i in range(len(self.columns)):
-            #print(self.columns[i],self.terms[i])
+        # Invoke enrichment() method (classification mode)
+        if self.activity_string is not None:
+            self.enrichment()
         
-            # Invoke get_array() method
-            y_pred = self.get_array(self.columns[i])
-
-            ####################################################################
-            # Metrics
-            # Try to calculate Spearman rank correlation coefficient 
-            # and p-values
-            try:
-                self.rho_array[i],self.p_v_rho_array[i] = \
-                                                stats.spearmanr(y_exp,y_pred)
-            except:
-                self.rho_array[i],self.p_v_rho_array[i] = None,None
-                
-                
-            # Try to calculate Pearson correlation coefficient and p-value
-            try:
-                self.r_array[i],self.p_v_r_array[i] = \
-                                                stats.pearsonr(y_exp,y_pred)
-            except:
-                self.r_array[i],self.p_v_r_array[i] = None,None
-                
-
-            # Calculate MAE, MSE and RMSE
-            self.mae_array[i] = mean_absolute_error(y_exp,y_pred)
-            self.mse_array[i] = mean_squared_error(y_exp,y_pred)
-            self.rmse_array[i] = mean_squared_error(y_exp,y_pred,squared=False)
+        # Regression metrics need experimental data
+        if len(self.exp_strings) == 0:
+            return
+        
+        # Get feature matrix
+        x_in = self.get_matrix(self.columns)
+        
+        # Get categorical column to group rows
+        if self.group_string is not None:
+            categories = self.get_categories(self.group_string)
+        
+        # Set up a dictionary of engines, one for each set of rows with
+        # experimental data (targets with the same missing rows share it)
+        engines = {}
+        
+        # Looping through targets
+        for exp_string in self.exp_strings:
+            self.exp_string = exp_string
             
-            # Invoke calc_RSS method
-            self.rss_array[i] = self.calc_RSS(y_exp,y_pred)
+            # Invoke get_experimental_index() method
+            self.get_experimental_index()
             
-            # Calculate R2
-            self.r2_array[i] = r2_score(y_exp,y_pred)
+            # Get experimental array and keep rows with data
+            y_exp = self.get_array(self.index_experimental)
+            rows = ~np.isnan(y_exp)
+            key = rows.tobytes()
+            if key not in engines:
+                # Instantiate an object of the BatchMetrics() class
+                engines[key] = bm.BatchMetrics(y_exp[rows],x_in[rows],
+                                                self.block_columns)
+            else:
+                engines[key].set_target(y_exp[rows])
+            print("Rows with data for "+self.exp_string+": ",np.sum(rows))
             
-            # Calculate standard deviation
-            self.std_dev_array[i] = np.std(y_pred,ddof=1)  # Standard deviation
-            # https://docs.scipy.org/doc/numpy-1.15.1/reference/generated/numpy.std.html
-
-            # Show metrics
-            print("\n\nFor ",self.terms[i])
-            print("rho: ",self.rho_array[i])
-            print("r: ",self.r_array[i])
-            print("MAE: ",self.mae_array[i])
-            print("MSE: ",self.mse_array[i])
-            print("RMSE: ",self.rmse_array[i])
-            print("RSS: ",self.rss_array[i])
-            print("R2: ",self.r2_array[i])
-            print("SD: ",self.std_dev_array[i])
-        
-            ####################################################################
+            # Set up output file (one per target)
+            self.stats_analysis = self.scores_out.replace(".csv",
+                                                    "_stats_analysis.csv")
+            if len(self.exp_strings) > 1:
+                self.stats_analysis = self.scores_out.replace(".csv",
+                                "_stats_analysis_"+self.exp_string+".csv")
+            
+            # Invoke calc_metrics() method
+            self.calc_metrics(engines[key])
+            
+            # Invoke group_metrics() method
+            if self.group_string is not None:
+                self.group_metrics(engines[key],categories[rows])
+            
+            # Invoke combination_analysis() method
+            if self.combination_search:
+                self.combination_analysis(engines[key])
+            
+            # Invoke redundancy_analysis() method (first target only)
+            if self.redundancy_threshold > 0 and \
+                                        exp_string == self.exp_strings[0]:
+                self.redundancy_analysis(engines[key])
         
-        # Show maximum values for metrics
-        print("\n\n\nMaximum rho: ",np.max(self.rho_array))
-        print("Maximum r: ",np.max(self.r_array))
-        print("Minimum MAE: ",np.min(self.mae_array))
-        print("Minimum MSE: ",np.min(self.mse_array))
-        print("Minimum RMSE: ",np.min(self.rmse_array))
-        print("Minimum RSS: ",np.min(self.rss_array))
-        print("Maximum R2: ",np.max(self.r2_array))
+        # Set first target again (as read from sfs.in)
+        self.exp_string = self.exp_strings[0]
+        self.index_experimental = self.headers.index(self.exp_string)
+    
+    # Define redundancy_analysis() method
+    def redundancy_analysis(self,engine):
+        """Method to cluster redundant features and write one representative
+        (highest |r|) for each cluster with its members"""
+        
+        # Import section
+        import numpy as np
+        
+        # Invoke redundancy_clusters() method
+        labels = engine.redundancy_clusters(self.redundancy_threshold)
+        n_clusters = np.max(labels) + 1
+        r_abs = np.nan_to_num(np.abs(self.r_array),nan=-1.0)
+        
+        # Order clusters by |r| of their representatives
+        rep = np.zeros(n_clusters,dtype=int)
+        best = np.full(n_clusters,-np.inf)
+        for i in range(len(labels)):
+            if r_abs[i] > best[labels[i]]:
+                best[labels[i]],rep[labels[i]] = r_abs[i],i
+        order = np.argsort(-best,kind="stable")
+        
+        # Write clusters
+        redundancy_out = self.scores_out.replace(".csv",
+                                                "_redundancy_clusters.csv")
+        fo_red = open(redundancy_out,"w")
+        fo_red.write("Cluster,Representative,|r|,Size,Members\n")
+        for c,k in enumerate(order):
+            members = [self.terms[i] for i in np.nonzero(labels == k)[0]]
+            line_o = str(c+1)+","+self.terms[rep[k]]+","+str(best[k])+","
+            line_o += str(len(members))+","+";".join(members)
+            fo_red.write(line_o+"\n")
+        fo_red.close()
+        
+        # Write representatives as input lines for sfs.in
+        features_out = self.scores_out.replace(".csv","_representatives.in")
+        fo_feat = open(features_out,"w")
+        fo_feat.write("n_features_in,"+str(n_clusters)+"\n")
+        fo_feat.write("features_in,"+
+                        ",".join([self.terms[rep[k]] for k in order])+"\n")
+        fo_feat.close()
+        
+        # Show message
+        print("\n",len(labels)," features in ",n_clusters,
+                " clusters with |r| >= ",self.redundancy_threshold)
+        print("Redundancy clusters written in "+redundancy_out+" and "+
+                features_out)
+    
+    # Define get_families() method
+    def get_families(self):
+        """Method to return a dictionary with the positions in self.terms of
+        the features of each family of energy terms"""
+        
+        # Import section
+        from SFSXplorer import pair_data as pd
+        from SFSXplorer import term_grid as tg
+        
+        # Set up families from the grid of features (electrostatic terms in
+        # one family; features that are not energy terms are skipped)
+        grid = tg.TermGrid(self.terms,skip_invalid=True)
+        families = {}
+        for name in ["VDW","HB","Elec","Desol"]:
+            index = [term.index for term in grid if term.family == name or
+                        (name == "Elec" and term.family in pd.ELEC_WEIGHTS)]
+            if len(index) > 0:
+                families[name] = index
+        
+        # Return dictionary
+        return families
+    
+    # Define combination_analysis() method
+    def combination_analysis(self,engine):
+        """Method to search linear models combining one feature of each family
+        of energy terms and write a leaderboard ranked by leave-one-out RMSE"""
+        
+        # Import section
+        import numpy as np
+        
+        # Select the top-K features of each family by |r|
+        families = self.get_families()
+        candidates = []
+        for name in families:
+            index = np.array(families[name])
+            if self.combo_top_k > 0:
+                r_abs = np.nan_to_num(np.abs(self.r_array[index]),nan=-1.0)
+                index = index[np.argsort(-r_abs,kind="stable")]
+                index = index[:self.combo_top_k]
+            candidates.append(index)
+        
+        # Show message
+        n_combos = int(np.prod([len(index) for index in candidates]))
+        print("\nSearching ",n_combos," combinations of families ",
+                list(families.keys()),"...")
+        
+        # Invoke combination_search() method
+        combos,coef,intercept,r2,rmse,q2,rmse_loo = \
+                engine.combination_search(candidates,self.combo_batch)
+        
+        # Rank combinations by leave-one-out RMSE
+        order = np.argsort(np.nan_to_num(rmse_loo,nan=np.inf),kind="stable")
+        order = order[:self.combo_top_n]
+        
+        # Write leaderboard
+        combination_analysis = self.stats_analysis.replace("_stats_analysis",
+                                                    "_combination_analysis")
+        fo_combo = open(combination_analysis,"w")
+        header_string = "Rank,"+",".join(families.keys())
+        header_string += ",R2,RMSE,Q2(LOO),RMSE(LOO),Intercept"
+        header_string += "".join([",Coef_"+name for name in families])
+        fo_combo.write(header_string+"\n")
+        for rank,k in enumerate(order):
+            line_o = str(rank+1)+","
+            line_o += ",".join([self.terms[i] for i in combos[k]])+","
+            line_o += str(r2[k])+","+str(rmse[k])+","+str(q2[k])+","
+            line_o += str(rmse_loo[k])+","+str(intercept[k])
+            line_o += "".join([","+str(c) for c in coef[k]])
+            fo_combo.write(line_o+"\n")
+        fo_combo.close()
+        
+        # Show best combination
+        if len(order) > 0:
+            k = order[0]
+            print("Best combination: ",[self.terms[i] for i in combos[k]])
+            print("Q2 (LOO): ",q2[k]," RMSE (LOO): ",rmse_loo[k])
+        print("Combination analysis written in "+combination_analysis)
+    
+    # Define group_metrics() method
+    def group_metrics(self,engine,categories):
+        """Method to calculate metrics for each group of rows (e.g., binding
+        type) with grouped sums over the feature matrix and write a table and
+        a leaderboard with the best feature of each group"""
+        
+        # Import section
+        import numpy as np
+        
+        # Select groups
+        names = [name for name in np.unique(categories)
+                    if len(self.group_values) == 0 or name in self.group_values]
+        names = [name for name in names
+                    if np.sum(categories == name) >= self.min_group_size]
+        if len(names) == 0:
+            print("\nNo groups with at least ",self.min_group_size," rows!")
+            return
+        
+        # Get group index for each row (-1 for rows out of the groups)
+        group = np.full(len(categories),-1)
+        for g,name in enumerate(names):
+            group[categories == name] = g
+        rows = group >= 0
+        
+        # Instantiate an object of the BatchMetrics() class for grouped rows
+        from SFSXplorer import batch_metrics as bm
+        engine_g = bm.BatchMetrics(engine.y_exp[rows],engine.x_in[rows],
+                                    self.block_columns)
+        metrics = engine_g.grouped(group[rows])
+        
+        # Set up output files
+        group_analysis = self.stats_analysis.replace("_stats_analysis",
+                                                    "_group_analysis")
+        group_leaderboard = self.stats_analysis.replace("_stats_analysis",
+                                                    "_group_leaderboard")
+        
+        # Write table with metrics for each group and feature
+        keys = ["n","r","p_r","rho","p_rho","tau_b","c_index","mse","rmse",
+                "rss","mae","r2"]
+        fo_group = open(group_analysis,"w")
+        fo_group.write("Group,Feature,n,r,p-value,rho,p-value,tau-b,C-index,"+
+                        "MSE,RMSE,RSS,MAE,R2\n")
+        for g,name in enumerate(names):
+            for i in range(len(self.columns)):
+                line_o = name+","+self.terms[i]
+                for key in keys:
+                    line_o += ","+str(metrics[key][g,i])
+                fo_group.write(line_o+"\n")
+        fo_group.close()
+        
+        # Metrics for leaderboard (True for higher is better)
+        board = [("r",True),("rho",True),("tau_b",True),("c_index",True),
+                ("mae",False),("rmse",False),("r2",True)]
+        
+        # Global metrics
+        global_metrics = {"r":self.r_array,"rho":self.rho_array,
+                        "tau_b":self.tau_b_array,"c_index":self.c_index_array,
+                        "mae":self.mae_array,"rmse":self.rmse_array,
+                        "r2":self.r2_array}
+        
+        # Write leaderboard with the best feature for each metric and group
+        fo_board = open(group_leaderboard,"w")
+        fo_board.write("Group,n,Metric,Feature,Value\n")
+        print("\nBest features for each group of "+self.group_string+":")
+        for g,name in enumerate(["All"]+names):
+            for key,higher in board:
+                if g == 0:
+                    values,n = global_metrics[key],engine.n_rows
+                else:
+                    values,n = metrics[key][g-1],int(metrics["n"][g-1,0])
+                if np.all(np.isnan(values)):
+                    continue
+                i = np.nanargmax(values) if higher else np.nanargmin(values)
+                line_o = name+","+str(n)+","+key+","+self.terms[i]+","
+                line_o += str(values[i])
+                fo_board.write(line_o+"\n")
+                print(line_o)
+        fo_board.close()
+        
+        # Show message
+        print("\nGroup analysis written in "+group_analysis+" and "+
+                group_leaderboard)
+    
+    # Define calc_metrics() method
+    def calc_metrics(self,engine):
+        """Method to calculate metrics for the current target and write
+        them"""
+        
+        # Import section
+        import numpy as np
+        
+        ########################################################################
+        # Metrics
+        # Calculate Pearson and Spearman correlation coefficients and p-values
+        self.r_array,self.p_v_r_array,self.rho_array,self.p_v_rho_array = \
+                                                        engine.correlations()
+        
+        # Calculate MAE, MSE, RMSE, RSS, R2, and standard deviation
+        self.mae_array,self.mse_array,self.rmse_array,self.rss_array,\
+                            self.r2_array,self.std_dev_array = engine.errors()
+        
+        # Calculate Kendall tau-b and concordance index (C-index)
+        self.tau_b_array,self.c_index_array = engine.kendall()
+        
+        # Calibrated predictions (closed-form fit on each column)
+        if self.calibrate:
+            self.slope_array,self.intercept_array,self.mae_cal_array,\
+            self.mse_cal_array,self.rmse_cal_array,self.r2_cal_array = \
+                                                        engine.calibrated()
+            
+            # Cross-validated calibration
+            if self.cv_folds != 0:
+                folds = None
+                if self.cv_folds > 0:
+                    rng = np.random.default_rng(self.cv_seed)
+                    folds = rng.permutation(engine.n_rows) % self.cv_folds
+                self.mae_cv_array,self.rmse_cv_array,self.q2_cv_array = \
+                                                engine.cross_validated(folds)
+        
+        # Permutation test with permutations shared by all columns
+        if self.n_permutations > 0:
+            print("\nRunning permutation test with ",self.n_permutations,
+                    " permutations...")
+            self.p_perm_r_array,self.p_fwer_r_array,self.threshold_r,\
+            self.p_perm_rho_array,self.p_fwer_rho_array,self.threshold_rho = \
+                    engine.permutation_bundle(self.n_permutations,
+                                self.permutation_batch,self.permutation_seed,
+                                self.alpha_fwer)
+        
+        # Show metrics for every column (opt-in)
+        if self.verbose:
+            for i in range(len(self.columns)):
+                print("\n\nFor ",self.terms[i])
+                print("rho: ",self.rho_array[i])
+                print("r: ",self.r_array[i])
+                print("tau-b: ",self.tau_b_array[i])
+                print("C-index: ",self.c_index_array[i])
+                print("MAE: ",self.mae_array[i])
+                print("MSE: ",self.mse_array[i])
+                print("RMSE: ",self.rmse_array[i])
+                print("RSS: ",self.rss_array[i])
+                print("R2: ",self.r2_array[i])
+                print("SD: ",self.std_dev_array[i])
+        
+        ########################################################################
+        
+        # Top columns for each metric (partial selection)
+        n_top = max(self.leaderboard_top,1)
+        self.leaders = [(metric,array,largest,
+                        engine.top_n(array,n_top,largest))
+                        for metric,array,largest in self.leaderboard_metrics()]
+        
+        # Show best values for metrics
+        print("\n")
+        for metric,array,largest,idx in self.leaders:
+            if len(idx) == 0:
+                continue
+            msg_o = "Maximum " if largest else "Minimum "
+            print(msg_o+metric+": ",array[idx[0]]," ("+self.terms[idx[0]]+")")
+        if self.n_permutations > 0:
+            print("FWER threshold for |r| (alpha = "+str(self.alpha_fwer)+"): ",
+                    self.threshold_r)
+            print("FWER threshold for |rho| (alpha = "+str(self.alpha_fwer)+
+                    "): ",self.threshold_rho)
         
         # Invoke write_metrics() method
         self.write_metrics()
         
+        # Invoke write_leaderboard() method
+        if self.leaderboard_top > 0:
+            self.write_leaderboard()
+        
         # Show message
         msg_o = "\n\n\n\n\nStatistical analysis written in "
         msg_o += self.stats_analysis
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+#
+################################################################################
+# SFSXplorer                                                                   #
+# Scoring Function Space eXplorer                                              #
+################################################################################
+#
+# Class to enumerate the columns (energy terms) of the Scoring Function Space
+# once, each with its index, family, parameters (in the order of the column
+# name), and name. The grid of sfs.in is built by Explorer.get_term_grid(), and
+# the header of write_energy(), the terms calculated for each complex, pruning,
+# workers, Verify, DryRun, Daemon, api, and Stats iterate over the same object.
+# Terms are calculated with the reference loops of FF_AD4.InterMol
+# (reference()) or with any engine with a term(family,params) method, such as
+# pair_data.PairData (compute()). Columns are selected by family and ranges of
+# parameters with select() (names of parameters in PARAM_NAMES).
+#
+################################################################################
+# Dr. Walter F. de Azevedo, Jr.                                                #
+# https://azevedolab.net/                                                      #
+# January 12, 2023                                                             #
+################################################################################
+#
+# Import section
+import collections
+import numpy as np
+from SFSXplorer import pair_data as pd
+
+# Column of the Scoring Function Space
+Term = collections.namedtuple("Term",["index","family","params","name"])
+
+# Names of parameters of each family (in the order of the column name)
+PARAM_NAMES = {"VDW":["n","m"],"HB":["n","m"],
+                "Elec_Log":["A","epsilon0","k","lambda"],
+                "Elec_Tanh":["A","epsilon0","k","lambda"],
+                "Elec_Log_Tanh":["A","epsilon0","k","lambda"],
+                "Desol":["m","n","sigma"]}
+
+# Define reference() function
+def reference(pot,par_list,lig_list,receptor_list,family,params):
+    """Function to return an energy term calculated by the loops of InterMol"""
+
+    # Select family
+    if family == "VDW":
+        return pot.intermol_pot_VDW(par_list,lig_list,receptor_list,
+                                    params[0],params[1])
+    elif family == "HB":
+        return pot.intermol_pot_HB(par_list,lig_list,receptor_list,
+                                    params[0],params[1])
+    elif family == "Desol":
+        return pot.intermol_pot_Desol(par_list,lig_list,receptor_list,
+                                    params[0],params[1],params[2])
+    else:
+        a,e0,k,l = params
+        log_w,tanh_w = pd.ELEC_WEIGHTS[family]
+        return pot.intermol_electro(lig_list,receptor_list,l,k,a,e0,
+                                    log_w,tanh_w)
+
+# Define TermGrid() class
+class TermGrid(object):
+    """Class to keep the columns of the Scoring Function Space"""
+
+    # Define constructor method
+    def __init__(self,terms,skip_invalid=False):
+        """Constructor method (terms are column names, (family,params) tuples,
+        or Term objects; with skip_invalid, names that are not energy terms are
+        skipped and indices are positions in terms)"""
+
+        # Looping through terms
+        self.terms = []
+        for i,term in enumerate(terms):
+            try:
+                if isinstance(term,Term):
+                    family,params = term.family,term.params
+                elif isinstance(term,str):
+                    family,params = pd.parse_term_name(term)
+                else:
+                    family,params = term
+                    if family not in pd.FAMILIES:
+                        raise ValueError("Invalid family "+str(family))
+            except ValueError:
+                if skip_invalid:
+                    continue
+                raise
+            index = i if skip_invalid else len(self.terms)
+            self.terms.append(Term(index,family,tuple(params),
+                                    pd.term_name(family,params)))
+
+        # Names and indices
+        self.names = [term.name for term in self.terms]
+        self.positions = dict([(name,p) for p,name in enumerate(self.names)])
+
+    # Define __len__() method
+    def __len__(self):
+        """Method to return the number of columns"""
+        return len(self.terms)
+
+    # Define __iter__() method
+    def __iter__(self):
+        """Method to iterate over columns"""
+        return iter(self.terms)
+
+    # Define __getitem__() method
+    def __getitem__(self,p):
+        """Method to return a column"""
+        return self.terms[p]
+
+    # Define family() method
+    def family(self,family):
+        """Method to return the columns of a family"""
+        return [term for term in self.terms if term.family == family]
+
+    # Define params() method
+    def params(self,family):
+        """Method to return the parameter sets of a family"""
+        return [term.params for term in self.family(family)]
+
+    # Define counts() method
+    def counts(self):
+        """Method to return the number of columns of each family"""
+        return dict([(family,len(self.family(family))) for family in
+                        pd.FAMILIES])
+
+    # Define get() method
+    def get(self,name):
+        """Method to return the column with a name (KeyError if missing)"""
+        return self.terms[self.positions[name]]
+
+    # Define select() method
+    def select(self,family,ranges):
+        """Method to return the columns of a family (Elec for the three
+        electrostatic families and * for all) with parameters within ranges
+        (dictionary with (min,max) for names of PARAM_NAMES)"""
+
+        # Looping through columns
+        selected = []
+        for term in self.terms:
+            if family not in ["*",term.family] and not (family == "Elec" and
+                                                term.family in pd.ELEC_WEIGHTS):
+                continue
+
+            # Parameters within ranges (with tolerance for rounded values)
+            names = PARAM_NAMES[term.family]
+            if all([name in names and
+                    lo - 1e-9*abs(lo) <= term.params[names.index(name)] <=
+                    hi + 1e-9*abs(hi) for name,(lo,hi) in ranges.items()]):
+                selected.append(term)
+
+        # Return columns
+        return selected
+
+    # Define compute() method
+    def compute(self,engine,skip=()):
+        """Method to return the terms of a complex calculated by an engine
+        with a term(family,params) method (indices in skip are left out)"""
+
+        # Return array
+        return np.array([engine.term(term.family,term.params) for term in
+                        self.terms if term.index not in skip],dtype=float)
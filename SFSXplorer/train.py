@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+#
+################################################################################
+# SFSXplorer                                                                   #
+# Scoring Function Space eXplorer                                              #
+################################################################################
+#
+# Class to train targeted scoring functions (Seifert, 2009) on energy terms of
+# the Scoring Function Space (Heck et al., 2017; Bitencourt-Ferreira &
+# de Azevedo Jr., 2019). It fits ridge-regularized linear and polynomial
+# scoring functions (Hoerl & Kennard, 1970). Each training set is factorized
+# once with the singular value decomposition (SVD), and the solutions for all
+# regularization parameters come from the same factorization. Leave-one-out
+# errors are obtained from the diagonal of the hat matrix (Golub et al., 1979)
+# and k-fold cross-validation runs the folds in parallel. The selected model is
+# exported to a JSON file for later scoring.
+#
+# References:
+# Bitencourt-Ferreira G, de Azevedo WF Jr. Exploring the Scoring Function Space.
+# Methods Mol Biol. 2019; 2053: 275–281.
+#
+# Golub GH, Heath M, Wahba G. Generalized Cross-Validation as a Method for
+# Choosing a Good Ridge Parameter. Technometrics. 1979; 21(2): 215–223.
+#
+# Heck GS, Pintro VO, Pereira RR, de Ávila MB, Levin NMB, de Azevedo WF.
+# Supervised Machine Learning Methods Applied to Predict Ligand-Binding
+# Affinity. Curr Med Chem. 2017; 24(23): 2459–2470.
+#
+# Hoerl AE, Kennard RW. Ridge Regression: Biased Estimation for Nonorthogonal
+# Problems. Technometrics. 1970; 12(1): 55–67.
+#
+# Seifert MH. Targeted scoring functions for virtual screening. Drug Discov
+# Today. 2009; 14(11-12): 562–569.
+#
+################################################################################
+# Dr. Walter F. de Azevedo, Jr.                                                #
+# https://azevedolab.net/                                                      #
+# January 12, 2023                                                             #
+################################################################################
+#
+# Import section
+import numpy as np
+from SFSXplorer import statistical_analysis as sa
+
+# Define poly_terms() function
+def poly_terms(x_s,powers):
+    """Function to return polynomial terms of standardized features"""
+
+    # Return products of powers
+    return np.prod(x_s[:,np.newaxis,:]**powers[np.newaxis,:,:],axis=2)
+
+# Define standardize() function
+def standardize(x):
+    """Function to return mean and standard deviation of columns (one for
+    constant columns)"""
+
+    # Return mean and standard deviation
+    x_mean = np.mean(x,axis=0)
+    x_std = np.std(x,axis=0)
+    x_std[x_std == 0] = 1.0
+    return x_mean,x_std
+
+# Define fold_path() function
+def fold_path(x_train,y_train,x_test,powers,alphas):
+    """Function to return predictions for x_test for all regularization
+    parameters, with features and polynomial terms standardized with the
+    training rows only (nothing from the test rows leaks into training)"""
+
+    # Standardize features and polynomial terms with training statistics
+    x_mean,x_std = standardize(x_train)
+    phi_train = poly_terms((x_train - x_mean)/x_std,powers)
+    phi_test = poly_terms((x_test - x_mean)/x_std,powers)
+    phi_mean,phi_std = standardize(phi_train)
+
+    # Invoke ridge_path() function
+    return ridge_path((phi_train - phi_mean)/phi_std,y_train,
+                        (phi_test - phi_mean)/phi_std,alphas)
+
+# Define ridge_path() function
+def ridge_path(phi_train,y_train,phi_test,alphas):
+    """Function to return predictions for phi_test for all regularization
+    parameters (n_test x n_alphas) from a single SVD of the training data"""
+
+    # Center training data (intercept is not regularized)
+    phi_mean = np.mean(phi_train,axis=0)
+    y_mean = np.mean(y_train)
+    u,s,vt = np.linalg.svd(phi_train - phi_mean,full_matrices=False)
+    u_y = u.T @ (y_train - y_mean)
+
+    # Solutions for all alphas (n_terms x n_alphas)
+    d = s[:,np.newaxis]/(s[:,np.newaxis]**2 + np.asarray(alphas))
+    beta = vt.T @ (d*u_y[:,np.newaxis])
+
+    # Return predictions
+    return (phi_test - phi_mean) @ beta + y_mean
+
+# Define Trainer() class
+class Trainer(sa.Stats):
+    """Class to train regularized linear and polynomial scoring functions"""
+
+    # Define constructor method
+    def __init__(self,sfs_in):
+        """Constructor method"""
+
+        # Set up attribute
+        self.sfs_in = sfs_in        # Input file with parameters
+
+        # Show message
+        print("\n\nTraining scoring functions...")
+
+    # Define read_train_in() method
+    def read_train_in(self):
+        """Method to read parameters to train scoring functions"""
+
+        # Import section
+        import csv
+
+        # Invoke read_stats_in() method (scores_out, exp_string, features_in)
+        self.read_stats_in()
+
+        # Set up default values
+        self.train_degrees = [1]        # Polynomial degrees
+        self.train_alphas = list(np.logspace(-3,3,13))  # Ridge parameters
+        self.train_cv = 5               # Folds (-1 for leave-one-out)
+        self.train_seed = None          # Seed to assign rows to folds
+        self.n_jobs = 1                 # Parallel jobs for folds
+        self.model_out = self.scores_out.replace(".csv","_model.json")
+        self.train_analysis = self.scores_out.replace(".csv",
+                                                        "_train_analysis.csv")
+        train_features = None
+
+        # Looping through input file
+        fo_train = open(self.sfs_in,"r")
+        for line in csv.reader(fo_train):
+            if len(line) < 2 or line[0] == "#":
+                continue
+            elif line[0].strip() == "train_features":
+                train_features = [ele for ele in line[1:] if ele.strip() != ""]
+            elif line[0].strip() == "train_degrees":
+                self.train_degrees = [int(ele) for ele in line[1:]
+                                        if ele.strip() != ""]
+            elif line[0].strip() == "train_alphas":
+                self.train_alphas = [float(ele) for ele in line[1:]
+                                        if ele.strip() != ""]
+            elif line[0].strip() == "train_cv":
+                if line[1].strip().lower() == "loo":
+                    self.train_cv = -1
+                else:
+                    self.train_cv = int(line[1].strip())
+            elif line[0].strip() == "train_seed":
+                self.train_seed = int(line[1].strip())
+            elif line[0].strip() == "n_jobs":
+                self.n_jobs = int(line[1].strip())
+            elif line[0].strip() == "model_out":
+                self.model_out = str(line[1]).strip()
+        fo_train.close()
+
+        # Features selected for training (features_in by default)
+        if train_features is not None:
+            self.columns = [self.header.index(term) for term in train_features]
+            self.terms = list(train_features)
+
+    # Define poly_powers() method
+    def poly_powers(self,n_features,degree):
+        """Method to return the powers of the polynomial terms
+        (n_terms x n_features)"""
+
+        # Import section
+        from sklearn.preprocessing import PolynomialFeatures
+
+        # Return powers (without bias)
+        poly = PolynomialFeatures(degree,include_bias=False)
+        poly.fit(np.zeros((1,n_features)))
+        return poly.powers_
+
+    # Define poly_features() method
+    def poly_features(self,x_s,powers):
+        """Method to return polynomial terms of standardized features"""
+
+        # Invoke poly_terms() function
+        return poly_terms(x_s,powers)
+
+    # Define cross_validate() method
+    def cross_validate(self,phi,y,x,powers):
+        """Method to calculate k-fold and leave-one-out RMSE for all
+        regularization parameters. In k-fold cross-validation, features (x)
+        and polynomial terms (powers) are standardized inside each fold.
+        Leave-one-out errors come from the hat matrix of phi, which is
+        standardized with all rows, so they are slightly optimistic"""
+
+        # Import section
+        from joblib import Parallel, delayed
+
+        # Leave-one-out errors from the hat matrix diagonal (one SVD)
+        alphas = np.asarray(self.train_alphas)
+        n = len(y)
+        phi_c = phi - np.mean(phi,axis=0)
+        u,s,_ = np.linalg.svd(phi_c,full_matrices=False)
+        shrink = s[:,np.newaxis]**2/(s[:,np.newaxis]**2 + alphas)
+        u_y = u.T @ (y - np.mean(y))
+        res = (y - np.mean(y))[:,np.newaxis] - u @ (shrink*u_y[:,np.newaxis])
+        lev = 1.0/n + (u**2) @ shrink
+        rmse_loo = np.sqrt(np.mean((res/(1.0 - lev))**2,axis=0))
+
+        # k-fold cross-validation (one SVD per fold, folds in parallel)
+        rmse_kfold = np.full(len(alphas),np.nan)
+        if self.train_cv > 1:
+            rng = np.random.default_rng(self.train_seed)
+            folds = rng.permutation(n) % self.train_cv
+            pred = Parallel(n_jobs=self.n_jobs)(
+                    delayed(fold_path)(x[folds != f],y[folds != f],
+                                        x[folds == f],powers,alphas)
+                    for f in range(self.train_cv))
+            press = np.zeros(len(alphas))
+            for f in range(self.train_cv):
+                press += np.sum((y[folds == f][:,np.newaxis] - pred[f])**2,
+                                axis=0)
+            rmse_kfold = np.sqrt(press/n)
+
+        # Return results
+        return rmse_kfold,rmse_loo
+
+    # Define train() method
+    def train(self):
+        """Method to train scoring functions and export the best model"""
+
+        # Import section
+        import json
+
+        # Get experimental array and features (rows with data only)
+        self.get_experimental_index()
+        y = self.get_array(self.index_experimental)
+        x = self.get_matrix(self.columns)
+        rows = ~np.isnan(y) & ~np.any(np.isnan(x),axis=1)
+        y,x = y[rows],x[rows]
+        print("\nTraining with ",len(y)," complexes and features ",self.terms)
+
+        # Standardize features
+        x_mean,x_std = standardize(x)
+        x_s = (x - x_mean)/x_std
+        tss = np.sum((y - np.mean(y))**2)
+
+        # Open file to store cross-validation results
+        fo_train = open(self.train_analysis,"w")
+        fo_train.write("Degree,Alpha,Terms,RMSE(k-fold),Q2(k-fold),"+
+                        "RMSE(LOO),Q2(LOO)\n")
+
+        # Looping through polynomial degrees
+        best = None
+        for degree in self.train_degrees:
+            powers = self.poly_powers(x.shape[1],degree)
+            phi = self.poly_features(x_s,powers)
+
+            # Standardize polynomial terms (same penalty for all terms)
+            phi_mean,phi_std = standardize(phi)
+            phi = (phi - phi_mean)/phi_std
+
+            # Invoke cross_validate() method
+            rmse_kfold,rmse_loo = self.cross_validate(phi,y,x,powers)
+            score = rmse_kfold if self.train_cv > 1 else rmse_loo
+
+            # Write results for all alphas
+            for i,alpha in enumerate(self.train_alphas):
+                q2_kfold = 1.0 - len(y)*rmse_kfold[i]**2/tss
+                q2_loo = 1.0 - len(y)*rmse_loo[i]**2/tss
+                line_o = str(degree)+","+str(alpha)+","+str(len(powers))+","
+                line_o += str(rmse_kfold[i])+","+str(q2_kfold)+","
+                line_o += str(rmse_loo[i])+","+str(q2_loo)
+                fo_train.write(line_o+"\n")
+                if best is None or score[i] < best[0]:
+                    best = (score[i],degree,alpha,powers,phi,phi_mean,
+                            phi_std)
+
+        # Close file
+        fo_train.close()
+
+        # Fit best model on all data
+        score,degree,alpha,powers,phi,phi_mean,phi_std = best
+        u,s,vt = np.linalg.svd(phi,full_matrices=False)
+        coef = vt.T @ ((s/(s**2 + alpha))*(u.T @ (y - np.mean(y))))
+
+        # Export model
+        self.model = {"target":self.exp_string,"features":self.terms,
+                    "degree":int(degree),"alpha":float(alpha),
+                    "x_mean":x_mean.tolist(),"x_std":x_std.tolist(),
+                    "powers":powers.tolist(),"phi_mean":phi_mean.tolist(),
+                    "phi_std":phi_std.tolist(),"coef":coef.tolist(),
+                    "intercept":float(np.mean(y)),"cv_rmse":float(score)}
+        fo_model = open(self.model_out,"w")
+        json.dump(self.model,fo_model,indent=1)
+        fo_model.close()
+
+        # Show message
+        print("\nBest model: degree ",degree,", alpha ",alpha,
+                ", cross-validated RMSE ",score)
+        print("k-fold RMSE with features standardized inside each fold; "+
+                "LOO RMSE with features standardized on all complexes "+
+                "(slightly optimistic)")
+        print("Cross-validation results written in "+self.train_analysis)
+        print("Model written in "+self.model_out)
+
+    # Define load_model() method
+    def load_model(self,model_in):
+        """Method to read a model exported by train()"""
+
+        # Import section
+        import json
+
+        # Read model
+        fo_model = open(model_in,"r")
+        self.model = json.load(fo_model)
+        fo_model.close()
+
+    # Define predict() method
+    def predict(self,x):
+        """Method to predict binding affinity from features (n_rows x
+        n_features, in the order of model["features"])"""
+
+        # Standardize features and get polynomial terms
+        m = self.model
+        x_s = (np.asarray(x,dtype=float) - np.array(m["x_mean"]))/\
+                np.array(m["x_std"])
+        phi = self.poly_features(x_s,np.array(m["powers"]))
+        phi_s = (phi - np.array(m["phi_mean"]))/np.array(m["phi_std"])
+
+        # Return predictions
+        return phi_s @ np.array(m["coef"]) + m["intercept"]
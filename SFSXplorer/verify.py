@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+#
+################################################################################
+# SFSXplorer                                                                   #
+# Scoring Function Space eXplorer                                              #
+################################################################################
+#
+# Class to verify that faster engines calculate the same energy terms as the
+# reference per-pair loops of FF_AD4.InterMol (with vdw, hb, elec, and desolv).
+# Both are run side by side on a sample of complexes from ligands.in and a
+# sample of parameter sets (grid points) of each family of sfs.in. Maximum
+# absolute and relative deviations are reported for each engine and family,
+# and the verification fails when a deviation exceeds the tolerance
+# |engine - reference| <= verify_atol + verify_rtol*|reference|. Engines are
+# registered in ENGINES with a function that returns an object with a
+# term(family,params) method for a complex.
+#
+################################################################################
+# Dr. Walter F. de Azevedo, Jr.                                                #
+# https://azevedolab.net/                                                      #
+# January 12, 2023                                                             #
+################################################################################
+#
+# Import section
+import sys
+import time
+import numpy as np
+from SFSXplorer import sfs
+from SFSXplorer import FF_AD4 as ad4
+from SFSXplorer import pair_data as pd
+from SFSXplorer import term_grid as tg
+
+# Define pair_data_engine() function
+def pair_data_engine(par_table,lig_list,receptor_list):
+    """Function to return the vectorized engine of a complex"""
+
+    # Return PairData object
+    return pd.PairData(par_table,lig_list,receptor_list)
+
+# Engines to verify (name and function returning an engine for a complex)
+ENGINES = {"pair_data":pair_data_engine}
+
+# Define Verifier() class
+class Verifier(sfs.Explorer):
+    """Class to verify engines against the reference loops"""
+
+    # Define constructor method
+    def __init__(self,sfs_in):
+        """Constructor method"""
+
+        # Set up attributes
+        self.sfs_in = sfs_in
+
+        # Show message
+        print("\nVerifying engines against the reference loops...")
+
+    # Define read_verify_in() method
+    def read_verify_in(self):
+        """Method to read parameters for verification"""
+
+        # Import section
+        import csv
+
+        # Invoke read_input() method
+        self.read_input()
+
+        # Set up default values
+        self.verify_engines = list(ENGINES.keys())  # Engines to verify
+        self.verify_complexes = 5       # Complexes sampled from ligands.in
+        self.verify_points = 10         # Parameter sets sampled per family
+        self.verify_seed = 0            # Seed for samples
+        self.verify_rtol = 1e-9         # Relative tolerance
+        self.verify_atol = 1e-12        # Absolute tolerance
+
+        # Looping through sfs.in
+        fo_in = open(self.sfs_in,"r")
+        for line in csv.reader(fo_in):
+            if len(line) < 2 or line[0] == "#":
+                continue
+            elif line[0].strip() == "verify_engines":
+                self.verify_engines = [ele.strip() for ele in line[1:]
+                                        if ele.strip() != ""]
+            elif line[0].strip() == "verify_complexes":
+                self.verify_complexes = int(line[1].strip())
+            elif line[0].strip() == "verify_points":
+                self.verify_points = int(line[1].strip())
+            elif line[0].strip() == "verify_seed":
+                self.verify_seed = int(line[1].strip())
+            elif line[0].strip() == "verify_rtol":
+                self.verify_rtol = float(line[1].strip())
+            elif line[0].strip() == "verify_atol":
+                self.verify_atol = float(line[1].strip())
+        fo_in.close()
+
+        # Check engines
+        for engine in self.verify_engines:
+            if engine not in ENGINES:
+                sys.exit("\nError! Unknown engine "+engine+" (available: "+
+                            ", ".join(ENGINES.keys())+")")
+
+        # Set up output file
+        self.verify_out = self.scores_out.replace(".csv","_verify.csv")
+
+    # Define grid_points() method
+    def grid_points(self,rng):
+        """Method to return a sample of the parameter sets of each family (in
+        the order of the column name)"""
+
+        # Invoke get_term_grid() method (columns of write_energy())
+        self.get_term_grid()
+
+        # Parameter sets of each family
+        points = dict([(family,self.term_grid.params(family)) for family in
+                        pd.FAMILIES])
+
+        # Sample of each family
+        for family in points:
+            if len(points[family]) > self.verify_points:
+                index = rng.choice(len(points[family]),self.verify_points,
+                                    replace=False)
+                points[family] = [points[family][i] for i in sorted(index)]
+
+        # Return parameter sets
+        return points
+
+    # Define deviation() method
+    def deviation(self,x_ref,x_eng):
+        """Method to return absolute and relative deviations of an engine
+        (zero if both are the same non-finite value, infinite if only one is
+        non-finite)"""
+
+        # Non-finite values
+        if not (np.isfinite(x_ref) and np.isfinite(x_eng)):
+            if x_ref == x_eng or (np.isnan(x_ref) and np.isnan(x_eng)):
+                return 0.0,0.0
+            return np.inf,np.inf
+
+        # Return deviations
+        d_abs = abs(x_eng - x_ref)
+        d_rel = d_abs/abs(x_ref) if x_ref != 0 else (0.0 if d_abs == 0
+                                                        else np.inf)
+        return d_abs,d_rel
+
+    # Define verify() method
+    def verify(self):
+        """Method to compare engines with the reference loops on a sample of
+        complexes and parameter sets"""
+
+        # Instantiate an object of the InterMol() class
+        pot = ad4.InterMol("misc/data/AD4.1_bound.dat")
+        par_list = pot.read_AD4_bound()
+        par_table = pd.ParTable(pot,par_list)
+
+        # Sample of complexes and parameter sets
+        rng = np.random.default_rng(self.verify_seed)
+        codes = [str(line[0].strip()) for line in self.csv0 if len(line) > 0
+                    and line[0].strip() != "PDB" and "#" not in line[0].strip()]
+        self.fo0.close()
+        if len(codes) > self.verify_complexes:
+            codes = [codes[i] for i in sorted(rng.choice(len(codes),
+                                        self.verify_complexes,replace=False))]
+        points = self.grid_points(rng)
+        print("Complexes: ",len(codes),", parameter sets: ",
+                sum([len(p) for p in points.values()]))
+
+        # Set up results for each engine and family
+        self.results = {}
+        self.t_setup = {}           # Time to set up engines for complexes
+        for engine in self.verify_engines:
+            self.t_setup[engine] = 0.0
+            for family in points:
+                self.results[engine,family] = {"n":0,"abs":0.0,"rel":0.0,
+                        "worst":"","t_ref":0.0,"t_eng":0.0}
+
+        # Looping through complexes
+        for code in codes:
+            name_dir = self.dataset_dir+code+"/"
+            lig_list = pot.read_PDBQT(name_dir+"lig.pdbqt")
+            receptor_list = pot.read_PDBQT(name_dir+"receptor.pdbqt")
+
+            # Reference terms
+            ref = {}
+            t_ref = {}
+            for family in points:
+                t0 = time.perf_counter()
+                ref[family] = [tg.reference(pot,par_list,lig_list,
+                            receptor_list,family,p) for p in points[family]]
+                t_ref[family] = time.perf_counter() - t0
+
+            # Looping through engines
+            for engine in self.verify_engines:
+                t0 = time.perf_counter()
+                eng = ENGINES[engine](par_table,lig_list,receptor_list)
+                self.t_setup[engine] += time.perf_counter() - t0
+                for family in points:
+                    result = self.results[engine,family]
+                    result["t_ref"] += t_ref[family]
+                    t0 = time.perf_counter()
+                    values = [eng.term(family,p) for p in points[family]]
+                    result["t_eng"] += time.perf_counter() - t0
+
+                    # Deviations
+                    for p,x_ref,x_eng in zip(points[family],ref[family],
+                                                values):
+                        d_abs,d_rel = self.deviation(x_ref,x_eng)
+                        result["n"] += 1
+                        if d_rel > result["rel"] or (d_rel == result["rel"] and
+                                                    d_abs > result["abs"]):
+                            result["worst"] = code+" "+pd.term_name(family,p)
+                        result["abs"] = max(result["abs"],d_abs)
+                        result["rel"] = max(result["rel"],d_rel)
+
+                        # Tolerance
+                        if not d_abs <= self.verify_atol + \
+                                            self.verify_rtol*abs(x_ref):
+                            result["failed"] = result.get("failed",0) + 1
+
+    # Define write_verify() method
+    def write_verify(self):
+        """Method to show and write deviations and exit with an error if a
+        tolerance is exceeded"""
+
+        # Show and write results
+        fo_out = open(self.verify_out,"w")
+        fo_out.write("Engine,Family,Evaluations,Max abs deviation,"+
+                "Max rel deviation,Failed,Reference time (s),"+
+                "Engine time (s),Worst\n")
+        print("\n{:<12s}{:<15s}{:>7s}{:>12s}{:>12s}{:>8s}{:>9s}  {}".format(
+                "Engine","Family","Evals","Max abs","Max rel","Failed",
+                "Speedup","Worst"))
+        n_failed = 0
+        for (engine,family),result in self.results.items():
+            failed = result.get("failed",0)
+            n_failed += failed
+            speedup = result["t_ref"]/result["t_eng"] if result["t_eng"] > 0 \
+                        else np.inf
+            print("{:<12s}{:<15s}{:>7d}{:>12.3e}{:>12.3e}{:>8d}{:>9.1f}  {}"
+                    .format(engine,family,result["n"],result["abs"],
+                    result["rel"],failed,speedup,result["worst"]))
+            fo_out.write(",".join([engine,family,str(result["n"]),
+                    str(result["abs"]),str(result["rel"]),str(failed),
+                    str(result["t_ref"]),str(result["t_eng"]),
+                    result["worst"]])+"\n")
+        fo_out.close()
+        for engine in self.t_setup:
+            print("Setup of "+engine+" (not in speedup): {:.6f} s".format(
+                                                        self.t_setup[engine]))
+        print("\nDeviations written in "+self.verify_out)
+
+        # Check tolerance
+        if n_failed > 0:
+            sys.exit("\nError! "+str(n_failed)+" terms exceed the tolerance "+
+                    "(verify_atol "+str(self.verify_atol)+", verify_rtol "+
+                    str(self.verify_rtol)+")")
+        print("\nAll engines within tolerance (verify_atol "+
+                str(self.verify_atol)+", verify_rtol "+str(self.verify_rtol)+
+                ")")
+        print("\nDone!")
@@ -16,8 +16,18 @@
 #
 # Import section
 import sys
+import SFSXplorer
 from SFSXplorer import sfs
 from SFSXplorer import statistical_analysis as sa
+from SFSXplorer import train as tr
+from SFSXplorer import compress as cp
+from SFSXplorer import adaptive as ad
+from SFSXplorer import optimize as op
+from SFSXplorer import benchmark as bk
+from SFSXplorer import scaling as sc
+from SFSXplorer import verify as vf
+from SFSXplorer import dry_run as dr
+from SFSXplorer import daemon as dm
 
 # Define main()
 def main():
@@ -29,6 +39,22 @@ def main():
                                  # Stats for statistical analysis only
                                  # Explore for exploring the scoring function
                                  # space only
+                                 # Train for training scoring functions
+                                 # Compress for PCA of the energy terms
+                                 # Adaptive for coarse-to-fine exploration
+                                 # Optimize for continuous optimization of
+                                 # electrostatic and desolvation parameters
+                                 # Benchmark for timing on synthetic data
+                                 # Scaling for strong and weak scaling with
+                                 # the number of workers
+                                 # Verify for comparison of engines with the
+                                 # reference loops
+                                 # DryRun for checking input and estimating
+                                 # run time and output size
+                                 # Daemon for a local scoring service
+
+    # Show message about SFSXplorer
+    print(SFSXplorer.banner)
 
     # Define explore() function
     def explore():
@@ -66,6 +92,166 @@ def main():
         # Invoke bundle() method
         data1.bundle()
 
+    # Define train() function
+    def train():
+        """Function to train scoring functions on the energy terms"""
+
+        # Instantiate an object of Trainer class
+        model1 = tr.Trainer(sfs_in)
+
+        # Invoke read_train_in() method
+        model1.read_train_in()
+
+        # Invoke read_data() method
+        model1.read_data()
+
+        # Invoke train() method
+        model1.train()
+
+    # Define compress() function
+    def compress():
+        """Function to compress the energy terms with randomized PCA"""
+
+        # Instantiate an object of Compressor class
+        pca1 = cp.Compressor(sfs_in)
+
+        # Invoke read_compress_in() method
+        pca1.read_compress_in()
+
+        # Invoke read_data() method
+        pca1.read_data()
+
+        # Invoke compress() method
+        pca1.compress()
+
+    # Define adaptive() function
+    def adaptive():
+        """Function to explore the scoring function space by adaptive
+        refinement"""
+
+        # Instantiate an object of Refiner class
+        space = ad.Refiner(sfs_in)
+
+        # Invoke read_adaptive_in() method
+        space.read_adaptive_in()
+
+        # Invoke read_data() method
+        space.read_data()
+
+        # Invoke load_complexes() method
+        space.load_complexes()
+
+        # Invoke refine() method
+        space.refine()
+
+        # Invoke write_adaptive() method
+        space.write_adaptive()
+
+    # Define optimize() function
+    def optimize():
+        """Function to optimize electrostatic and desolvation parameters"""
+
+        # Instantiate an object of Optimizer class
+        space = op.Optimizer(sfs_in)
+
+        # Invoke read_optimize_in() method
+        space.read_optimize_in()
+
+        # Invoke read_data() method
+        space.read_data()
+
+        # Invoke load_complexes() method
+        space.load_complexes()
+
+        # Invoke optimize() method
+        space.optimize()
+
+        # Invoke write_optimize() method
+        space.write_optimize()
+
+    # Define benchmark() function
+    def benchmark():
+        """Function to benchmark SFSXplorer on synthetic data"""
+
+        # Instantiate an object of Benchmark class
+        bench1 = bk.Benchmark(sfs_in)
+
+        # Invoke read_benchmark_in() method
+        bench1.read_benchmark_in()
+
+        # Invoke run() method
+        bench1.run()
+
+        # Invoke write_benchmark() method
+        bench1.write_benchmark()
+
+    # Define scaling() function
+    def scaling():
+        """Function to study scaling with the number of workers"""
+
+        # Instantiate an object of Scaling class
+        study1 = sc.Scaling(sfs_in)
+
+        # Invoke read_scaling_in() method
+        study1.read_scaling_in()
+
+        # Invoke run() method
+        study1.run()
+
+        # Invoke write_scaling() method
+        study1.write_scaling()
+
+    # Define verify() function
+    def verify():
+        """Function to verify engines against the reference loops"""
+
+        # Instantiate an object of Verifier class
+        check1 = vf.Verifier(sfs_in)
+
+        # Invoke read_verify_in() method
+        check1.read_verify_in()
+
+        # Invoke read_data() method
+        check1.read_data()
+
+        # Invoke verify() method
+        check1.verify()
+
+        # Invoke write_verify() method
+        check1.write_verify()
+
+    # Define dry_run() function
+    def dry_run():
+        """Function to check input and estimate the cost of an exploration"""
+
+        # Instantiate an object of DryRun class
+        check1 = dr.DryRun(sfs_in)
+
+        # Invoke read_dry_run_in() method
+        check1.read_dry_run_in()
+
+        # Invoke read_data() method
+        check1.read_data()
+
+        # Invoke run() method
+        check1.run()
+
+    # Define daemon() function
+    def daemon():
+        """Function to serve scoring requests with warm caches"""
+
+        # Instantiate an object of Daemon class
+        service1 = dm.Daemon(sfs_in)
+
+        # Invoke read_daemon_in() method
+        service1.read_daemon_in()
+
+        # Invoke start() method
+        service1.start()
+
+        # Invoke serve() method
+        service1.serve()
+
     # Check mode_in
     if mode_in.upper() == "ALL":
         explore()
@@ -74,13 +260,42 @@ def main():
         explore()
     elif mode_in.upper() == "STATS":
         stats_analysis()
+    elif mode_in.upper() == "TRAIN":
+        train()
+    elif mode_in.upper() == "COMPRESS":
+        compress()
+    elif mode_in.upper() == "ADAPTIVE":
+        adaptive()
+    elif mode_in.upper() == "OPTIMIZE":
+        optimize()
+    elif mode_in.upper() == "BENCHMARK":
+        benchmark()
+    elif mode_in.upper() == "SCALING":
+        scaling()
+    elif mode_in.upper() == "VERIFY":
+        verify()
+    elif mode_in.upper() == "DRYRUN":
+        dry_run()
+    elif mode_in.upper() == "DAEMON":
+        daemon()
     else:
         msg_out = "Unidentified mode request!\n"
-        msg_out += "Valid modes: All, Stats, Explore\n"
+        msg_out += "Valid modes: All, Stats, Explore, Train, Compress,\n"
+        msg_out += "Adaptive, Optimize, Benchmark, Scaling, Verify, DryRun,\n"
+        msg_out += "Daemon\n"
         msg_out += "All for exploring the scoring function space"
         msg_out += "and statistical analysis of results.\n"
         msg_out += "Explore for exploring the scoring function space only.\n"
         msg_out += "Stats for statistical analysis only.\n"
+        msg_out += "Train for training scoring functions.\n"
+        msg_out += "Compress for PCA of the energy terms.\n"
+        msg_out += "Adaptive for coarse-to-fine exploration.\n"
+        msg_out += "Optimize for continuous optimization of parameters.\n"
+        msg_out += "Benchmark for timing on synthetic data.\n"
+        msg_out += "Scaling for scaling with the number of workers.\n"
+        msg_out += "Verify for comparison of engines with reference loops.\n"
+        msg_out += "DryRun for checking input and estimating run time.\n"
+        msg_out += "Daemon for a local scoring service.\n"
         sys.exit(msg_out)
 
 main()